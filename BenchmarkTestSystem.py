@@ -4,10 +4,10 @@ from datetime import datetime
 import subprocess
 import contextlib
 import time
-import socket
-import threading
 import psutil
 from SocketCalls import SocketCalls
+from SocketServer import SocketServer
+from Tracer import Tracer
 
 
 class BenchmarkTestSystem:
@@ -47,26 +47,30 @@ class BenchmarkTestSystem:
         current_date = datetime.now().strftime("%Y-%m-%d")
         # Открыть файл лога
         with open(self.__benchmark_log_path, "r") as file:
-            any_match_found = False
+            calls = []  # Вызовы записи FPS для всех строк лога (отправляются одним пакетным запросом)
             for line in file:
                 match = re.search(log_pattern, line)
                 if match:
-                    any_match_found = True
                     # Извлечь время и FPS из найденной строки
                     log_time = match.group(1)
                     fps = int(match.group(2))
                     # Преобразовать время из строки
                     log_datetime = f"{current_date} {log_time}"
-                    # Найти соответствующий документ по дате, записать для него FPS и FPS/W и вывести результат
+                    # Найти соответствующий документ по дате, записать для него FPS и FPS/W
                     if db_name is None:
-                        print(SocketCalls.call_method_of_sensor_data_collection_system("calculate_fps_and_efficiency_in_collection",
-                                                                                       collection_name, log_datetime, fps))
+                        calls.append(("calculate_fps_and_efficiency_in_collection", [collection_name, log_datetime, fps]))
                     else:
-                        print(SocketCalls.call_method_of_sensor_data_collection_system("calculate_fps_and_efficiency_in_collection",
-                                                                                       collection_name, log_datetime, fps, db_name))
-            if not any_match_found:
+                        calls.append(("calculate_fps_and_efficiency_in_collection", [collection_name, log_datetime, fps, db_name]))
+            # После FPS - запись итогов проходов по энергии (с энергией на кадр), в том же пакете
+            save_run_energy_args = [collection_name] if db_name is None else [collection_name, db_name]
+            if not calls:
                 print("В файле лога не было найдено значений FPS")
+                SocketCalls.call_method_of_sensor_data_collection_system("save_run_energy", *save_run_energy_args)
                 return False
+            calls.append(("save_run_energy", save_run_energy_args))
+        # Вывести результаты
+        for result in SocketCalls.call_batch_of_sensor_data_collection_system(calls):
+            print(result)
         return True
 
     # Проверка, что работа бенчмарка была завершена корректно
@@ -99,130 +103,64 @@ class BenchmarkTestSystem:
             print(f"Процесс {self.__benchmark_name} найден и принудительно закрыт, значит, ранее завис при выполнении")
             return False
 
+    # Остановить бенчмарк (если он был запущен) и запись данных с сенсоров (результат - итог записи)
+    @staticmethod
+    def __stop_benchmark_and_recording(benchmark_process):
+        with contextlib.suppress(Exception):
+            benchmark_process.terminate()
+            benchmark_process.wait()
+        return SocketCalls.call_method_of_sensor_data_collection_system("stop_recording")
+
     # Запуск теста бенчмарка со сбором данных в MongoDB (ограниченный по времени)
     def __run_benchmark(self, collection_name, time_before_start_test, time_test_running,
                         time_after_finish_test, db_name=None):
         benchmark_process = None  # Инициализация переменной
         total_time = time_before_start_test + time_test_running + time_after_finish_test
         total_time_before_finish_test = time_before_start_test + time_test_running
+        # Параметры сохранения данных с сенсоров в MongoDB (в БД по умолчанию или в определённую БД)
+        save_parameters = [collection_name] if db_name is None else [collection_name, db_name]
 
-        # Цикл сбора данных с сенсоров GPU на X секунд
+        # Сбор данных с сенсоров GPU выполняет сама система сбора данных с заданной в ней частотой
+        # (без вызова через сокеты на каждое значение), эта система только управляет бенчмарком по секундам
+        if not SocketCalls.call_method_of_sensor_data_collection_system("start_recording", *save_parameters):
+            print("Не удалось начать запись данных с сенсоров GPU. Тест бенчмарка не запущен")
+            return False
         i = 0
         while i < total_time:
+            if SocketServer.is_cancelled():
+                # Клиент отменил тест (SocketCalls.cancel_method) или истёк срок выполнения вызова
+                print("Тест бенчмарка отменён")
+                self.__stop_benchmark_and_recording(benchmark_process)
+                return False
             if i == time_before_start_test:
                 # Запуск MSI Kombustor после X секунд сбора данных с сенсоров
-                benchmark_process = subprocess.Popen(self.__benchmark_start_command, shell=True)
+                with Tracer.span("launch_benchmark", "subprocess", command=self.__benchmark_start_command):
+                    benchmark_process = subprocess.Popen(self.__benchmark_start_command, shell=True)
             if i == total_time_before_finish_test:
                 pyautogui.press(
                     'esc')  # Имитация нажатия ESC для остановки теста (окно бенчмарка должно быть активным)
-            # Получение данных
-            gpu_data = SocketCalls.call_method_of_sensor_data_collection_system("get_gpu_data")
-            if gpu_data is None:
-                print("Не удалось получить данные с сенсоров GPU. Тест бенчмарка остановлен")
-                with contextlib.suppress(Exception):
-                    benchmark_process.terminate()
-                    benchmark_process.wait()
-                return False
-            if db_name is None:
-                # Сохранение данных с сенсоров в MongoDB (в БД по умолчанию)
-                SocketCalls.call_method_of_sensor_data_collection_system("save_gpu_data_to_db", collection_name)
-            else:
-                # Сохранение данных с сенсоров в MongoDB (в определённую БД)
-                SocketCalls.call_method_of_sensor_data_collection_system("save_gpu_data_to_db", collection_name, db_name)
-            # Вывод данных
-            SocketCalls.call_method_of_sensor_data_collection_system("print_gpu_data")
             # Пауза на 1 секунду
-            time.sleep(1)
+            with Tracer.span("sleep", "sleep"):
+                time.sleep(1)
             i = i + 1
-        benchmark_process.terminate()
-        benchmark_process.wait()
+        recording = self.__stop_benchmark_and_recording(benchmark_process)
+        if not recording or recording["samples"] == 0:
+            print("Не удалось получить данные с сенсоров GPU. Тест бенчмарка остановлен")
+            return False
         if not self.__check_benchmark_log_for_normal_shutdown():  # Проверка, что работа бенчмарка была завершена корректно
             return False
 
-    # Обработка вызова метода через сокеты
-    def __handle_client(self, client_socket):
-        try:
-            # Чтение и декодирование запроса
-            request = client_socket.recv(1024).decode('utf-8')
-            print(f"Получено: {request}")
-            # Разбиение запроса на метод и параметры
-            parts = request.split(',')
-            method_name = parts[0].strip()
-            parameters = [p.strip() for p in parts[1:] if p.strip()]  # Убрать пустые значения и пробелы
-
-            # Вызов соответствующего метода
-            if method_name == "change_benchmark_test_type":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    new_test_type = parameters[0]
-                    response = self.__change_benchmark_test_type(new_test_type)
-            elif method_name == "update_fps_and_efficiency_in_collection":
-                if len(parameters) < 1 or len(parameters) > 2:
-                    response = f"Метод {method_name} требует 1 или 2 параметра"
-                    print(response)
-                else:
-                    collection = parameters[0]
-                    if len(parameters) == 1:
-                        response = self.__update_fps_and_efficiency_in_collection(collection)
-                    else:
-                        db_name = parameters[1]
-                        response = self.__update_fps_and_efficiency_in_collection(collection, db_name)
-            elif method_name == "check_benchmark_log_for_normal_shutdown":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__check_benchmark_log_for_normal_shutdown()
-            elif method_name == "run_benchmark":
-                if len(parameters) < 4 or len(parameters) > 5:
-                    response = f"Метод {method_name} требует 4 или 5 параметров"
-                    print(response)
-                else:
-                    collection_name = parameters[0]
-                    time_before_start_test = int(parameters[1])
-                    time_test_running = int(parameters[2])
-                    time_after_finish_test = int(parameters[3])
-                    if len(parameters) == 4:
-                        response = self.__run_benchmark(collection_name, time_before_start_test, time_test_running,
-                                                        time_after_finish_test)
-                    else:
-                        db_name = parameters[4]
-                        response = self.__run_benchmark(collection_name, time_before_start_test, time_test_running,
-                                                        time_after_finish_test, db_name)
-            else:
-                response = f"Неизвестный метод {method_name}"
-                print(response)
-            # Преобразование response в строку, если оно является типа bool или int
-            if isinstance(response, (bool, int)):
-                response = str(response)
-            elif isinstance(response, tuple):
-                # Преобразовать кортеж в строку
-                response = ', '.join(map(str, response))
-            elif response is None:
-                response = "None"
-            # Отправка ответа клиенту
-            client_socket.send(response.encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка обработки клиента: {e}")
-            response = "Ошибка сервера"
-            client_socket.send(response.encode('utf-8'))
-        finally:
-            # Закрытие соединения
-            client_socket.close()
-
     # Цикл обработки вызовов методов через сокеты
     def run(self):
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self.__address, self.__port))
-        server.listen(5)
-        print("Сервер системы тестов бенчмарка GPU запущен и ожидает подключения клиентов...")
-        while True:
-            client_socket, addr = server.accept()
-            print(f"Подключен клиент: {addr}")
-            client_handler = threading.Thread(target=self.__handle_client, args=(client_socket,))
-            client_handler.start()
+        # Таблица методов, доступных через сокеты: имя -> (метод, min и max число параметров)
+        methods = {
+            "change_benchmark_test_type": (self.__change_benchmark_test_type, 1, 1),
+            "update_fps_and_efficiency_in_collection": (self.__update_fps_and_efficiency_in_collection, 1, 2),
+            "check_benchmark_log_for_normal_shutdown": (self.__check_benchmark_log_for_normal_shutdown, 0, 0),
+            "run_benchmark": (self.__run_benchmark, 4, 5)
+        }
+        server = SocketServer(self.__address, self.__port, methods)
+        server.run("Сервер системы тестов бенчмарка GPU запущен и ожидает подключения клиентов...")
 
 
 system = BenchmarkTestSystem()
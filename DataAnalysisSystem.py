@@ -1,5 +1,4 @@
-import socket
-import threading
+import importlib
 import pymongo
 import pandas as pd
 import numpy as np
@@ -14,7 +13,9 @@ from datetime import datetime
 import os
 import webbrowser
 from ParameterOptimizer import ParameterOptimizer
+from SampleBuffer import SampleBuffer
 from SocketCalls import SocketCalls
+from SocketServer import SocketServer
 
 
 class DataAnalysisSystem:
@@ -25,8 +26,17 @@ class DataAnalysisSystem:
         # Параметры MongoDB
         self.__client = pymongo.MongoClient("mongodb://localhost:27017/")  # Адрес сервера MongoDB
         self.__db = self.__client["gpu_benchmark_monitoring"]  # Название БД с собранными данными для обучения модели
-        # Список всех коллекций с данными в БД
-        self.__collections = [self.__db[col] for col in self.__db.list_collection_names()]
+        # Список всех коллекций с данными в БД (кроме коллекций документов проходов и итогов проходов по энергии
+        # и коллекций исходных значений при записи с агрегацией - в модели используются статистики по окнам)
+        self.__collections = [self.__db[col] for col in self.__db.list_collection_names()
+                              if col not in (SampleBuffer.RUNS_COLLECTION, SampleBuffer.RUN_ENERGY_COLLECTION)
+                              and not col.endswith(SampleBuffer.RAW_COLLECTION_SUFFIX)]
+        # Класс локального хранилища SegmentSpool (None, если pyarrow не установлен: данные - только из MongoDB)
+        self.__segment_spool = DataAnalysisSystem.__import_segment_spool()
+        # Коллекции этой же БД в локальном хранилище SegmentSpool (при записи с STORAGE_BACKEND = "spool")
+        self.__spool_collections = [col for col in self.__list_spool_collections(self.__db.name)
+                                    if col not in (SampleBuffer.RUNS_COLLECTION, SampleBuffer.RUN_ENERGY_COLLECTION)
+                                    and not col.endswith(SampleBuffer.RAW_COLLECTION_SUFFIX)]
         self.__label_encoder = LabelEncoder()  # Единый encoder для всего класса
         self.__scaler = None
         # Переименование колонок для LightGBM
@@ -74,6 +84,8 @@ class DataAnalysisSystem:
             # 'efficiency_fps_per_watt'
         ]
         self.__current_df = None
+        self.__current_run_energy_df = None  # Итоги проходов по энергии с известной энергией на кадр
+        self.__energy_model_min_runs = 10  # Мин. число проходов с энергией на кадр для обучения модели энергии на кадр
         self.__current_model = None
         self.__current_optimal_params = None
         # Имя файла с именами коллекций, чтобы не собирать повторно
@@ -107,15 +119,196 @@ class DataAnalysisSystem:
         self.__default_params_collection_name = None
         self.__default_params_and_min_power_limit_collection_name = None
 
+    # Средние значения с сенсоров по секундам для каждого прохода (рассчитываются в MongoDB): в коллекции временных рядов
+    # проход задаётся метаданными, в обычной коллекции - ссылкой на документ прохода. FPS и эффективность (в коллекции
+    # временных рядов - отдельные документы, в обычной - поля значений этой секунды) попадают в строку той же секунды
+    @staticmethod
+    def __aggregate_collection(collection, time_series):
+        value_keys = [short_key for key, short_key in SampleBuffer.SAMPLE_KEYS.items() if key != "Timestamp"]
+        pipeline = [
+            {"$group": {"_id": {"meta": "$meta" if time_series else "$run",
+                                "t": {"$dateTrunc": {"date": "$t", "unit": "second"}}},
+                        **{key: {"$avg": f"${key}"} for key in value_keys}}},
+            {"$sort": {"_id.t": 1}}
+        ]
+        if not time_series:
+            pipeline.insert(0, {"$match": {"run": {"$exists": True}}})  # Только документы компактной схемы
+        documents = []
+        for document in collection.aggregate(pipeline, allowDiskUse=True):
+            group = document.pop("_id")
+            if time_series:
+                document.update(group["meta"])  # Идентификатор прохода ("run") и параметры работы GPU
+            else:
+                document["run"] = group["meta"]
+            document["t"] = group["t"]
+            documents.append(document)
+        return documents
+
+    # Импортировать класс хранилища SegmentSpool только при наличии pyarrow (для анализа данных из MongoDB он не нужен)
+    @staticmethod
+    def __import_segment_spool():
+        try:
+            return importlib.import_module("SegmentSpool").SegmentSpool
+        except ImportError as e:
+            print(f"Хранилище SegmentSpool недоступно ({e}), используются только данные из MongoDB")
+            return None
+
+    # Коллекции БД db_name в хранилище SegmentSpool (пустой список, если хранилище недоступно)
+    def __list_spool_collections(self, db_name):
+        if self.__segment_spool is None:
+            return []
+        return self.__segment_spool.list_collections(self.__segment_spool.FOLDER, db_name)
+
+    # Получить документы коллекции с данными с сенсоров в dataframe с полными названиями столбцов
+    # Значения компактной схемы усредняются по секундам для каждого прохода (как в коллекциях временных рядов
+    # и в хранилище SegmentSpool - данные для модели не зависят от способа хранения и частоты опроса) и объединяются
+    # с документами проходов
+    @staticmethod
+    def __read_collection_to_df(collection):
+        time_series = "timeseries" in collection.options()
+        df = pd.DataFrame(DataAnalysisSystem.__aggregate_collection(collection, time_series))
+        if df.empty and not time_series:
+            # Данные, собранные до появления компактной схемы (одно значение в секунду)
+            df = pd.DataFrame(list(collection.find()))
+        if "run" not in df.columns:
+            return df
+        run_ids = df["run"].dropna().unique().tolist()
+        runs = pd.DataFrame(list(collection.database[SampleBuffer.RUNS_COLLECTION].find({"_id": {"$in": run_ids}})))
+        return DataAnalysisSystem.__join_runs(df, runs)
+
+    # Получить коллекцию из хранилища SegmentSpool в dataframe с полными названиями столбцов: из сегментов читаются
+    # только столбцы значений (без статистик окон агрегации), значения усредняются по секундам для каждого прохода
+    # (FPS и эффективность хранятся отдельными строками и попадают в строку той же секунды)
+    def __read_spool_collection_to_df(self, db_name, collection_name):
+        spool = self.__segment_spool
+        value_keys = [short_key for key, short_key in SampleBuffer.SAMPLE_KEYS.items() if key != "Timestamp"]
+        df = spool.read_table(spool.FOLDER, db_name, collection_name, ["run", "t"] + value_keys).to_pandas()
+        if df.empty:
+            return df
+        df = df.reindex(columns=["run", "t"] + value_keys)
+        df[value_keys] = df[value_keys].astype("float64")
+        df["t"] = df["t"].dt.floor("s")
+        df = df.groupby(["run", "t"], as_index=False, sort=False).mean().sort_values("t", ignore_index=True)
+        runs = spool.read_table(spool.FOLDER, db_name, SampleBuffer.RUNS_COLLECTION,
+                                ["_id", "Benchmark test type"] + list(SampleBuffer.RUN_FIELDS)).to_pandas()
+        return DataAnalysisSystem.__join_runs(df, runs)
+
+    # Получить коллекцию из хранилища SegmentSpool (если она там есть) или из MongoDB в dataframe
+    def __read_data_to_df(self, db_name, collection_name):
+        if collection_name in self.__list_spool_collections(db_name):
+            return self.__read_spool_collection_to_df(db_name, collection_name)
+        return DataAnalysisSystem.__read_collection_to_df(self.__client[db_name][collection_name])
+
+    # Добавить к значениям компактной схемы (dataframe с короткими ключами) параметры работы GPU из документов проходов
+    # runs и строку даты
+    @staticmethod
+    def __join_runs(df, runs):
+        df = df.rename(columns={short_key: key for key, short_key in SampleBuffer.SAMPLE_KEYS.items()})
+        df = DataAnalysisSystem.__map_run_fields(df, runs)
+        # Строка даты с локальным временем (как в данных, собранных ранее)
+        local_timezone = datetime.now().astimezone().tzinfo
+        dates = pd.to_datetime(df["Timestamp"], utc=True).dt.tz_convert(local_timezone).dt.strftime("%Y-%m-%d %H:%M:%S")
+        df["Date"] = dates if "Date" not in df.columns else df["Date"].fillna(dates)
+        return df
+
+    # Добавить к строкам со ссылкой на документ прохода (столбец "run") параметры работы GPU из документов проходов runs
+    @staticmethod
+    def __map_run_fields(df, runs):
+        if not runs.empty:
+            runs = runs.drop_duplicates("_id").set_index("_id")
+            for field_name in SampleBuffer.RUN_FIELDS + ("Benchmark test type",):
+                if field_name not in runs.columns:
+                    continue
+                values = df["run"].map(runs[field_name])  # Соединение по идентификатору прохода
+                df[field_name] = values if field_name not in df.columns else df[field_name].fillna(values)
+        return df
+
+    # Итоги проходов по энергии (EnergyAccumulator) из MongoDB и хранилища SegmentSpool в dataframe с параметрами
+    # работы GPU из документов проходов. collection_names - коллекции с данными с сенсоров (None - все)
+    def __read_run_energy_to_df(self, db_name, collection_names=None):
+        db = self.__client[db_name]
+        query = {} if collection_names is None else {"Collection": {"$in": list(collection_names)}}
+        df = pd.DataFrame(list(db[SampleBuffer.RUN_ENERGY_COLLECTION].find(query)))
+        runs = pd.DataFrame(list(db[SampleBuffer.RUNS_COLLECTION].find(
+            {"_id": {"$in": df["run"].tolist() if not df.empty else []}})))
+        if SampleBuffer.RUN_ENERGY_COLLECTION in self.__list_spool_collections(db_name):
+            spool = self.__segment_spool
+            spool_df = spool.read_table(spool.FOLDER, db_name, SampleBuffer.RUN_ENERGY_COLLECTION).to_pandas()
+            if collection_names is not None:
+                spool_df = spool_df[spool_df["Collection"].isin(list(collection_names))]
+            spool_runs = spool.read_table(spool.FOLDER, db_name, SampleBuffer.RUNS_COLLECTION,
+                                          ["_id", "Benchmark test type"] + list(SampleBuffer.RUN_FIELDS))
+            df = pd.concat([df, spool_df], ignore_index=True)
+            runs = pd.concat([runs, spool_runs.to_pandas()], ignore_index=True)
+        if df.empty:
+            return df
+        return DataAnalysisSystem.__map_run_fields(df, runs)
+
+    # Изменение энергии на кадр (энергия фаз нагрузки, делённая на число кадров) и средней мощности по энергии
+    # проходов (энергия, делённая на время) в итогах проходов found_df относительно default_df (строки для вывода)
+    @staticmethod
+    def __get_energy_change_lines(found_df, default_df):
+        lines = []
+        for description, energy_field, divisor_field in (
+                ("энергии на кадр", "Load Energy [J]", "Frames"),
+                ("средней мощности (по энергии проходов)", "Energy [J]", "Duration [s]")):
+            values = []
+            for df in (found_df, default_df):
+                divisor = df[divisor_field].sum() if not df.empty else 0
+                values.append(df[energy_field].sum() / divisor if divisor > 0 else None)
+            if values[0] is not None and values[1]:
+                lines.append(f"  Изменение {description}: {(values[0] / values[1] - 1) * 100:+.2f}%")
+        return lines
+
+    # Итоги проходов одного типа теста (пустой dataframe остаётся пустым)
+    @staticmethod
+    def __filter_benchmark_type(df, benchmark_type):
+        if df.empty or "Benchmark test type" not in df.columns:
+            return df.iloc[0:0]
+        return df[df["Benchmark test type"] == benchmark_type]
+
+    # Статистика по проходам теста в коллекции (рассчитывается в MongoDB): число значений, время прохода,
+    # среднее и макс. потребление, средние FPS и эффективность
+    def __print_run_statistics(self, collection_name, db_name=None):
+        collection = (self.__db if db_name is None else self.__client[db_name])[collection_name]
+        run_key = "$meta.run" if "timeseries" in collection.options() else "$run"
+        keys = SampleBuffer.SAMPLE_KEYS
+        pipeline = [
+            {"$group": {"_id": run_key,
+                        "samples": {"$sum": {"$cond": [{"$ifNull": [f"${keys['Board Power Draw [W]']}", False]}, 1, 0]}},
+                        "start": {"$min": "$t"},
+                        "end": {"$max": "$t"},
+                        "power": {"$avg": f"${keys['Board Power Draw [W]']}"},
+                        "max_power": {"$max": f"${keys['Board Power Draw [W]']}"},
+                        "fps": {"$avg": f"${keys['FPS']}"},
+                        "efficiency": {"$avg": f"${keys['Efficiency [FPS/W]']}"}}},
+            {"$sort": {"start": 1}}
+        ]
+        statistics = list(collection.aggregate(pipeline))
+        runs = {run["_id"]: run for run in collection.database[SampleBuffer.RUNS_COLLECTION].find(
+            {"_id": {"$in": [run_statistics["_id"] for run_statistics in statistics]}})}
+        lines = []
+        for run_statistics in statistics:
+            run = runs.get(run_statistics["_id"], {})
+            lines.append(
+                f"Проход {run_statistics['_id']} ({run.get('Benchmark test type')}, GPU {run.get('GPU Index')}, "
+                f"Power Limit {run.get('Power Limit [W]')} W, "
+                f"смещение частоты GPU {run.get('GPU Clock Frequency Offset [MHz]')} MHz, "
+                f"смещение частоты памяти {run.get('Memory Clock Offset [MHz]')} MHz): "
+                f"значений {run_statistics['samples']}, {run_statistics['start']} - {run_statistics['end']}, "
+                f"потребление: среднее {run_statistics['power']} W, макс. {run_statistics['max_power']} W, "
+                f"FPS {run_statistics['fps']}, эффективность {run_statistics['efficiency']} FPS/W")
+        str_result = "\n".join(lines) if lines else f"В коллекции {collection_name} нет данных проходов теста"
+        print(str_result)
+        return str_result
+
     # Получить документы из коллекции в dataframe для обработки (в методах построения модели)
     def __get_documents_from_collection_and_set_current_df(self):
-        # Получить все документы из коллекции
-        all_documents = []
-        for collection in self.__collections:
-            documents = list(collection.find())
-            all_documents.extend(documents)  # Добавить документы в общий список
-        # Преобразовать данные в DataFrame
-        df = pd.DataFrame(all_documents)
+        # Получить все документы из всех коллекций и преобразовать данные в DataFrame
+        df = pd.concat([self.__read_collection_to_df(collection) for collection in self.__collections]
+                       + [self.__read_spool_collection_to_df(self.__db.name, collection)
+                          for collection in self.__spool_collections],
+                       ignore_index=True)
         str_result = ""
         print_str = f"Всего {len(df)} документов"
         str_result = str_result + "\n" + print_str
@@ -126,6 +319,14 @@ class DataAnalysisSystem:
         str_result = str_result + "\n" + print_str
         print(print_str)
         self.__current_df = df
+        # Итоги проходов по энергии с энергией на кадр (для модели энергии на кадр)
+        run_energy_df = self.__read_run_energy_to_df(self.__db.name)
+        if not run_energy_df.empty:
+            run_energy_df = run_energy_df[run_energy_df["Energy per Frame [J]"].notna()]
+        self.__current_run_energy_df = run_energy_df
+        print_str = f"Всего {len(run_energy_df)} проходов с энергией на кадр"
+        str_result = str_result + "\n" + print_str
+        print(print_str)
         return str_result
 
     # Определить коэффициент корреляции между FPS и изменяемыми параметрами работы GPU (обособленный метод)
@@ -217,6 +418,44 @@ class DataAnalysisSystem:
 
         return model, {'r2': r2, 'mae': mae}
 
+    # Модель энергии на кадр по итогам проходов (признаки - изменяемые параметры работы GPU, нормализованные так же,
+    # как в модели FPS, и тип теста) и число проходов для обучения. Модель None - мало проходов с энергией на кадр
+    # Энергия на кадр нормализуется по мин. и макс. значениям проходов (как Power Limit, который она заменяет
+    # в целевой функции оптимизации, - чтобы alpha имел тот же смысл)
+    def __train_energy_per_frame_model(self):
+        df = self.__current_run_energy_df
+        if df is None or df.empty:
+            return None, 0
+        df = df.rename(columns=self.__column_mapping)
+        features = ['power_limit_w', 'gpu_clock_offset_mhz', 'memory_clock_offset_mhz']
+        if 'benchmark_type' not in df.columns:
+            return None, 0
+        df = df[df['benchmark_type'].astype(str).isin(self.__label_encoder.classes_)].dropna(subset=features)
+        if len(df) < self.__energy_model_min_runs:
+            return None, len(df)
+        x = pd.DataFrame({feature: df[feature].astype(float) * self.__scaler.scale_[index] + self.__scaler.min_[index]
+                          for feature in features
+                          for index in [self.__numeric_features.index(feature)]})
+        x['benchmark_type'] = self.__label_encoder.transform(df['benchmark_type'].astype(str))
+        energy_per_frame = df['Energy per Frame [J]'].astype(float)
+        energy_per_frame_range = (energy_per_frame.max() - energy_per_frame.min()) or 1.0
+        train_data = lightgbm.Dataset(
+            x,
+            label=(energy_per_frame - energy_per_frame.min()) / energy_per_frame_range,
+            categorical_feature=['benchmark_type']
+        )
+        # Проходов немного (по одному на параметры работы GPU и тип теста) - небольшие деревья и листья
+        params = {
+            'objective': 'regression',
+            'metric': 'mae',
+            'num_leaves': 7,
+            'min_data_in_leaf': 2,
+            'min_data_in_bin': 1,
+            'learning_rate': 0.05,
+            'verbose': -1
+        }
+        return lightgbm.train(params, train_data), len(df)
+
     # Анализ важности признаков
     def __plot_feature_importance(self, model):
         feature_imp = pd.DataFrame({
@@ -268,10 +507,20 @@ class DataAnalysisSystem:
         print(print_str)
         # Визуализация важности признаков
         self.__plot_feature_importance(model)
+        # Модель энергии на кадр (без неё в оптимизации вместо энергии используется Power Limit)
+        energy_model, run_count = self.__train_energy_per_frame_model()
+        if energy_model is None:
+            print_str = (f"Модель энергии на кадр не обучена: проходов с энергией на кадр {run_count}, "
+                         f"нужно не менее {self.__energy_model_min_runs}")
+        else:
+            print_str = f"Модель энергии на кадр обучена по {run_count} проходам"
+        str_result = str_result + "\n" + print_str
+        print(print_str)
         best_params = None
         try:
             optimizer = ParameterOptimizer(model)
             optimizer.le = self.__label_encoder
+            optimizer.energy_model = energy_model
             best_params = optimizer.optimize() # Единственный результат для всех тестов
         except Exception as e:
             print_str = f"Ошибка оптимизации: {str(e)}"
@@ -358,12 +607,10 @@ class DataAnalysisSystem:
         print_str = "Запущен сбор данных для GPU с параметрами работы по умолчанию"
         str_result = str_result + "\n" + print_str
         print(print_str)
-        # Вернуть значение Power Limit GPU по умолчанию
-        _ = SocketCalls.call_method_of_undervolting_gpu_system("set_tdp_to_default")
-        # Вернуть значение смещения частоты GPU по умолчанию
-        _, _ = SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset_to_default")
-        # Вернуть значение смещения частоты памяти по умолчанию
-        _ = SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset_to_default")
+        # Вернуть значения Power Limit GPU, смещения частоты GPU и смещения частоты памяти по умолчанию (одним пакетным запросом)
+        SocketCalls.call_batch_of_undervolting_gpu_system([("set_tdp_to_default", []),
+                                                           ("set_gpu_clock_offset_to_default", []),
+                                                           ("set_mem_clock_offset_to_default", [])])
         self.__default_params_collection_name = default_params_collection_name + " " + datetime.now().strftime(
             "%Y-%m-%d %H:%M:%S")
         for benchmark_test_type in self.__benchmark_tests:
@@ -395,12 +642,10 @@ class DataAnalysisSystem:
         print_str = "Запущен сбор данных для GPU с параметрами работы по умолчанию и минимальным Power Limit"
         str_result = str_result + "\n" + print_str
         print(print_str)
-        # Вернуть значение смещения частоты GPU по умолчанию
-        _, _ = SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset_to_default")
-        # Вернуть значение смещения частоты памяти по умолчанию
-        _ = SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset_to_default")
-        # Вернуть значение Power Limit GPU по умолчанию
-        current_power_limit = SocketCalls.call_method_of_undervolting_gpu_system("set_tdp_to_default")
+        # Вернуть значения смещения частоты GPU, смещения частоты памяти и Power Limit GPU по умолчанию (одним пакетным запросом)
+        _, _, current_power_limit = SocketCalls.call_batch_of_undervolting_gpu_system([("set_gpu_clock_offset_to_default", []),
+                                                                                        ("set_mem_clock_offset_to_default", []),
+                                                                                        ("set_tdp_to_default", [])])
         while True:
             previous_power_limit = current_power_limit
             current_power_limit = SocketCalls.call_method_of_undervolting_gpu_system("reduce_tdp",
@@ -467,18 +712,21 @@ class DataAnalysisSystem:
             ])
         str_result = str_result + "\n" + print_str
         print(print_str)
-        # Установить значение Power Limit GPU в мВт (1 Вт = 1000 мВт)
-        current_power_limit = SocketCalls.call_method_of_undervolting_gpu_system("set_tdp",
-                                                                                 round(optimal_params[
-                                                                                           'power_limit_w'] * 1000))
-        # Установить значение смещения частоты GPU
-        current_gpu_clock_offset, _ = SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset",
-                                                                                         round(optimal_params[
-                                                                                                   'gpu_clock_offset_mhz']))
-        # Установить значение смещения частоты памяти
-        current_mem_clock_offset = SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset",
-                                                                                      round(optimal_params[
-                                                                                                'memory_clock_offset_mhz']))
+        # Параметры GPU устанавливаются по порядку одним пакетным вызовом (каждая установка смещения частоты запускает
+        # NVIDIA Inspector, а результат установки смещения частоты GPU проверяется после установки Power Limit)
+        # Одновременно с пакетом выполняется независимая смена типа теста для первого теста бенчмарка
+        params_future = SocketCalls.call_batch_of_undervolting_gpu_system_async([
+            # Установить значение Power Limit GPU в мВт (1 Вт = 1000 мВт)
+            ("set_tdp", [round(optimal_params['power_limit_w'] * 1000)]),
+            # Установить значение смещения частоты GPU
+            ("set_gpu_clock_offset", [round(optimal_params['gpu_clock_offset_mhz'])]),
+            # Установить значение смещения частоты памяти
+            ("set_mem_clock_offset", [round(optimal_params['memory_clock_offset_mhz'])])
+        ])
+        benchmark_type_future = SocketCalls.call_method_of_benchmark_test_system_async("change_benchmark_test_type",
+                                                                                       self.__benchmark_tests[0])
+        params_results, _ = SocketCalls.gather(params_future, benchmark_type_future)
+        current_power_limit, (current_gpu_clock_offset, _), current_mem_clock_offset = params_results
         print_str = "\n".join([
             "Результат применения параметров GPU:",
             f"  Текущий лимит мощности (Вт): {current_power_limit / 1000}",
@@ -490,8 +738,9 @@ class DataAnalysisSystem:
         print(print_str)
         self.__found_params_collection_name = found_params_collection_name + " " + datetime.now().strftime(
             "%Y-%m-%d %H:%M:%S")
-        for benchmark_test_type in self.__benchmark_tests:
-            SocketCalls.call_method_of_benchmark_test_system("change_benchmark_test_type", benchmark_test_type)
+        for i, benchmark_test_type in enumerate(self.__benchmark_tests):
+            if i > 0:  # Тип первого теста уже установлен одновременно с установкой параметров GPU
+                SocketCalls.call_method_of_benchmark_test_system("change_benchmark_test_type", benchmark_test_type)
             # Один запуск теста бенчмарка со сбором данных в БД (ограниченный по времени)
             res = SocketCalls.call_method_of_benchmark_test_system("run_benchmark",
                                                                    self.__found_params_collection_name,
@@ -614,7 +863,7 @@ class DataAnalysisSystem:
         # Загрузка и проверка данных
         dataframes = {}
         for collection, description in collections:
-            df = pd.DataFrame(list(self.__client[self.__db_name_for_comparison_tests][collection].find()))
+            df = self.__read_data_to_df(self.__db_name_for_comparison_tests, collection)
             print_str = f"Всего {len(df)} документов в коллекции данных с сенсоров при работе GPU с {description}"
             str_result = str_result + "\n" + print_str
             print(print_str)
@@ -627,6 +876,10 @@ class DataAnalysisSystem:
             str_result = str_result + "\n" + print_str
             print(print_str)
             dataframes[collection] = df
+        # Итоги проходов по энергии (если записаны при тестах)
+        run_energy_df = self.__read_run_energy_to_df(self.__db_name_for_comparison_tests, list(dataframes))
+        run_energy_dfs = {collection: run_energy_df[run_energy_df["Collection"] == collection]
+                          if not run_energy_df.empty else run_energy_df for collection in dataframes}
         # Распаковка результатов
         default_params_df = dataframes[self.__default_params_collection_name]
         default_params_and_min_power_limit_df = dataframes[
@@ -635,7 +888,10 @@ class DataAnalysisSystem:
         # Анализ и сравнение
         default_configs = [(default_params_df, "с параметрами по умолчанию"),
                            (default_params_and_min_power_limit_df, "с параметрами по умолчанию и минимальным Power Limit")]
-        for default_df, description in default_configs:
+        found_energy_df = run_energy_dfs[self.__found_params_collection_name]
+        default_energy_dfs = [run_energy_dfs[self.__default_params_collection_name],
+                              run_energy_dfs[self.__default_params_and_min_power_limit_collection_name]]
+        for (default_df, description), default_energy_df in zip(default_configs, default_energy_dfs):
             print_str = "\n".join([
                 "=" * 50,
                 f"Сравнение данных работы GPU с оптимальными параметрами и работы GPU {description}."
@@ -650,6 +906,7 @@ class DataAnalysisSystem:
                 f"Общие результаты (в среднем):",
                 f"  Изменение FPS: {fps_change:+.2f}%",
                 f"  Изменение энергопотребления: {power_change:+.2f}%",
+                *DataAnalysisSystem.__get_energy_change_lines(found_energy_df, default_energy_df),
                 "Результаты по типам тестов (в среднем):"
             ])
             str_result = str_result + "\n" + print_str
@@ -666,7 +923,10 @@ class DataAnalysisSystem:
                 print_str = "\n".join([
                     f"{benchmark_type}:",
                     f"  Изменение FPS: {fps_diff:+.2f}%",
-                    f"  Изменение энергопотребления: {power_diff:+.2f}%"
+                    f"  Изменение энергопотребления: {power_diff:+.2f}%",
+                    *DataAnalysisSystem.__get_energy_change_lines(
+                        DataAnalysisSystem.__filter_benchmark_type(found_energy_df, benchmark_type),
+                        DataAnalysisSystem.__filter_benchmark_type(default_energy_df, benchmark_type))
                 ])
                 str_result = str_result + "\n" + print_str
                 print(print_str)
@@ -678,124 +938,25 @@ class DataAnalysisSystem:
         return str_result
 
     ######## Методы для взаимодействия через сокеты ########
-    # Обработка вызова метода через сокеты
-    def __handle_client(self, client_socket):
-        try:
-            # Чтение и декодирование запроса
-            request = client_socket.recv(1024).decode('utf-8')
-            print(f"Получено: {request}")
-            # Разбиение запроса на метод и параметры
-            parts = request.split(',')
-            method_name = parts[0].strip()
-            parameters = [p.strip() for p in parts[1:] if p.strip()]  # Убрать пустые значения и пробелы
-            # Вызов соответствующего метода
-            if method_name == "get_documents_from_collection_and_set_current_df":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__get_documents_from_collection_and_set_current_df()
-            elif method_name == "correlation_coefficient":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    method = parameters[0]
-                    response = self.__correlation_coefficient(method)
-            elif method_name == "gpu_power_model":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__gpu_power_model()
-            elif method_name == "write_collection_names":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__write_collection_names()
-            elif method_name == "set_default_time_and_watt_reducing_value_for_tests":
-                if len(parameters) != 4:
-                    response = f"Метод {method_name} требует 4 параметра"
-                    print(response)
-                else:
-                    time_before_start_test = int(parameters[0])
-                    time_test_running = int(parameters[1])
-                    time_after_finish_test = int(parameters[2])
-                    watt_reducing_value = int(parameters[3])
-                    response = self.__set_default_time_and_watt_reducing_value_for_tests(time_before_start_test, time_test_running,
-                                                                                         time_after_finish_test, watt_reducing_value)
-            elif method_name == "set_db_name_for_comparison_tests":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    db_name_for_comparison_tests = parameters[0]
-                    response = self.__set_db_name_for_comparison_tests(db_name_for_comparison_tests)
-            elif method_name == "read_and_verify_collection_names":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__read_and_verify_collection_names()
-            elif method_name == "run_test_with_default_params":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    default_params_collection_name = parameters[0]
-                    response = self.__run_test_with_default_params(default_params_collection_name)
-            elif method_name == "run_test_with_default_params_and_min_power_limit":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    default_params_and_min_power_limit_collection_name = parameters[0]
-                    response = self.__run_test_with_default_params_and_min_power_limit(default_params_and_min_power_limit_collection_name)
-            elif method_name == "run_test_with_found_params":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    found_params_collection_name = parameters[0]
-                    response = self.__run_test_with_found_params(found_params_collection_name)
-            elif method_name == "calculate_difference_between_original_and_optimal_performance":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__calculate_difference_between_original_and_optimal_performance()
-            else:
-                response = f"Неизвестный метод {method_name}"
-                print(response)
-            # Преобразование response в строку, если оно является типа bool или int
-            if isinstance(response, (bool, int)):
-                response = str(response)
-            elif isinstance(response, tuple):
-                # Преобразовать кортеж в строку
-                response = ', '.join(map(str, response))
-            elif response is None:
-                response = "None"
-            # Отправка ответа клиенту
-            client_socket.send(response.encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка обработки клиента: {e}")
-            response = "Ошибка сервера"
-            client_socket.send(response.encode('utf-8'))
-        finally:
-            # Закрытие соединения
-            client_socket.close()
-
+    # Цикл обработки вызовов методов через сокеты
     def run(self):
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self.__address, self.__port))
-        server.listen(5)
-        print("Сервер системы анализа данных для построения модели питания GPU запущен и ожидает подключения клиентов...")
-        while True:
-            client_socket, addr = server.accept()
-            print(f"Подключен клиент: {addr}")
-            client_handler = threading.Thread(target=self.__handle_client, args=(client_socket,))
-            client_handler.start()
+        # Таблица методов, доступных через сокеты: имя -> (метод, min и max число параметров)
+        methods = {
+            "get_documents_from_collection_and_set_current_df": (self.__get_documents_from_collection_and_set_current_df, 0, 0),
+            "correlation_coefficient": (self.__correlation_coefficient, 1, 1),
+            "gpu_power_model": (self.__gpu_power_model, 0, 0),
+            "write_collection_names": (self.__write_collection_names, 0, 0),
+            "set_default_time_and_watt_reducing_value_for_tests": (self.__set_default_time_and_watt_reducing_value_for_tests, 4, 4),
+            "set_db_name_for_comparison_tests": (self.__set_db_name_for_comparison_tests, 1, 1),
+            "read_and_verify_collection_names": (self.__read_and_verify_collection_names, 0, 0),
+            "run_test_with_default_params": (self.__run_test_with_default_params, 1, 1),
+            "run_test_with_default_params_and_min_power_limit": (self.__run_test_with_default_params_and_min_power_limit, 1, 1),
+            "run_test_with_found_params": (self.__run_test_with_found_params, 1, 1),
+            "calculate_difference_between_original_and_optimal_performance": (self.__calculate_difference_between_original_and_optimal_performance, 0, 0),
+            "print_run_statistics": (self.__print_run_statistics, 1, 2)
+        }
+        server = SocketServer(self.__address, self.__port, methods)
+        server.run("Сервер системы анализа данных для построения модели питания GPU запущен и ожидает подключения клиентов...")
 
 
 system = DataAnalysisSystem()
@@ -0,0 +1,108 @@
+import math
+from SampleBuffer import SampleBuffer
+
+
+# Учёт энергии проходов теста: потребление платы интегрируется по времени методом трапеций по всем полученным
+# значениям (с частотой опроса), энергия каждого прохода хранится также по секундам, чтобы после теста разделить
+# проход на фазы по значениям FPS из лога бенчмарка: "нагрузка" (секунды с FPS) и "простой" (остальное время)
+class EnergyAccumulator:
+    # Макс. интервал между соседними значениями, который интегрируется, в секундах (больший интервал - например,
+    # между записями при воспроизведении - в энергию и время прохода не входит)
+    MAX_GAP = 2.0
+    # Поля документа итогов прохода в коллекции SampleBuffer.RUN_ENERGY_COLLECTION (кроме "run" и "Collection")
+    RESULT_FIELDS = ("Energy [J]", "Duration [s]", "Average Power [W]", "Samples",
+                     "Load Energy [J]", "Load Duration [s]", "Load Average Power [W]",
+                     "Idle Energy [J]", "Idle Duration [s]", "Idle Average Power [W]",
+                     "Frames", "Energy per Frame [J]")
+
+    def __init__(self):
+        field_names = SampleBuffer.DTYPE.names
+        self.__power_position = field_names.index("Board Power Draw [W]")
+        self.__run_positions = [field_names.index(field_name) for field_name in SampleBuffer.RUN_FIELDS]
+        self.__runs = []  # Проходы с новыми значениями (передаются при pop_runs)
+        self.__run = None  # Текущий проход
+        self.__run_values = None  # Значения RUN_FIELDS текущего прохода
+        self.__last_timestamp = None
+        self.__last_power = None
+
+    # Добавить значение (кортеж полей в порядке SampleBuffer.DTYPE), get_run_id - см. SampleBuffer.to_documents
+    def add(self, sample, get_run_id):
+        timestamp = sample[0]
+        power = sample[self.__power_position]
+        run_values = tuple(sample[position] for position in self.__run_positions)
+        if run_values != self.__run_values:
+            # Новый проход (параметры работы GPU изменились)
+            self.__run = {"run": get_run_id(run_values, timestamp), "energy": 0.0, "duration": 0.0, "samples": 0,
+                          "seconds": {}}
+            self.__runs.append(self.__run)
+            self.__run_values = run_values
+            self.__last_timestamp = None
+        self.__run["samples"] += 1
+        if self.__last_timestamp is not None and 0 < timestamp - self.__last_timestamp <= EnergyAccumulator.MAX_GAP:
+            self.__integrate(self.__last_timestamp, self.__last_power, timestamp, power)
+        self.__last_timestamp = timestamp
+        self.__last_power = power
+
+    # Энергия всех проходов (при окончании записи): список словарей с идентификатором прохода ("run"), энергией
+    # в Дж, временем в секундах, числом значений и энергией и временем по секундам ("seconds": Unix time начала
+    # секунды -> [энергия, время])
+    def pop_runs(self):
+        runs = self.__runs
+        self.__runs = []
+        self.__run = None
+        self.__run_values = None
+        self.__last_timestamp = None
+        return runs
+
+    # Добавить к энергии прохода run (см. pop_runs) энергию other_run того же прохода: например, значения, полученные
+    # после возврата к тем же параметрам работы GPU, или энергию следующей записи в тот же проход
+    @staticmethod
+    def merge_runs(run, other_run):
+        run["energy"] += other_run["energy"]
+        run["duration"] += other_run["duration"]
+        run["samples"] += other_run["samples"]
+        for second, (energy, duration) in other_run["seconds"].items():
+            second_energy = run["seconds"].setdefault(second, [0.0, 0.0])
+            second_energy[0] += energy
+            second_energy[1] += duration
+
+    # Итоги прохода в полях RESULT_FIELDS: по всему проходу и по фазам (fps_values - Unix time начала секунды -> FPS)
+    # Число кадров - FPS, умноженный на время секунды, покрытое значениями; энергия на кадр - энергия фазы нагрузки,
+    # делённая на число кадров (None, если FPS неизвестен)
+    @staticmethod
+    def to_result(run, fps_values):
+        load_energy, load_duration, frames = 0.0, 0.0, 0.0
+        for second, fps in fps_values.items():
+            energy, duration = run["seconds"].get(second, (0.0, 0.0))
+            load_energy += energy
+            load_duration += duration
+            frames += fps * duration
+        idle_energy = run["energy"] - load_energy
+        idle_duration = run["duration"] - load_duration
+        return dict(zip(EnergyAccumulator.RESULT_FIELDS, (
+            run["energy"], run["duration"], EnergyAccumulator.__divide(run["energy"], run["duration"]), run["samples"],
+            load_energy, load_duration, EnergyAccumulator.__divide(load_energy, load_duration),
+            idle_energy, idle_duration, EnergyAccumulator.__divide(idle_energy, idle_duration),
+            frames, EnergyAccumulator.__divide(load_energy, frames))))
+
+    @staticmethod
+    def __divide(value, divisor):
+        return value / divisor if divisor > 0 else None
+
+    # Энергия на интервале между значениями (трапеция) с разделением по секундам (потребление внутри интервала
+    # меняется линейно)
+    def __integrate(self, start_timestamp, start_power, end_timestamp, end_power):
+        seconds = self.__run["seconds"]
+        slope = (end_power - start_power) / (end_timestamp - start_timestamp)
+        while start_timestamp < end_timestamp:
+            second = math.floor(start_timestamp)
+            boundary = min(end_timestamp, second + 1)
+            boundary_power = start_power + slope * (boundary - start_timestamp)
+            duration = boundary - start_timestamp
+            energy = (start_power + boundary_power) / 2 * duration
+            second_energy = seconds.setdefault(second, [0.0, 0.0])
+            second_energy[0] += energy
+            second_energy[1] += duration
+            self.__run["energy"] += energy
+            self.__run["duration"] += duration
+            start_timestamp, start_power = boundary, boundary_power
@@ -0,0 +1,49 @@
+import importlib
+
+
+# Выбор GPU NVIDIA, с которыми работают системы сбора данных с сенсоров и андервольтинга, и способа работы с ними
+class GpuDevices:
+    # Индексы GPU в NVML (как в nvidia-smi), None - все найденные GPU. Для pynvraw используется тот же индекс
+    # (порядок устройств CUDA должен совпадать с порядком NVML: переменная окружения CUDA_DEVICE_ORDER=PCI_BUS_ID)
+    DEVICE_INDICES = None
+    # Индекс GPU, на котором выполняется тест бенчмарка (FPS из лога бенчмарка относится только к нему),
+    # None - первый из выбранных GPU
+    BENCHMARK_DEVICE_INDEX = None
+    # Способ работы с GPU: "nvml" - реальные GPU (NvmlGpuBackend: pynvml, pynvraw, NVIDIA Inspector),
+    # "simulated" - модель GPU без драйвера NVIDIA (SimulatedGpuBackend, для нагрузочных тестов)
+    BACKEND = "nvml"
+    BACKEND_CLASSES = {"nvml": "NvmlGpuBackend", "simulated": "SimulatedGpuBackend"}
+
+    # Создать и инициализировать объект работы с GPU (модуль импортируется только для выбранного способа:
+    # для модели GPU не нужны pynvml и pynvraw)
+    @staticmethod
+    def create_backend():
+        class_name = GpuDevices.BACKEND_CLASSES.get(GpuDevices.BACKEND)
+        if class_name is None:
+            raise ValueError(f"Неизвестный способ работы с GPU: {GpuDevices.BACKEND}")
+        backend = getattr(importlib.import_module(class_name), class_name)()
+        backend.init()
+        return backend
+
+    # Индексы выбранных GPU, которые есть в системе (пустой список, если GPU не найдено)
+    @staticmethod
+    def get_device_indices(backend):
+        device_count = backend.get_device_count()
+        if GpuDevices.DEVICE_INDICES is None:
+            return list(range(device_count))
+        return [index for index in GpuDevices.DEVICE_INDICES if 0 <= index < device_count]
+
+    # Индекс GPU, на котором выполняется тест бенчмарка (None, если GPU не выбраны)
+    @staticmethod
+    def get_benchmark_device_index(device_indices):
+        if GpuDevices.BENCHMARK_DEVICE_INDEX is not None:
+            return GpuDevices.BENCHMARK_DEVICE_INDEX
+        return device_indices[0] if device_indices else None
+
+    # Индексы GPU для вызова метода с необязательным параметром device_index: None - все выбранные GPU,
+    # иначе - только указанный (пустой список, если такого GPU нет среди выбранных)
+    @staticmethod
+    def select(device_indices, device_index=None):
+        if device_index is None:
+            return list(device_indices)
+        return [device_index] if device_index in device_indices else []
@@ -0,0 +1,199 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+# Запись вывода запущенных приложений в лог-файл: строки копятся в очереди ограниченного размера и записываются
+# пакетами в отдельном потоке, лог-файл ротируется по размеру и/или по времени, вывод в консоль можно ограничить
+class LogWriter:
+    MAX_BYTES = 10 * 1024 * 1024  # Макс. размер лог-файла в байтах до ротации (None - без ротации по размеру)
+    ROTATE_INTERVAL = None  # Период ротации лог-файла в секундах (None - без ротации по времени)
+    BACKUP_COUNT = 5  # Число хранимых старых лог-файлов (.1 - самый новый)
+    JSON_LINES = False  # Структурированный формат: одна JSON-запись на строку (время, приложение, pid, поток, текст)
+    MAX_QUEUE_LINES = 10000  # Макс. число строк в очереди (при всплесках вывода лишние строки отбрасываются)
+    MAX_BATCH_LINES = 1000  # Макс. число строк в одной записи в файл
+    FLUSH_INTERVAL = 0.2  # Макс. задержка записи строки в файл в секундах
+    CONSOLE_LINES_PER_SECOND = None  # Макс. число строк в секунду для вывода в консоль от всех приложений (None - все)
+
+    # Общий для всех лог-файлов учёт строк, выведенных в консоль за текущую секунду
+    __console_lock = threading.Lock()
+    __console_window_start = 0.0
+    __console_lines = 0
+    __console_skipped_lines = 0
+
+    __writers = []  # Все открытые объекты записи (для закрытия при завершении программы)
+    __writers_lock = threading.Lock()
+
+    # process_name - имя приложения для тега в структурированном формате
+    def __init__(self, log_file, process_name):
+        self.__log_file = log_file
+        self.__process_name = process_name
+        self.__max_bytes = LogWriter.MAX_BYTES
+        self.__rotate_interval = LogWriter.ROTATE_INTERVAL
+        self.__backup_count = LogWriter.BACKUP_COUNT
+        self.__json_lines = LogWriter.JSON_LINES
+        self.__queue = queue.Queue(maxsize=LogWriter.MAX_QUEUE_LINES)
+        self.__dropped_lines = 0  # Число строк, отброшенных из-за переполнения очереди (с последней записи)
+        self.__dropped_lines_lock = threading.Lock()
+        self.__closed = False
+        # Проверка закрытия при добавлении строки и закрытие - под одной блокировкой: после признака закрытия в очереди
+        # новых строк не появляется
+        self.__closed_lock = threading.Lock()
+        self.__log = None
+        self.__log_open_time = 0.0
+        self.__thread = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__thread.start()
+        with LogWriter.__writers_lock:
+            LogWriter.__writers.append(self)
+
+    # Добавить строку в очередь на запись (stream - "stdout", "stderr" или иной источник строки)
+    # echo - выводить ли строку в консоль
+    def write(self, message, stream="stdout", pid=None, echo=True):
+        with self.__closed_lock:
+            if self.__closed:
+                return
+            try:
+                self.__queue.put_nowait((time.time(), stream, pid, message, echo))
+            except queue.Full:
+                with self.__dropped_lines_lock:
+                    self.__dropped_lines += 1
+
+    # Записать оставшиеся в очереди строки и закрыть лог-файл
+    def close(self):
+        with self.__closed_lock:
+            if self.__closed:
+                return
+            self.__closed = True
+        self.__queue.put(None)  # Вне блокировки: при полной очереди ждёт, пока поток записи её разберёт
+        self.__thread.join()
+
+    # Закрыть все открытые лог-файлы (при завершении программы)
+    @staticmethod
+    def close_all():
+        with LogWriter.__writers_lock:
+            writers = list(LogWriter.__writers)
+            LogWriter.__writers.clear()
+        for writer in writers:
+            writer.close()
+
+    # Цикл записи строк из очереди пакетами (выполняется в отдельном потоке)
+    def __write_loop(self):
+        closing = False
+        while not closing:
+            try:
+                items = [self.__queue.get(timeout=LogWriter.FLUSH_INTERVAL)]
+            except queue.Empty:
+                items = []
+            # Забрать всё, что накопилось в очереди, не дожидаясь новых строк (до признака закрытия)
+            while items and items[-1] is not None and len(items) < LogWriter.MAX_BATCH_LINES:
+                try:
+                    items.append(self.__queue.get_nowait())
+                except queue.Empty:
+                    break
+            if items and items[-1] is None:
+                items.pop()
+                closing = True
+                items.extend(self.__drain_queue())  # Перед завершением потока очередь разбирается полностью
+            with self.__dropped_lines_lock:
+                dropped_lines, self.__dropped_lines = self.__dropped_lines, 0
+            if dropped_lines:
+                items.append((time.time(), "log", None,
+                              f"[Пропущено строк из-за переполнения очереди лога: {dropped_lines}]", True))
+            if items:
+                self.__write_items(items)
+        if self.__log is not None:
+            self.__log.close()
+
+    # Забрать из очереди все оставшиеся строки (без признаков закрытия)
+    def __drain_queue(self):
+        items = []
+        while True:
+            try:
+                item = self.__queue.get_nowait()
+            except queue.Empty:
+                return items
+            if item is not None:
+                items.append(item)
+
+    def __write_items(self, items):
+        lines = [self.__format(timestamp, stream, pid, message) for timestamp, stream, pid, message, _ in items]
+        data = "\n".join(lines) + "\n"
+        try:
+            self.__rotate_if_needed(len(data.encode('utf-8')))
+            self.__log.write(data)
+            self.__log.flush()
+        except OSError as e:
+            print(f"Ошибка записи в лог-файл {self.__log_file}: {e}")
+        LogWriter.__echo([message for _, _, _, message, echo in items if echo])
+
+    def __format(self, timestamp, stream, pid, message):
+        if not self.__json_lines:
+            return message
+        return json.dumps({
+            "time": datetime.fromtimestamp(timestamp).isoformat(timespec='milliseconds'),
+            "process": self.__process_name,
+            "pid": pid,
+            "stream": stream,
+            "message": message
+        }, ensure_ascii=False)
+
+    # Открыть лог-файл или выполнить ротацию, если запись size байт превысит размер или истёк период ротации
+    def __rotate_if_needed(self, size):
+        if self.__log is None:
+            self.__open()
+        rotate_by_size = (self.__max_bytes is not None and self.__log.tell() > 0
+                          and self.__log.tell() + size > self.__max_bytes)
+        rotate_by_time = (self.__rotate_interval is not None
+                          and time.time() - self.__log_open_time >= self.__rotate_interval)
+        if not rotate_by_size and not rotate_by_time:
+            return
+        self.__log.close()
+        # Сдвиг старых файлов: log.N-1 -> log.N, ..., log -> log.1
+        for i in range(self.__backup_count - 1, 0, -1):
+            if os.path.exists(f"{self.__log_file}.{i}"):
+                os.replace(f"{self.__log_file}.{i}", f"{self.__log_file}.{i + 1}")
+        if self.__backup_count > 0:
+            os.replace(self.__log_file, f"{self.__log_file}.1")
+        else:
+            os.remove(self.__log_file)
+        self.__open()
+
+    def __open(self):
+        self.__log = open(self.__log_file, 'a', encoding='utf-8', errors='replace')
+        self.__log_open_time = time.time()
+
+    # Вывод строк в консоль с общим для всех лог-файлов ограничением числа строк в секунду
+    @staticmethod
+    def __echo(lines):
+        if not lines:
+            return
+        limit = LogWriter.CONSOLE_LINES_PER_SECOND
+        skipped_message = None
+        if limit is not None:
+            with LogWriter.__console_lock:
+                now = time.monotonic()
+                if now - LogWriter.__console_window_start >= 1:
+                    if LogWriter.__console_skipped_lines:
+                        skipped_message = (f"[Не выведено в консоль строк: {LogWriter.__console_skipped_lines} "
+                                           f"(см. лог-файлы)]")
+                    LogWriter.__console_window_start = now
+                    LogWriter.__console_lines = 0
+                    LogWriter.__console_skipped_lines = 0
+                allowed_count = max(0, limit - LogWriter.__console_lines)
+                LogWriter.__console_lines += min(allowed_count, len(lines))
+                LogWriter.__console_skipped_lines += max(0, len(lines) - allowed_count)
+                lines = lines[:allowed_count]
+            if skipped_message is not None:
+                lines.insert(0, skipped_message)
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
+
+# Записать оставшиеся строки логов при завершении программы
+atexit.register(LogWriter.close_all)
@@ -1,4 +1,5 @@
 from SocketCalls import SocketCalls
+from Tracer import Tracer
 
 
 class MainAnalyseData:
@@ -19,6 +20,8 @@ class MainAnalyseData:
         self.__watt_reducing_value = 5  # Величина уменьшения Power Limit за один тест (в W)
 
     def main_loop(self):
+        # Трассировка анализа данных и тестов для сравнения (объединить трассировки систем - MainMergeTraces.py)
+        Tracer.start_trace("analyse data")
         print(SocketCalls.call_method_of_data_analysis_system("get_documents_from_collection_and_set_current_df"))
         print(SocketCalls.call_method_of_data_analysis_system("correlation_coefficient", 'pearson'))
         print(SocketCalls.call_method_of_data_analysis_system("correlation_coefficient", 'kendall'))
@@ -43,6 +46,9 @@ class MainAnalyseData:
         print(SocketCalls.call_method_of_data_analysis_system("run_test_with_found_params", self.__found_params_collection_name))
         # Сравнение производительности по умолчанию (и при min Power Limit) и производительности с найденными оптимальными параметрами
         print(SocketCalls.call_method_of_data_analysis_system("calculate_difference_between_original_and_optimal_performance"))
+        # Статистика по проходам теста с найденными оптимальными параметрами
+        SocketCalls.call_method_of_data_analysis_system("print_run_statistics", self.__found_params_collection_name,
+                                                        self.__db_name_for_comparison_tests)
 
 
 main = MainAnalyseData()
@@ -3,12 +3,11 @@ from SocketCalls import SocketCalls
 
 class MainApplyDefaultParameters:
     def __apply_default_params(self):
-        # Вернуть значение Power Limit GPU по умолчанию
-        current_power_limit = SocketCalls.call_method_of_undervolting_gpu_system("set_tdp_to_default")
-        # Вернуть значение смещения частоты GPU по умолчанию
-        current_gpu_clock_offset, _ = SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset_to_default")
-        # Вернуть значение смещения частоты памяти по умолчанию
-        current_mem_clock_offset = SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset_to_default")
+        # Вернуть значения Power Limit GPU, смещения частоты GPU и смещения частоты памяти по умолчанию (одним пакетным запросом)
+        current_power_limit, (current_gpu_clock_offset, _), current_mem_clock_offset = (
+            SocketCalls.call_batch_of_undervolting_gpu_system([("set_tdp_to_default", []),
+                                                               ("set_gpu_clock_offset_to_default", []),
+                                                               ("set_mem_clock_offset_to_default", [])]))
         print("\n".join([
             "Результат применения параметров GPU:",
             f"  Текущий лимит мощности (Вт): {current_power_limit / 1000}",
@@ -35,18 +35,17 @@ class MainApplyOptimalParameters:
         return True
 
     def __apply_params(self):
-        # Установить значение Power Limit GPU в мВт (1 Вт = 1000 мВт)
-        current_power_limit = SocketCalls.call_method_of_undervolting_gpu_system("set_tdp",
-                                                                                 round(self.__optimal_params[
-                                                                                           'power_limit_w'] * 1000))
-        # Вернуть значение смещения частоты GPU
-        current_gpu_clock_offset, _ = SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset",
-                                                                                         round(self.__optimal_params[
-                                                                                                   'gpu_clock_offset_mhz']))
-        # Вернуть значение смещения частоты памяти
-        current_mem_clock_offset = SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset",
-                                                                                      round(self.__optimal_params[
-                                                                                                'memory_clock_offset_mhz']))
+        # Параметры GPU устанавливаются по порядку одним пакетным вызовом (каждая установка смещения частоты запускает
+        # NVIDIA Inspector, поэтому одновременно их выполнять нельзя)
+        current_power_limit, (current_gpu_clock_offset, _), current_mem_clock_offset = (
+            SocketCalls.call_batch_of_undervolting_gpu_system([
+                # Установить значение Power Limit GPU в мВт (1 Вт = 1000 мВт)
+                ("set_tdp", [round(self.__optimal_params['power_limit_w'] * 1000)]),
+                # Установить значение смещения частоты GPU
+                ("set_gpu_clock_offset", [round(self.__optimal_params['gpu_clock_offset_mhz'])]),
+                # Установить значение смещения частоты памяти
+                ("set_mem_clock_offset", [round(self.__optimal_params['memory_clock_offset_mhz'])])
+            ]))
         print("\n".join([
             "Результат применения параметров GPU:",
             f"  Текущий лимит мощности (Вт): {current_power_limit / 1000}",
@@ -0,0 +1,100 @@
+import statistics
+import subprocess
+import sys
+import time
+from SocketCalls import SocketCalls
+from SocketServer import SocketServer
+
+
+# Сравнение задержки вызова методов через сокеты по TCP и через Unix domain socket
+# Сервер запускается в отдельном процессе (как системы в RunAllSystems), вызовы выполняет этот процесс
+class MainBenchmarkSocketTransport:
+    PORT = 1299  # Порт тестового сервера
+
+    def __init__(self):
+        self.__calls_count = 5000  # Число вызовов для каждого вида нагрузки
+        self.__warmup_calls_count = 200  # Число вызовов для прогрева перед замером
+        # Данные, по размеру и составу похожие на одну запись с сенсоров GPU
+        self.__sample = {
+            "Date": "2025-03-24 04:47:29",
+            "GPU Clock [MHz]": 1755,
+            "Memory Clock [MHz]": 4000.0,
+            "GPU Temperature [°C]": 61,
+            "Fan Speed [%]": 45,
+            "Fan Speed [RPM]": 4500,
+            "Memory Used [MB]": 411.6484375,
+            "GPU Load [%]": 99,
+            "Memory Controller Load [%]": 63,
+            "Board Power Draw [W]": 74.521,
+            "Power Consumption [% TDP]": 99.36133333333333,
+            "Power Limit [W]": 75.0,
+            "TDP Limit [%]": 100.0,
+            "Min GPU Clock Frequency [MHz]": 300,
+            "Max GPU Clock Frequency [MHz]": 2100,
+            "GPU Clock Frequency Offset [MHz]": 0,
+            "Memory Clock Offset [MHz]": 0,
+            "GPU Voltage [V]": 0.95625,
+            "Benchmark test type": "glfurrytorus"
+        }
+        # Большой ответ (как многострочные отчёты системы анализа данных)
+        self.__report = "\n".join(f"  Изменение FPS: {i:+.2f}%" for i in range(5000))
+
+    # Запуск тестового сервера (в дочернем процессе)
+    def run_server(self):
+        SocketCalls.USE_UNIX_SOCKETS = True  # Сервер принимает подключения и по TCP, и через Unix domain socket
+        methods = {
+            "ping": (lambda: True, 0, 0),
+            "get_gpu_data": (lambda: self.__sample, 0, 0),
+            "get_report": (lambda: self.__report, 0, 0)
+        }
+        SocketServer(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS, MainBenchmarkSocketTransport.PORT,
+                     methods).run("Тестовый сервер запущен")
+
+    # Замер задержки одного вида нагрузки, результат - строка со статистикой в микросекундах
+    def __measure(self, description, call):
+        for _ in range(self.__warmup_calls_count):
+            call()
+        latencies = []
+        start_time = time.perf_counter()
+        for _ in range(self.__calls_count):
+            call_start_time = time.perf_counter_ns()
+            call()
+            latencies.append((time.perf_counter_ns() - call_start_time) / 1000)
+        total_time = time.perf_counter() - start_time
+        latencies.sort()
+        return (f"  {description:<40} среднее: {statistics.fmean(latencies):8.1f} мкс, "
+                f"p50: {latencies[len(latencies) // 2]:8.1f} мкс, "
+                f"p99: {latencies[int(len(latencies) * 0.99)]:8.1f} мкс, "
+                f"{self.__calls_count / total_time:9.0f} вызовов/с")
+
+    def __measure_transport(self):
+        address = SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS
+        port = MainBenchmarkSocketTransport.PORT
+        return "\n".join([
+            self.__measure("ping", lambda: SocketCalls.call_method(address, port, "ping")),
+            self.__measure("get_gpu_data", lambda: SocketCalls.call_method(address, port, "get_gpu_data")),
+            self.__measure("пакет ping x3", lambda: SocketCalls.call_batch(address, port, [("ping", [])] * 3)),
+            self.__measure("get_report (большой отчёт)", lambda: SocketCalls.call_method(address, port, "get_report"))
+        ])
+
+    def main_loop(self):
+        server_process = subprocess.Popen([sys.executable, __file__, "server"], stdout=subprocess.DEVNULL)
+        try:
+            results = []
+            for use_unix_sockets, description in [(False, "TCP (localhost)"), (True, "Unix domain socket")]:
+                SocketCalls.USE_UNIX_SOCKETS = use_unix_sockets
+                if use_unix_sockets and not SocketCalls.uses_unix_socket(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS):
+                    results.append(f"{description}: не поддерживается в данной ОС")
+                    continue
+                results.append(f"{description}:\n{self.__measure_transport()}")
+            print("\n".join(results))
+        finally:
+            server_process.terminate()
+            server_process.wait()
+
+
+main = MainBenchmarkSocketTransport()
+if len(sys.argv) > 1 and sys.argv[1] == "server":
+    main.run_server()
+else:
+    main.main_loop()
@@ -0,0 +1,59 @@
+import glob
+import json
+import os
+import re
+from Tracer import Tracer
+
+
+# Объединение файлов трассировки всех процессов в отдельный Chrome Trace JSON для каждой трассировки
+# (каждого прохода перебора параметров GPU). Результат открывается в chrome://tracing или https://ui.perfetto.dev
+class MainMergeTraces:
+    def __init__(self):
+        self.__output_dir = os.path.join(Tracer.TRACE_DIR, "merged")  # Каталог для объединённых трассировок
+
+    # Прочитать события всех процессов, сгруппированные по идентификатору трассировки
+    @staticmethod
+    def __read_traces():
+        traces = {}  # Идентификатор трассировки -> {"events": [...], "processes": {pid: имя процесса}}
+        for trace_file in sorted(glob.glob(os.path.join(Tracer.TRACE_DIR, "*.jsonl"))):
+            with open(trace_file, 'r', encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Неполная строка (процесс был завершён во время записи)
+                    trace = traces.setdefault(record["trace_id"], {"events": [], "processes": {}})
+                    trace["events"].append(record["event"])
+                    trace["processes"][record["event"]["pid"]] = record["process"]
+        return traces
+
+    # Сформировать Chrome Trace для одной трассировки (результат - имя трассировки и JSON-объект)
+    @staticmethod
+    def __build_chrome_trace(trace_id, trace):
+        events = sorted(trace["events"], key=lambda event: event["ts"])
+        trace_name = next((event["name"] for event in events if event["cat"] == Tracer.TRACE_CATEGORY), trace_id)
+        # Метаданные: имена процессов вместо pid
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process_name}}
+                    for pid, process_name in trace["processes"].items()]
+        return trace_name, {"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                            "otherData": {"trace_id": trace_id, "trace_name": trace_name}}
+
+    def main_loop(self):
+        traces = MainMergeTraces.__read_traces()
+        if not traces:
+            print(f"Файлы трассировки в каталоге {Tracer.TRACE_DIR} не найдены")
+            return
+        os.makedirs(self.__output_dir, exist_ok=True)
+        for trace_id, trace in traces.items():
+            trace_name, chrome_trace = MainMergeTraces.__build_chrome_trace(trace_id, trace)
+            # Имя файла из имени трассировки (без недопустимых в именах файлов символов)
+            file_name = re.sub(r'[^\w\-.]+', '_', trace_name) + f"_{trace_id[:8]}.json"
+            output_path = os.path.join(self.__output_dir, file_name)
+            with open(output_path, 'w', encoding='utf-8') as file:
+                json.dump(chrome_trace, file, ensure_ascii=False)
+            print(f"Трассировка {trace_name}: {len(trace['events'])} событий, "
+                  f"{len(trace['processes'])} процессов -> {output_path}")
+
+
+main = MainMergeTraces()
+main.main_loop()
@@ -0,0 +1,109 @@
+import glob
+import os
+import pymongo
+from bson import ObjectId, json_util
+from datetime import datetime, timezone
+from SampleBuffer import SampleBuffer
+
+
+# Перенос собранных данных с сенсоров в коллекции временных рядов MongoDB (SampleBuffer.TIME_SERIES_OPTIONS):
+# коллекции исходной БД (полные документы или компактная схема) и файлы экспорта из каталога Dataset_GTX_1650
+# Переименовать коллекцию временных рядов нельзя, поэтому коллекции создаются в отдельной БД с теми же именами
+class MainMigrateToTimeSeries:
+    BATCH_SIZE = 1000  # Число документов в одном insert_many
+
+    def __init__(self):
+        self.__client = pymongo.MongoClient("mongodb://localhost:27017/")  # Адрес сервера MongoDB
+        self.__source_db_names = ["gpu_benchmark_monitoring", "gpu_benchmark_comparison"]  # Исходные БД
+        self.__target_db_suffix = "_timeseries"  # Имя БД для коллекций временных рядов - имя исходной БД с суффиксом
+        self.__dataset_folder = "Dataset_GTX_1650"  # Файлы экспорта коллекций (mongoexport --jsonArray)
+        self.__dataset_db_name = "gpu_benchmark_monitoring_timeseries"  # БД для коллекций из файлов экспорта
+
+    # Время значения: поле "t" (компактная схема) или строка "Date" с локальным временем (полные документы)
+    @staticmethod
+    def __get_time(document):
+        if isinstance(document.get("t"), datetime):
+            return document["t"]
+        return datetime.strptime(document["Date"], "%Y-%m-%d %H:%M:%S").astimezone().astimezone(timezone.utc)
+
+    # Преобразовать документы коллекции в документы коллекции временных рядов
+    # runs - документы проходов исходной БД по идентификатору, для полных документов документы проходов создаются
+    # (по одному на каждое сочетание параметров работы GPU) и добавляются в new_runs
+    @staticmethod
+    def __convert_documents(documents, collection_name, runs, new_runs):
+        run_metas = {}  # Идентификатор прохода или параметры работы GPU -> метаданные прохода
+        converted_documents = []
+        for document in documents:
+            timestamp = MainMigrateToTimeSeries.__get_time(document)
+            if "run" in document:
+                # Компактная схема: значения под короткими ключами, параметры работы GPU - в документе прохода
+                meta = run_metas.get(document["run"])
+                if meta is None:
+                    run = runs.get(document["run"], {"_id": document["run"]})
+                    new_runs[run["_id"]] = run
+                    meta = run_metas[document["run"]] = SampleBuffer.to_time_series_meta(run)
+                values = {key: value for key, value in document.items() if key not in ("_id", "run", "t", "Date")}
+            else:
+                # Полные документы: параметры работы GPU - в каждом документе
+                run_key = tuple(document.get(field_name)
+                                for field_name in ("Benchmark test type",) + SampleBuffer.RUN_FIELDS)
+                meta = run_metas.get(run_key)
+                if meta is None:
+                    run = {"_id": ObjectId(), "Collection": collection_name, "Start": timestamp,
+                           "Benchmark test type": document.get("Benchmark test type")}
+                    run.update((field_name, document.get(field_name)) for field_name in SampleBuffer.RUN_FIELDS)
+                    new_runs[run["_id"]] = run
+                    meta = run_metas[run_key] = SampleBuffer.to_time_series_meta(run)
+                values = {short_key: document[key] for key, short_key in SampleBuffer.SAMPLE_KEYS.items()
+                          if key != "Timestamp" and key in document}
+            converted_document = {"t": timestamp, "meta": meta}
+            converted_document.update(values)
+            converted_documents.append(converted_document)
+        return converted_documents
+
+    # Создать коллекцию временных рядов и записать в неё документы, а документы проходов - в коллекцию проходов
+    def __write_time_series_collection(self, db_name, collection_name, documents, new_runs):
+        db = self.__client[db_name]
+        if collection_name in db.list_collection_names(filter={"name": collection_name}):
+            print(f"Коллекция {collection_name} уже есть в БД {db_name}, перенос пропущен")
+            return
+        db.create_collection(collection_name, timeseries=SampleBuffer.TIME_SERIES_OPTIONS)
+        for start in range(0, len(documents), MainMigrateToTimeSeries.BATCH_SIZE):
+            db[collection_name].insert_many(documents[start:start + MainMigrateToTimeSeries.BATCH_SIZE], ordered=False)
+        for run in new_runs.values():
+            db[SampleBuffer.RUNS_COLLECTION].replace_one({"_id": run["_id"]}, run, upsert=True)
+        print(f"Коллекция {collection_name}: перенесено документов {len(documents)} в БД {db_name}")
+
+    # Перенести коллекции исходной БД (кроме коллекций проходов, исходных значений и уже перенесённых)
+    def __migrate_db(self, source_db_name):
+        source_db = self.__client[source_db_name]
+        runs = {run["_id"]: run for run in source_db[SampleBuffer.RUNS_COLLECTION].find()}
+        for collection_info in source_db.list_collections():
+            collection_name = collection_info["name"]
+            if (collection_info.get("type") == "timeseries" or collection_name == SampleBuffer.RUNS_COLLECTION
+                    or collection_name.endswith(SampleBuffer.RAW_COLLECTION_SUFFIX)):
+                continue
+            new_runs = {}
+            documents = MainMigrateToTimeSeries.__convert_documents(source_db[collection_name].find(), collection_name,
+                                                                    runs, new_runs)
+            self.__write_time_series_collection(source_db_name + self.__target_db_suffix, collection_name, documents,
+                                                new_runs)
+
+    # Перенести коллекции из файлов экспорта (имя коллекции - имя файла)
+    def __migrate_dataset(self):
+        for file_path in sorted(glob.glob(os.path.join(self.__dataset_folder, "*.json"))):
+            collection_name = os.path.splitext(os.path.basename(file_path))[0]
+            with open(file_path, 'r', encoding='utf-8') as file:
+                documents = json_util.loads(file.read())  # Расширенный JSON MongoDB ({"$oid": ...} и т.п.)
+            new_runs = {}
+            documents = MainMigrateToTimeSeries.__convert_documents(documents, collection_name, {}, new_runs)
+            self.__write_time_series_collection(self.__dataset_db_name, collection_name, documents, new_runs)
+
+    def main_loop(self):
+        for source_db_name in self.__source_db_names:
+            self.__migrate_db(source_db_name)
+        self.__migrate_dataset()
+
+
+main = MainMigrateToTimeSeries()
+main.main_loop()
@@ -0,0 +1,39 @@
+import time
+import numpy as np
+from TelemetryRingBuffer import TelemetryRingBuffer
+
+
+# Мониторинг потребления GPU в реальном времени: чтение данных с сенсоров из кольцевого буфера в разделяемой памяти
+# (система сбора данных с сенсоров должна быть запущена на этом же компьютере)
+class MainMonitorTelemetry:
+    def __init__(self):
+        self.__interval = 1  # Период вывода в секундах
+        self.__window = 1000  # Макс. число последних значений, читаемых за один раз
+
+    def main_loop(self):
+        while True:
+            try:
+                ring_buffer = TelemetryRingBuffer.open()
+                break
+            except FileNotFoundError:
+                print("Буфер данных с сенсоров ещё не создан. Повторная попытка...")
+                time.sleep(1)
+        last_timestamp = 0.0
+        while True:
+            records = ring_buffer.read_latest(self.__window, zero_copy=True)
+            new_records = records[records["Timestamp"] > last_timestamp]  # Значения, полученные после прошлого вывода
+            if len(new_records) > 0:
+                last_timestamp = new_records["Timestamp"][-1]
+                # Значения всех опрашиваемых GPU записываются в один буфер - вывод отдельно для каждого GPU
+                for device_index in np.unique(new_records["GPU Index"]):
+                    device_records = new_records[new_records["GPU Index"] == device_index]
+                    power = device_records["Board Power Draw [W]"]
+                    print(f"{time.strftime('%H:%M:%S', time.localtime(last_timestamp))} GPU {device_index:.0f} "
+                          f"значений: {len(device_records)}, мощность: среднее {np.nanmean(power):.2f} W, "
+                          f"min {np.nanmin(power):.2f} W, max {np.nanmax(power):.2f} W, "
+                          f"частота GPU: {device_records['GPU Clock [MHz]'][-1]:.0f} MHz")
+            time.sleep(self.__interval)
+
+
+main = MainMonitorTelemetry()
+main.main_loop()
@@ -0,0 +1,21 @@
+from SocketCalls import SocketCalls
+
+
+# Вывод статистики вызовов методов через сокеты (число вызовов, ошибок и процентили задержек) для всех систем
+class MainPrintRpcStatistics:
+    def __init__(self):
+        self.__systems = [
+            ("Система сбора данных с сенсоров GPU", SocketCalls.call_method_of_sensor_data_collection_system),
+            ("Система тестов бенчмарка GPU", SocketCalls.call_method_of_benchmark_test_system),
+            ("Система андервольтинга GPU", SocketCalls.call_method_of_undervolting_gpu_system),
+            ("Система анализа данных", SocketCalls.call_method_of_data_analysis_system)
+        ]
+
+    def main_loop(self):
+        for system_name, call_method in self.__systems:
+            print(system_name)
+            print(call_method("print_rpc_statistics"))
+
+
+main = MainPrintRpcStatistics()
+main.main_loop()
@@ -0,0 +1,41 @@
+import time
+from datetime import datetime
+from SocketCalls import SocketCalls
+from TelemetryReplay import TelemetryReplay
+from Tracer import Tracer
+
+
+# Нагрузочный тест записи и анализа данных на записанных данных (без GPU и бенчмарка): система сбора данных
+# воспроизводит файлы каталога Dataset_GTX_1650 (TelemetryReplay) в новую коллекцию, затем в коллекцию записываются
+# FPS из тех же файлов (как из лога бенчмарка) и итоги проходов по энергии, выводятся скорость записи и время
+# расчёта FPS
+class MainReplayTelemetry:
+    def __init__(self):
+        self.__collection_name = "replay" + " " + datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.__speed = None  # Ускорение воспроизведения (1 - в реальном времени, 10 - в 10 раз быстрее, None - макс.)
+        self.__file_pattern = TelemetryReplay.FILE_PATTERN  # Воспроизводимые файлы каталога Dataset_GTX_1650
+        self.__check_interval = 0.5  # Период проверки окончания воспроизведения в секундах
+
+    def main_loop(self):
+        Tracer.start_trace(self.__collection_name)
+        if not SocketCalls.call_method_of_sensor_data_collection_system("start_replay", self.__collection_name, None,
+                                                                        self.__speed, self.__file_pattern):
+            return
+        while SocketCalls.call_method_of_sensor_data_collection_system("is_recording"):
+            time.sleep(self.__check_interval)
+        result = SocketCalls.call_method_of_sensor_data_collection_system("stop_recording")
+        print(f"Итоги воспроизведения: {result}")
+        # Запись FPS и эффективности одним пакетным запросом (как после теста бенчмарка)
+        calls = [("calculate_fps_and_efficiency_in_collection", [self.__collection_name, log_datetime, fps])
+                 for log_datetime, fps in TelemetryReplay(file_pattern=self.__file_pattern).get_fps_values()]
+        start_time = time.perf_counter()
+        SocketCalls.call_batch_of_sensor_data_collection_system(calls)
+        duration = time.perf_counter() - start_time
+        print(f"Записано значений FPS: {len(calls)} за {duration:.3f} с "
+              f"({len(calls) / duration if duration > 0 else 0.0:.0f} в секунду)")
+        # Итоги проходов по энергии (с энергией на кадр по записанным FPS)
+        SocketCalls.call_method_of_sensor_data_collection_system("save_run_energy", self.__collection_name)
+
+
+main = MainReplayTelemetry()
+main.main_loop()
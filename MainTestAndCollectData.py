@@ -1,5 +1,6 @@
 from datetime import datetime
 from SocketCalls import SocketCalls
+from Tracer import Tracer
 
 
 class MainTestAndCollectData:
@@ -34,6 +35,8 @@ class MainTestAndCollectData:
                                   "glmsi02gpumedium"]
 
     def main_loop(self):
+        # Трассировка всего прохода по параметрам GPU (объединить трассировки систем - MainMergeTraces.py)
+        Tracer.start_trace(self.__collection_name)
         # Сбор данных для нескольких разных типов тестов бенчмарка
         for benchmark_test_type in self.__benchmark_tests:
             SocketCalls.call_method_of_benchmark_test_system("change_benchmark_test_type", benchmark_test_type)
@@ -97,10 +100,10 @@ class MainTestAndCollectData:
                     print(
                         f"Минимальное значение Power Limit: {current_power_limit / 1000} W достигнуто, все возможные тесты типа {benchmark_test_type} пройдены")
                     break
-            # Возврат значений по умолчанию
-            SocketCalls.call_method_of_undervolting_gpu_system("set_tdp_to_default")
-            SocketCalls.call_method_of_undervolting_gpu_system("set_gpu_clock_offset_to_default")
-            SocketCalls.call_method_of_undervolting_gpu_system("set_mem_clock_offset_to_default")
+            # Возврат значений по умолчанию (одним пакетным запросом)
+            SocketCalls.call_batch_of_undervolting_gpu_system([("set_tdp_to_default", []),
+                                                               ("set_gpu_clock_offset_to_default", []),
+                                                               ("set_mem_clock_offset_to_default", [])])
 
 
 main = MainTestAndCollectData()
@@ -0,0 +1,218 @@
+import struct
+import numpy as np
+
+
+# Компактное двоичное кодирование сообщений в формате, совместимом с MessagePack
+# (None, bool, int, float, str, bytes, list, dict), с типами-расширениями для кортежей и массивов NumPy
+class MessageCodec:
+    EXT_TUPLE = 1  # Код типа-расширения для кортежа
+    EXT_NDARRAY = 2  # Код типа-расширения для массива NumPy
+
+    # Форматы чисел фиксированного размера по коду типа
+    __FIXED_FORMATS = {
+        0xca: ">f", 0xcb: ">d",
+        0xcc: ">B", 0xcd: ">H", 0xce: ">I", 0xcf: ">Q",
+        0xd0: ">b", 0xd1: ">h", 0xd2: ">i", 0xd3: ">q",
+    }
+
+    # Форматы длины для строк, байтов, списков, словарей и расширений по коду типа
+    __LENGTH_FORMATS = {
+        0xd9: ("str", ">B"), 0xda: ("str", ">H"), 0xdb: ("str", ">I"),
+        0xc4: ("bytes", ">B"), 0xc5: ("bytes", ">H"), 0xc6: ("bytes", ">I"),
+        0xdc: ("list", ">H"), 0xdd: ("list", ">I"),
+        0xde: ("dict", ">H"), 0xdf: ("dict", ">I"),
+        0xc7: ("ext", ">B"), 0xc8: ("ext", ">H"), 0xc9: ("ext", ">I"),
+    }
+
+    # Закодировать объект в байты
+    @staticmethod
+    def encode(obj):
+        parts = []
+        MessageCodec.__pack(obj, parts)
+        return b"".join(parts)
+
+    # Декодировать объект из байтов
+    @staticmethod
+    def decode(data):
+        view = memoryview(data)
+        obj, offset = MessageCodec.__unpack(view, 0)
+        if offset != len(view):
+            raise ValueError(f"Лишние данные в сообщении: {len(view) - offset} байт")
+        return obj
+
+    @staticmethod
+    def __pack(obj, parts):
+        if obj is None:
+            parts.append(b"\xc0")
+        elif obj is True or obj is False:
+            parts.append(b"\xc3" if obj else b"\xc2")
+        elif isinstance(obj, int):
+            MessageCodec.__pack_int(obj, parts)
+        elif isinstance(obj, float):
+            parts.append(struct.pack(">Bd", 0xcb, obj))
+        elif isinstance(obj, str):
+            data = obj.encode('utf-8')
+            MessageCodec.__pack_length(len(data), parts, 0xa0, 31, 0xd9, 0xda, 0xdb)
+            parts.append(data)
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            data = bytes(obj)
+            MessageCodec.__pack_length(len(data), parts, None, 0, 0xc4, 0xc5, 0xc6)
+            parts.append(data)
+        elif isinstance(obj, tuple):
+            MessageCodec.__pack_ext(MessageCodec.EXT_TUPLE, MessageCodec.encode(list(obj)), parts)
+        elif isinstance(obj, list):
+            MessageCodec.__pack_length(len(obj), parts, 0x90, 15, None, 0xdc, 0xdd)
+            for item in obj:
+                MessageCodec.__pack(item, parts)
+        elif isinstance(obj, dict):
+            MessageCodec.__pack_length(len(obj), parts, 0x80, 15, None, 0xde, 0xdf)
+            for key, value in obj.items():
+                MessageCodec.__pack(key, parts)
+                MessageCodec.__pack(value, parts)
+        elif isinstance(obj, np.ndarray):
+            array = np.ascontiguousarray(obj)
+            payload = MessageCodec.encode([MessageCodec.__describe_dtype(array.dtype), list(array.shape),
+                                           array.tobytes()])
+            MessageCodec.__pack_ext(MessageCodec.EXT_NDARRAY, payload, parts)
+        elif isinstance(obj, np.generic):
+            # Скаляры NumPy (np.int64, np.float32, np.bool_ и т.д.) передаются как обычные числа
+            MessageCodec.__pack(obj.item(), parts)
+        else:
+            raise TypeError(f"Тип {type(obj).__name__} не поддерживается для передачи через сокеты")
+
+    @staticmethod
+    def __pack_int(value, parts):
+        if 0 <= value <= 0x7f:
+            parts.append(struct.pack(">B", value))  # positive fixint
+        elif -32 <= value < 0:
+            parts.append(struct.pack(">b", value))  # negative fixint
+        elif -2 ** 31 <= value < 2 ** 31:
+            parts.append(struct.pack(">Bi", 0xd2, value))
+        elif -2 ** 63 <= value < 2 ** 63:
+            parts.append(struct.pack(">Bq", 0xd3, value))
+        elif 0 <= value < 2 ** 64:
+            parts.append(struct.pack(">BQ", 0xcf, value))
+        else:
+            raise OverflowError(f"Целое число {value} не помещается в 64 бита")
+
+    # Заголовок с длиной: короткая форма (fix), 8-, 16- и 32-битная длина
+    @staticmethod
+    def __pack_length(length, parts, fix_code, fix_max, code8, code16, code32):
+        if fix_code is not None and length <= fix_max:
+            parts.append(struct.pack(">B", fix_code | length))
+        elif code8 is not None and length <= 0xff:
+            parts.append(struct.pack(">BB", code8, length))
+        elif length <= 0xffff:
+            parts.append(struct.pack(">BH", code16, length))
+        else:
+            parts.append(struct.pack(">BI", code32, length))
+
+    @staticmethod
+    def __pack_ext(ext_type, payload, parts):
+        length = len(payload)
+        if length <= 0xff:
+            parts.append(struct.pack(">BBb", 0xc7, length, ext_type))
+        elif length <= 0xffff:
+            parts.append(struct.pack(">BHb", 0xc8, length, ext_type))
+        else:
+            parts.append(struct.pack(">BIb", 0xc9, length, ext_type))
+        parts.append(payload)
+
+    @staticmethod
+    def __unpack(view, offset):
+        code = view[offset]
+        offset += 1
+        if code <= 0x7f:
+            return code, offset
+        if code >= 0xe0:
+            return code - 0x100, offset
+        if 0xa0 <= code <= 0xbf:
+            return MessageCodec.__unpack_str(view, offset, code & 0x1f)
+        if 0x90 <= code <= 0x9f:
+            return MessageCodec.__unpack_list(view, offset, code & 0x0f)
+        if 0x80 <= code <= 0x8f:
+            return MessageCodec.__unpack_dict(view, offset, code & 0x0f)
+        if code == 0xc0:
+            return None, offset
+        if code == 0xc2:
+            return False, offset
+        if code == 0xc3:
+            return True, offset
+        if code in MessageCodec.__FIXED_FORMATS:
+            fmt = MessageCodec.__FIXED_FORMATS[code]
+            return struct.unpack_from(fmt, view, offset)[0], offset + struct.calcsize(fmt)
+        if code in MessageCodec.__LENGTH_FORMATS:
+            kind, fmt = MessageCodec.__LENGTH_FORMATS[code]
+            length = struct.unpack_from(fmt, view, offset)[0]
+            offset += struct.calcsize(fmt)
+            if kind == "str":
+                return MessageCodec.__unpack_str(view, offset, length)
+            if kind == "bytes":
+                return bytes(view[offset:offset + length]), offset + length
+            if kind == "list":
+                return MessageCodec.__unpack_list(view, offset, length)
+            if kind == "dict":
+                return MessageCodec.__unpack_dict(view, offset, length)
+            ext_type = struct.unpack_from(">b", view, offset)[0]
+            offset += 1
+            return MessageCodec.__unpack_ext(ext_type, view[offset:offset + length]), offset + length
+        raise ValueError(f"Неизвестный код типа в сообщении: {code:#x}")
+
+    @staticmethod
+    def __unpack_str(view, offset, length):
+        return str(view[offset:offset + length], 'utf-8'), offset + length
+
+    @staticmethod
+    def __unpack_list(view, offset, length):
+        items = []
+        for _ in range(length):
+            item, offset = MessageCodec.__unpack(view, offset)
+            items.append(item)
+        return items, offset
+
+    @staticmethod
+    def __unpack_dict(view, offset, length):
+        result = {}
+        for _ in range(length):
+            key, offset = MessageCodec.__unpack(view, offset)
+            value, offset = MessageCodec.__unpack(view, offset)
+            result[key] = value
+        return result, offset
+
+    @staticmethod
+    def __unpack_ext(ext_type, payload):
+        if ext_type == MessageCodec.EXT_TUPLE:
+            return tuple(MessageCodec.decode(payload))
+        if ext_type == MessageCodec.EXT_NDARRAY:
+            dtype, shape, data = MessageCodec.decode(payload)
+            # Массив - представление над полученным буфером без копирования данных
+            return np.frombuffer(data, dtype=MessageCodec.__restore_dtype(dtype)).reshape(shape)
+        raise ValueError(f"Неизвестный тип-расширение в сообщении: {ext_type}")
+
+    # Описание типа элементов массива NumPy для передачи: строка типа (например, "<f8"), для структурированного
+    # типа - имена, типы и смещения полей и размер элемента (выравнивание и промежутки между полями сохраняются,
+    # в отличие от dtype.descr с безымянными полями-заполнителями), для поля-подмассива - тип и форма подмассива
+    @staticmethod
+    def __describe_dtype(dtype):
+        if dtype.subdtype is not None:
+            base, shape = dtype.subdtype
+            return {"base": MessageCodec.__describe_dtype(base), "shape": list(shape)}
+        if dtype.fields is None:
+            return dtype.str
+        return {"names": list(dtype.names),
+                "formats": [MessageCodec.__describe_dtype(dtype.fields[name][0]) for name in dtype.names],
+                "offsets": [dtype.fields[name][1] for name in dtype.names],
+                "itemsize": dtype.itemsize}
+
+    # Тип элементов массива NumPy по описанию из __describe_dtype
+    @staticmethod
+    def __restore_dtype(description):
+        if isinstance(description, str):
+            return np.dtype(description)
+        if "shape" in description:
+            return np.dtype((MessageCodec.__restore_dtype(description["base"]), tuple(description["shape"])))
+        field_formats = [MessageCodec.__restore_dtype(field_format) for field_format in description["formats"]]
+        return np.dtype({"names": description["names"],
+                         "formats": field_formats,
+                         "offsets": description["offsets"],
+                         "itemsize": description["itemsize"]})
@@ -0,0 +1,128 @@
+import atexit
+import queue
+import threading
+import time
+from pymongo.errors import BulkWriteError, PyMongoError
+
+
+# Отложенная пакетная запись документов в MongoDB: документы копятся в очереди ограниченного размера и записываются
+# в отдельном потоке через insert_many(ordered=False) - при наборе пакета или по истечении интервала
+class MongoBatchWriter:
+    MAX_BATCH_SIZE = 500  # Макс. число документов в одном insert_many
+    FLUSH_INTERVAL = 1  # Макс. время ожидания документа в очереди до записи в секундах
+    MAX_PENDING = 100000  # Макс. число документов в очереди
+    PUT_TIMEOUT = 1  # Сколько ждать места в заполненной очереди, прежде чем отбросить документ, в секундах
+
+    __STOP = object()  # Признак остановки потока записи в очереди
+
+    # index_keys - ключи индекса, который создаётся в каждой коллекции перед первой записью в неё (или None)
+    def __init__(self, client, index_keys=None):
+        self.__client = client
+        self.__index_keys = index_keys
+        self.__indexed_collections = set()  # Коллекции, в которых индекс уже создан
+        self.__collection_indexes = {}  # Индексы отдельных коллекций: (имя БД, имя коллекции) -> (ключи, параметры)
+        self.__queue = queue.Queue(maxsize=MongoBatchWriter.MAX_PENDING)
+        self.__counters_lock = threading.Lock()
+        self.__pending = 0  # Документы, принятые к записи, но ещё не записанные
+        self.__written = 0
+        self.__dropped = 0  # Документы, отброшенные из-за переполнения очереди или ошибки записи
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__thread.start()
+        atexit.register(self.stop)
+
+    # Создавать в коллекции вместо индекса index_keys индекс с другими ключами и параметрами (например,
+    # expireAfterSeconds для автоматического удаления документов). Вызывается до первой записи в коллекцию
+    def set_collection_index(self, db_name, collection_name, index_keys, **index_options):
+        self.__collection_indexes[(db_name, collection_name)] = (index_keys, index_options)
+
+    # Добавить документ в очередь на запись (результат - False, если очередь заполнена и документ отброшен)
+    # Если очередь заполнена, вызывающий поток ждёт до PUT_TIMEOUT секунд (замедляется до скорости записи в БД)
+    def write(self, db_name, collection_name, document):
+        if self.__stopped:
+            return False
+        with self.__counters_lock:
+            self.__pending += 1
+        try:
+            self.__queue.put((db_name, collection_name, document), timeout=MongoBatchWriter.PUT_TIMEOUT)
+        except queue.Full:
+            with self.__counters_lock:
+                self.__pending -= 1
+                self.__dropped += 1
+            return False
+        return True
+
+    # Записать все документы, добавленные в очередь до этого вызова (блокирует до окончания записи)
+    def flush(self):
+        if self.__stopped:
+            return
+        flushed_event = threading.Event()
+        self.__queue.put(flushed_event)
+        flushed_event.wait()
+
+    # Записать оставшиеся документы и остановить поток записи (при завершении программы)
+    def stop(self):
+        if self.__stopped:
+            return
+        self.__stopped = True
+        self.__queue.put(MongoBatchWriter.__STOP)
+        self.__thread.join()
+
+    # Число документов в очереди, записанных и отброшенных документов
+    def get_statistics(self):
+        with self.__counters_lock:
+            return {"pending": self.__pending, "written": self.__written, "dropped": self.__dropped}
+
+    # Цикл записи документов пакетами (выполняется в отдельном потоке)
+    def __write_loop(self):
+        batch = []
+        flush_time = None  # Время, к которому нужно записать первый документ пакета
+        while True:
+            timeout = None if flush_time is None else max(0.0, flush_time - time.monotonic())
+            try:
+                item = self.__queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Истёк интервал записи
+            if isinstance(item, tuple):
+                batch.append(item)
+                if flush_time is None:
+                    flush_time = time.monotonic() + MongoBatchWriter.FLUSH_INTERVAL
+                if len(batch) < MongoBatchWriter.MAX_BATCH_SIZE:
+                    continue
+            self.__write_batch(batch)
+            batch = []
+            flush_time = None
+            if isinstance(item, threading.Event):
+                item.set()  # Запрос flush() выполнен
+            elif item is MongoBatchWriter.__STOP:
+                return
+
+    # Записать пакет документов (документы разных коллекций записываются отдельными insert_many)
+    def __write_batch(self, batch):
+        if not batch:
+            return
+        collections = {}
+        for db_name, collection_name, document in batch:
+            collections.setdefault((db_name, collection_name), []).append(document)
+        for (db_name, collection_name), documents in collections.items():
+            failed_count = 0
+            try:
+                collection = self.__client[db_name][collection_name]
+                if (db_name, collection_name) not in self.__indexed_collections:
+                    index_keys, index_options = self.__collection_indexes.get((db_name, collection_name),
+                                                                              (self.__index_keys, {}))
+                    if index_keys is not None:
+                        collection.create_index(index_keys, **index_options)  # Ничего не делает, если индекс уже есть
+                    self.__indexed_collections.add((db_name, collection_name))
+                collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # При ordered=False остальные документы пакета записаны
+                failed_count = min(len(e.details.get("writeErrors", [])), len(documents))
+                print(f"Ошибка записи документов в коллекцию {collection_name}: не записано {failed_count}")
+            except PyMongoError as e:
+                failed_count = len(documents)
+                print(f"Ошибка записи документов в коллекцию {collection_name}: {e}")
+            with self.__counters_lock:
+                self.__pending -= len(documents)
+                self.__written += len(documents) - failed_count
+                self.__dropped += failed_count
@@ -0,0 +1,105 @@
+import os
+import pynvml
+from pynvraw import api, get_phys_gpu
+from Tracer import Tracer
+
+
+# Работа с реальными GPU NVIDIA: чтение сенсоров и Power Limit через pynvml (NVML), напряжения - через pynvraw,
+# изменение смещения частот - через NVIDIA Inspector. Методы принимают индекс GPU в NVML
+# (тот же интерфейс у SimulatedGpuBackend)
+class NvmlGpuBackend:
+    NVIDIA_INSPECTOR_PATH = "C:\\NVIDIA_Inspector_1.9.8.7_Beta\\nvidiaInspector.exe"
+    # Параметры NVIDIA Inspector (индекс GPU, P-State, смещение)
+    NVIDIA_INSPECTOR_GPU_CLOCK_OFFSET_OPTIONS = "-setBaseClockOffset:{},0,{}"
+    NVIDIA_INSPECTOR_MEM_CLOCK_OFFSET_OPTIONS = "-setMemoryClockOffset:{},0,{}"
+
+    def __init__(self):
+        self.__handles = {}  # Индекс GPU -> дескриптор pynvml
+        self.__pynvraw_handles = {}  # Индекс GPU -> дескриптор pynvraw
+
+    def init(self):
+        pynvml.nvmlInit()
+
+    def shutdown(self):
+        pynvml.nvmlShutdown()
+
+    def get_device_count(self):
+        return pynvml.nvmlDeviceGetCount()
+
+    # Дескриптор GPU для pynvml (запрашивается один раз)
+    def __get_handle(self, device_index):
+        handle = self.__handles.get(device_index)
+        if handle is None:
+            handle = self.__handles[device_index] = pynvml.nvmlDeviceGetHandleByIndex(device_index)
+        return handle
+
+    # Загрузка GPU и контроллера памяти в %
+    def get_utilization_rates(self, device_index):
+        util = pynvml.nvmlDeviceGetUtilizationRates(self.__get_handle(device_index))
+        return util.gpu, util.memory
+
+    # Используемая память в байтах
+    def get_memory_used(self, device_index):
+        return pynvml.nvmlDeviceGetMemoryInfo(self.__get_handle(device_index)).used
+
+    def get_temperature(self, device_index):
+        return pynvml.nvmlDeviceGetTemperature(self.__get_handle(device_index), pynvml.NVML_TEMPERATURE_GPU)
+
+    def get_fan_speed(self, device_index):
+        return pynvml.nvmlDeviceGetFanSpeed(self.__get_handle(device_index))
+
+    def get_gpu_clock(self, device_index):
+        return pynvml.nvmlDeviceGetClockInfo(self.__get_handle(device_index), pynvml.NVML_CLOCK_GRAPHICS)
+
+    # Частота памяти в MHz (эффективная частота DDR - в 2 раза больше)
+    def get_memory_clock(self, device_index):
+        return pynvml.nvmlDeviceGetClockInfo(self.__get_handle(device_index), pynvml.NVML_CLOCK_MEM)
+
+    # Потребление платы в мВт
+    def get_power_usage(self, device_index):
+        return pynvml.nvmlDeviceGetPowerUsage(self.__get_handle(device_index))
+
+    # Напряжение GPU в вольтах (индекс устройства pynvraw совпадает с индексом NVML - см. GpuDevices.DEVICE_INDICES)
+    def get_core_voltage(self, device_index):
+        handle = self.__pynvraw_handles.get(device_index)
+        if handle is None:
+            handle = self.__pynvraw_handles[device_index] = get_phys_gpu(device_index).handle
+        return api.get_core_voltage(handle)
+
+    # Действующий Power Limit в мВт
+    def get_enforced_power_limit(self, device_index):
+        return pynvml.nvmlDeviceGetEnforcedPowerLimit(self.__get_handle(device_index))
+
+    # Заданный Power Limit в мВт
+    def get_power_limit(self, device_index):
+        return pynvml.nvmlDeviceGetPowerManagementLimit(self.__get_handle(device_index))
+
+    def get_default_power_limit(self, device_index):
+        return pynvml.nvmlDeviceGetPowerManagementDefaultLimit(self.__get_handle(device_index))
+
+    # Ограничения Power Limit (min, max) в мВт
+    def get_power_limit_constraints(self, device_index):
+        return pynvml.nvmlDeviceGetPowerManagementLimitConstraints(self.__get_handle(device_index))
+
+    # Min и max частоты GPU в P-State P0 в MHz
+    def get_min_max_gpu_clock(self, device_index):
+        return pynvml.nvmlDeviceGetMinMaxClockOfPState(self.__get_handle(device_index), pynvml.NVML_PSTATE_0,
+                                                       pynvml.NVML_CLOCK_GRAPHICS)
+
+    def set_power_limit(self, device_index, milliwatt_value):
+        pynvml.nvmlDeviceSetPowerManagementLimit(self.__get_handle(device_index), milliwatt_value)
+
+    def set_gpu_clock_offset(self, device_index, megahertz_value):
+        NvmlGpuBackend.__run_nvidia_inspector(
+            NvmlGpuBackend.NVIDIA_INSPECTOR_GPU_CLOCK_OFFSET_OPTIONS.format(device_index, megahertz_value))
+
+    def set_mem_clock_offset(self, device_index, megahertz_value):
+        NvmlGpuBackend.__run_nvidia_inspector(
+            NvmlGpuBackend.NVIDIA_INSPECTOR_MEM_CLOCK_OFFSET_OPTIONS.format(device_index, megahertz_value))
+
+    # Выполнить команду NVIDIA Inspector
+    @staticmethod
+    def __run_nvidia_inspector(options):
+        command = f'"{NvmlGpuBackend.NVIDIA_INSPECTOR_PATH}" {options}'
+        with Tracer.span("nvidia_inspector", "subprocess", command=command):
+            os.system(command)
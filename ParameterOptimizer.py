@@ -4,10 +4,15 @@ import optuna
 
 # Байесовская оптимизация параметров
 class ParameterOptimizer:
+    # Мин. предсказанная нормализованная энергия на кадр (предсказание регрессии может быть близким к 0 или меньше)
+    MIN_ENERGY_PER_FRAME = 0.01
+
     def __init__(self, model, alpha=0.5):
         self.model = model
         self.alpha = alpha
         self.le = None  # Будет установлен далее
+        # Модель нормализованной энергии на кадр (если установлена - вместо Power Limit в целевой функции)
+        self.energy_model = None
 
     def __objective(self, trial):
         if self.le is None:
@@ -20,6 +25,7 @@ class ParameterOptimizer:
             params[feature] = trial.suggest_float(feature, 0.0, 1.0)
         # Расчет среднего FPS по всем типам тестов
         total_fps = 0
+        total_energy_per_frame = 0
         test_types = self.le.classes_ # Закодированный категориальный признак
         for test_type_str in test_types:
             # Преобразование типа теста в числовой формат
@@ -33,9 +39,16 @@ class ParameterOptimizer:
             # Предсказание FPS
             fps = self.model.predict(input_data)[0]
             total_fps += fps
+            # Предсказание энергии на кадр
+            if self.energy_model is not None:
+                energy_per_frame = self.energy_model.predict(input_data[self.energy_model.feature_name()])[0]
+                total_energy_per_frame += max(energy_per_frame, ParameterOptimizer.MIN_ENERGY_PER_FRAME)
         # Усреднение FPS
         avg_fps = total_fps / len(test_types)
-        # Целевая функция с усредненным FPS
+        # Целевая функция с усредненным FPS и усредненной энергией на кадр (без модели энергии - с Power Limit)
+        if self.energy_model is not None:
+            avg_energy_per_frame = total_energy_per_frame / len(test_types)
+            return (avg_fps * (1 - self.alpha)) / (avg_energy_per_frame * self.alpha + 1e-9)
         power = params.get('power_limit_w', 0.5)
         return (avg_fps * (1 - self.alpha)) / (power * self.alpha + 1e-9)
 
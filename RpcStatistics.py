@@ -0,0 +1,89 @@
+import math
+import threading
+
+
+# Статистика вызовов методов через сокеты: число вызовов, число ошибок и гистограмма задержек для каждого метода
+class RpcStatistics:
+    BUCKETS_PER_OCTAVE = 8  # Число интервалов гистограммы на каждое удвоение задержки (точность процентилей ~9%)
+    MIN_LATENCY = 1e-6  # Нижняя граница гистограммы в секундах (1 мкс)
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__methods = {}  # Имя метода -> [число вызовов, число ошибок, сумма задержек, max задержка, гистограмма]
+
+    # Записать результат одного вызова метода (задержка в секундах)
+    def record(self, method_name, latency, error=False):
+        bucket = RpcStatistics.__get_bucket(latency)
+        with self.__lock:
+            method_statistics = self.__methods.get(method_name)
+            if method_statistics is None:
+                method_statistics = self.__methods[method_name] = [0, 0, 0.0, 0.0, {}]
+            method_statistics[0] += 1
+            if error:
+                method_statistics[1] += 1
+            method_statistics[2] += latency
+            method_statistics[3] = max(method_statistics[3], latency)
+            histogram = method_statistics[4]
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    # Сбросить накопленную статистику
+    def reset(self):
+        with self.__lock:
+            self.__methods.clear()
+        return True
+
+    # Получить статистику по всем методам (задержки в миллисекундах)
+    def get_statistics(self):
+        with self.__lock:
+            methods = {name: (count, errors, total, maximum, dict(histogram))
+                       for name, (count, errors, total, maximum, histogram) in self.__methods.items()}
+        result = {}
+        for method_name, (count, errors, total, maximum, histogram) in methods.items():
+            result[method_name] = {
+                "count": count,
+                "errors": errors,
+                "mean_ms": total / count * 1000,
+                "p50_ms": RpcStatistics.__get_percentile(histogram, count, 0.50, maximum) * 1000,
+                "p95_ms": RpcStatistics.__get_percentile(histogram, count, 0.95, maximum) * 1000,
+                "p99_ms": RpcStatistics.__get_percentile(histogram, count, 0.99, maximum) * 1000,
+                "max_ms": maximum * 1000,
+                "total_ms": total * 1000
+            }
+        return result
+
+    # Сформировать текстовый отчёт по статистике (результату get_statistics())
+    @staticmethod
+    def format_statistics(statistics, title):
+        lines = ["=" * 50, title]
+        if not statistics:
+            lines.append("  Вызовов не было")
+        # Сначала методы, занимающие больше всего времени
+        for method_name, method_statistics in sorted(statistics.items(), key=lambda item: -item[1]["total_ms"]):
+            lines.append(f"  {method_name}: вызовов {method_statistics['count']}, ошибок {method_statistics['errors']}, "
+                         f"среднее {method_statistics['mean_ms']:.2f} мс, p50 {method_statistics['p50_ms']:.2f} мс, "
+                         f"p95 {method_statistics['p95_ms']:.2f} мс, p99 {method_statistics['p99_ms']:.2f} мс, "
+                         f"max {method_statistics['max_ms']:.2f} мс, всего {method_statistics['total_ms'] / 1000:.2f} с")
+        return "\n".join(lines)
+
+    # Номер интервала гистограммы для задержки (интервалы растут в геометрической прогрессии)
+    @staticmethod
+    def __get_bucket(latency):
+        if latency <= RpcStatistics.MIN_LATENCY:
+            return 0
+        return int(math.log2(latency / RpcStatistics.MIN_LATENCY) * RpcStatistics.BUCKETS_PER_OCTAVE) + 1
+
+    # Верхняя граница интервала гистограммы в секундах
+    @staticmethod
+    def __get_bucket_upper_bound(bucket):
+        return RpcStatistics.MIN_LATENCY * 2 ** (bucket / RpcStatistics.BUCKETS_PER_OCTAVE)
+
+    # Оценка процентиля задержки по гистограмме (не больше максимальной задержки)
+    @staticmethod
+    def __get_percentile(histogram, count, percentile, maximum):
+        rank = math.ceil(count * percentile)
+        cumulative_count = 0
+        for bucket in sorted(histogram):
+            cumulative_count += histogram[bucket]
+            if cumulative_count >= rank:
+                return min(RpcStatistics.__get_bucket_upper_bound(bucket), maximum)
+        return maximum
@@ -1,44 +1,63 @@
+import contextlib
 import subprocess
 import os
 import sys
 import threading
+import time
 from datetime import datetime
 import psutil
+from LogWriter import LogWriter
+from SocketServer import SocketServer
 
 
 class RunAllSystems:
     # !!! Замените на ваш путь до python, если нужно
-    PYTHON_PATH = os.path.dirname(sys.executable) + r'\python.exe'
+    PYTHON_PATH = sys.executable
     sw_minimize = 6  # Значение константы SW_MINIMIZE (в Windows)
 
-    # Запись потока вывода в файл
+    READY_TIMEOUT = 60  # Макс. время ожидания готовности систем перед запуском главного приложения в секундах
+    NOT_READY_EXIT_CODE = 1  # Код завершения, если системы не готовы (главное приложение не запускается)
+    RESTART_DELAY = 0.1  # Задержка перед перезапуском упавшей системы в секундах
+    MAX_RESTART_DELAY = 30  # Макс. задержка перед перезапуском (удваивается при каждом падении подряд)
+    STABLE_RUN_TIME = 60  # Время работы системы в секундах, после которого задержка перезапуска сбрасывается
+
+    # Передача потока вывода процесса в лог (ready_event устанавливается, когда сервер системы сообщил о готовности)
+    # stream_name - "stdout" или "stderr", запись в файл и вывод в консоль выполняет log_writer
     @staticmethod
-    def log_stream(stream, log_file):
-        with open(log_file, 'a', encoding='utf-8', errors='replace') as log:
-            for line in iter(stream.readline, b''):
-                try:
-                    # Попытка декодировать как UTF-8
-                    log_str = line.decode('utf-8').rstrip('\n') # Убрать лишний перевод строки, UTF-8
-                except UnicodeDecodeError:
-                    try:
-                        # Если UTF-8 не сработал, использовать другую кодировку
-                        log_str = line.decode('cp1251').rstrip('\n')  # Убрать лишний перевод строки, Windows-1251
-                    except UnicodeDecodeError:
-                        # Если ничего не помогло, сохранить как есть с заменой нечитаемых символов
-                        log_str = line.decode('utf-8', errors='replace').rstrip('\n')
-                log.write(log_str)
-                print(log_str)
+    def log_stream(stream, log_writer, stream_name, pid, ready_event=None):
+        for line in iter(stream.readline, b''):
+            line = line.rstrip(b'\r\n')  # Перевод строки добавляет log_writer
+            try:
+                # Попытка декодировать как UTF-8
+                log_str = line.decode('utf-8')
+            except UnicodeDecodeError:
+                # Если UTF-8 не сработал, использовать Windows-1251 (с заменой нечитаемых символов)
+                log_str = line.decode('cp1251', errors='replace')
+            if ready_event is not None and log_str.startswith(SocketServer.READY_MARKER):
+                ready_event.set()
+            log_writer.write(log_str, stream_name, pid)
         stream.close()
 
+    # Открыть лог приложения и записать в него время начала работы
     @staticmethod
-    def run_all_systems(python_path, app_names):
-        processes = []  # Список для хранения всех запущенных процессов
-        for app_name in app_names:
-            log_file = f'{os.path.splitext(app_name)[0]}.log'  # Лог-файл для каждого приложения
-            # Открыть лог-файл для записи времени начала работы
-            with open(log_file, 'a', encoding='utf-8') as log:
-                start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                log.write(f"[Начало логирования: {start_time}]\n")
+    def __start_log(app_name):
+        log_file = f'{os.path.splitext(app_name)[0]}.log'  # Лог-файл для каждого приложения
+        log_writer = LogWriter(log_file, app_name)
+        RunAllSystems.__write_log_title(log_writer, "Начало логирования")
+        return log_writer
+
+    # Записать в лог строку с заголовком и текущим временем (без вывода в консоль)
+    @staticmethod
+    def __write_log_title(log_writer, title):
+        start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        log_writer.write(f"[{title}: {start_time}]", "supervisor", echo=False)
+
+    # Запустить приложение, перенаправляя stdout и stderr в лог-файл (в Windows - в отдельном свёрнутом окне консоли)
+    @staticmethod
+    def start_process(python_path, app_name, log_writer, ready_event=None):
+        # Вывод без буферизации, чтобы строки лога и сигнал готовности приходили сразу
+        env = dict(os.environ, PYTHONUNBUFFERED='1')
+        if os.name == 'nt':
             # Параметры для свёрнутого окна
             startupinfo = subprocess.STARTUPINFO()
             startupinfo.dwFlags = subprocess.STARTF_USESHOWWINDOW
@@ -49,14 +68,37 @@ class RunAllSystems:
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 creationflags=subprocess.CREATE_NEW_CONSOLE,  # Открыть новое окно консоли
-                startupinfo=startupinfo
+                startupinfo=startupinfo,
+                env=env
             )
-            # Создать отдельные потоки для логирования stdout и stderr
-            stdout_thread = threading.Thread(target=RunAllSystems.log_stream, args=(process.stdout, log_file))
-            stderr_thread = threading.Thread(target=RunAllSystems.log_stream, args=(process.stderr, log_file))
-            # Запустить потоки
-            stdout_thread.start()
-            stderr_thread.start()
+        else:
+            process = subprocess.Popen([python_path, app_name], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        # Создать отдельные потоки для логирования stdout и stderr
+        stdout_thread = threading.Thread(target=RunAllSystems.log_stream,
+                                         args=(process.stdout, log_writer, "stdout", process.pid, ready_event))
+        stderr_thread = threading.Thread(target=RunAllSystems.log_stream,
+                                         args=(process.stderr, log_writer, "stderr", process.pid))
+        # Запустить потоки
+        stdout_thread.start()
+        stderr_thread.start()
+        return process
+
+    # Завершить процесс и все его дочерние процессы
+    @staticmethod
+    def terminate_process(process):
+        with contextlib.suppress(psutil.NoSuchProcess):
+            parent = psutil.Process(process.pid)
+            for child in parent.children(recursive=True):
+                child.terminate()
+        process.terminate()
+        process.wait()
+
+    @staticmethod
+    def run_all_systems(python_path, app_names):
+        processes = []  # Список для хранения всех запущенных процессов
+        for app_name in app_names:
+            log_writer = RunAllSystems.__start_log(app_name)
+            process = RunAllSystems.start_process(python_path, app_name, log_writer)
             print(f"Запущено приложение: {app_name}")
             processes.append(process)
         return processes
@@ -80,11 +122,80 @@ class RunAllSystems:
         for proc in processes:
             if proc != main_proc and proc.poll() is None:  # Если процесс еще работает
                 print(f"Завершение процесса: {' '.join(proc.args)}")
-                # Завершить процесс и все его дочерние процессы
-                parent = psutil.Process(proc.pid)
-                for child in parent.children(recursive=True):
-                    child.terminate()
-                proc.terminate()
-                proc.wait()
+                RunAllSystems.terminate_process(proc)
         print("Все процессы завершены.")
         return True
+
+    # Режим супервизора: запустить системы параллельно, дождаться сигнала готовности от сервера каждой из них,
+    # затем запустить главное приложение. Упавшие системы перезапускаются с экспоненциально растущей задержкой.
+    # После завершения главного приложения системы останавливаются. Результат - код завершения главного приложения
+    # (NOT_READY_EXIT_CODE, если не все системы сообщили о готовности за READY_TIMEOUT - главное приложение
+    # не запускается, системы останавливаются)
+    @staticmethod
+    def run_supervised(python_path, system_names, main_name):
+        stop_event = threading.Event()
+        ready_events = {system_name: threading.Event() for system_name in system_names}
+        threads = [threading.Thread(target=RunAllSystems.__supervise,
+                                    args=(python_path, system_name, ready_event, stop_event))
+                   for system_name, ready_event in ready_events.items()]
+        for thread in threads:
+            thread.start()
+        return_code = RunAllSystems.NOT_READY_EXIT_CODE
+        try:
+            # Ожидание готовности всех систем (общий срок для всех систем)
+            start_time = time.perf_counter()
+            deadline = time.monotonic() + RunAllSystems.READY_TIMEOUT
+            not_ready_system_names = [system_name for system_name, ready_event in ready_events.items()
+                                      if not ready_event.wait(max(0.0, deadline - time.monotonic()))]
+            if not_ready_system_names:
+                print(f"Системы {', '.join(not_ready_system_names)} не сообщили о готовности за "
+                      f"{RunAllSystems.READY_TIMEOUT} с. {main_name} не запущено, остановка систем...")
+            else:
+                print(f"Запуск систем занял {(time.perf_counter() - start_time) * 1000:.0f} мс")
+                main_process = RunAllSystems.start_process(python_path, main_name,
+                                                           RunAllSystems.__start_log(main_name))
+                print(f"Запущено приложение: {main_name}")
+                print(f"Ожидание завершения {main_name}...")
+                return_code = main_process.wait()  # Ждать завершения главного процесса
+                print(f"Главный процесс завершён с кодом {return_code}. Остановка систем...")
+        finally:
+            # Каждый поток супервизора сам завершает процесс своей системы
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+        print("Все процессы завершены.")
+        return return_code
+
+    # Запуск системы и её перезапуск после падения (выполняется в отдельном потоке для каждой системы)
+    @staticmethod
+    def __supervise(python_path, system_name, system_ready_event, stop_event):
+        log_writer = RunAllSystems.__start_log(system_name)
+        restart_delay = RunAllSystems.RESTART_DELAY
+        while not stop_event.is_set():
+            ready_event = threading.Event()  # Готовность именно этого запуска процесса
+            start_time = time.perf_counter()
+            process = RunAllSystems.start_process(python_path, system_name, log_writer, ready_event)
+            print(f"Запущено приложение: {system_name}")
+            # Ожидание сигнала готовности сервера системы, затем - завершения процесса или остановки супервизора
+            ready = False
+            while process.poll() is None and not stop_event.is_set():
+                if ready:
+                    stop_event.wait(0.1)
+                elif ready_event.wait(0.01):
+                    ready = True
+                    print(f"Система {system_name} готова через {(time.perf_counter() - start_time) * 1000:.0f} мс")
+                    system_ready_event.set()
+            if stop_event.is_set():
+                if process.poll() is None:  # Если процесс еще работает
+                    print(f"Завершение процесса: {system_name}")
+                    RunAllSystems.terminate_process(process)
+                break
+            return_code = process.returncode
+            if time.perf_counter() - start_time >= RunAllSystems.STABLE_RUN_TIME:
+                restart_delay = RunAllSystems.RESTART_DELAY  # Система долго работала без падений
+            print(f"Система {system_name} завершилась с кодом {return_code}. "
+                  f"Перезапуск через {restart_delay * 1000:.0f} мс...")
+            if stop_event.wait(restart_delay):
+                break
+            RunAllSystems.__write_log_title(log_writer, "Перезапуск")
+            restart_delay = min(restart_delay * 2, RunAllSystems.MAX_RESTART_DELAY)
@@ -1,13 +1,13 @@
+import sys
 from RunAllSystems import RunAllSystems
 
-procs = RunAllSystems.run_all_systems(RunAllSystems.PYTHON_PATH,
+# Запустить системы под наблюдением супервизора (с перезапуском при падении), после их готовности запустить
+# главное приложение, а после его завершения остановить системы
+sys.exit(RunAllSystems.run_supervised(RunAllSystems.PYTHON_PATH,
                                       [
                                           'DataAnalysisSystem.py',
                                           'SensorDataCollectionSystem.py',
                                           'UndervoltingGpuSystem.py',
-                                          'BenchmarkTestSystem.py',
-                                          'MainAnalyseData.py'
-                                      ])
-
-# Ждать завершения главного процесса и остановить остальные процессы
-RunAllSystems.wait_and_terminate(procs, 'MainAnalyseData.py')
+                                          'BenchmarkTestSystem.py'
+                                      ],
+                                      'MainAnalyseData.py'))
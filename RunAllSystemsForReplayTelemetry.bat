@@ -0,0 +1,2 @@
+py .\RunAllSystemsForReplayTelemetry.py
+pause
\ No newline at end of file
@@ -0,0 +1,11 @@
+import sys
+from RunAllSystems import RunAllSystems
+
+# Запустить систему сбора данных с сенсоров под наблюдением супервизора, после её готовности запустить
+# воспроизведение записанных данных (GPU не нужен при GpuDevices.BACKEND = "simulated"), а после его завершения
+# остановить систему
+sys.exit(RunAllSystems.run_supervised(RunAllSystems.PYTHON_PATH,
+                                      [
+                                          'SensorDataCollectionSystem.py'
+                                      ],
+                                      'MainReplayTelemetry.py'))
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+import numpy as np
+from SampleBuffer import SampleBuffer
+
+
+# Потоковая агрегация значений с сенсоров GPU по окнам времени длительностью window_ms мс
+# Для каждого окна рассчитываются среднее, min, max, стандартное отклонение и 95-й перцентиль каждого значения
+# Документ окна имеет ту же компактную схему, что и документ значения (под короткими ключами - средние значения),
+# и дополнительные поля "<ключ>_min", "<ключ>_max", "<ключ>_std", "<ключ>_p95", "n" (число значений) и "w" (длина окна)
+class SampleAggregator:
+    # capacity - ожидаемое макс. число значений в окне (при превышении буфер окна увеличивается)
+    def __init__(self, window_ms, capacity):
+        self.__window_ms = window_ms
+        field_names = SampleBuffer.DTYPE.names
+        self.__run_positions = [field_names.index(field_name) for field_name in SampleBuffer.RUN_FIELDS]
+        # Агрегируемые поля - меняющиеся значения (кроме Timestamp), записываемые в документ значения
+        self.__value_positions = [position for position in range(1, len(field_names))
+                                  if field_names[position] in SampleBuffer.SAMPLE_KEYS]
+        self.__short_keys = [SampleBuffer.SAMPLE_KEYS[field_names[position]] for position in self.__value_positions]
+        self.__values = np.empty((max(1, capacity), len(self.__value_positions)), dtype=np.float64)
+        self.__count = 0
+        self.__window = None  # Номер текущего окна (время начала окна в мс / window_ms)
+        self.__run_values = None  # Значения RUN_FIELDS значений текущего окна
+        self.__run_timestamp = None  # Время первого значения текущего окна
+
+    # Добавить значение (кортеж полей в порядке SampleBuffer.DTYPE)
+    # Результат - документ завершённого окна (если значение относится к новому окну или к новому проходу) или None
+    # get_run_id - см. SampleBuffer.to_documents
+    def add(self, sample, get_run_id):
+        window = int(sample[0] * 1000 // self.__window_ms)
+        run_values = tuple(sample[position] for position in self.__run_positions)
+        document = None
+        if self.__count > 0 and (window != self.__window or run_values != self.__run_values):
+            document = self.pop_document(get_run_id)
+        if self.__count == 0:
+            self.__window = window
+            self.__run_values = run_values
+            self.__run_timestamp = sample[0]
+        if self.__count == len(self.__values):
+            self.__values = np.concatenate((self.__values, np.empty_like(self.__values)))
+        self.__values[self.__count] = [sample[position] for position in self.__value_positions]
+        self.__count += 1
+        return document
+
+    # Документ текущего (незавершённого) окна или None, если в окне нет значений
+    def pop_document(self, get_run_id):
+        if self.__count == 0:
+            return None
+        values = self.__values[:self.__count]
+        window_start = self.__window * self.__window_ms / 1000
+        document = {"run": get_run_id(self.__run_values, self.__run_timestamp),
+                    "t": datetime.fromtimestamp(window_start, timezone.utc),
+                    "n": self.__count,
+                    "w": self.__window_ms}
+        statistics = {
+            "": values.mean(axis=0),
+            "_min": values.min(axis=0),
+            "_max": values.max(axis=0),
+            "_std": values.std(axis=0),
+            "_p95": np.percentile(values, 95, axis=0)
+        }
+        for suffix, statistic_values in statistics.items():
+            document.update(zip((short_key + suffix for short_key in self.__short_keys), statistic_values.tolist()))
+        self.__count = 0
+        return document
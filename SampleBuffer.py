@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timezone
+import numpy as np
+
+
+# Буфер значений с сенсоров GPU: заранее выделенный структурированный массив NumPy с постоянной схемой
+# (без словаря с длинными ключами на каждое значение). Документы MongoDB формируются сразу для всего буфера
+# Схема хранения: параметры работы GPU, постоянные в течение прохода теста, - в документе прохода,
+# в документах значений - только меняющиеся значения под короткими ключами и ссылка на документ прохода
+class SampleBuffer:
+    # Схема значения (названия и порядок полей совпадают с TelemetryRingBuffer.RECORD_DTYPE: то же значение
+    # записывается и в кольцевой буфер в разделяемой памяти)
+    DTYPE = np.dtype([
+        ("Timestamp", np.float64),  # Время получения значения (Unix time в секундах)
+        ("GPU Clock [MHz]", np.int32),
+        ("Memory Clock [MHz]", np.float64),
+        ("GPU Temperature [°C]", np.int32),
+        ("Fan Speed [%]", np.int32),
+        ("Fan Speed [RPM]", np.int32),
+        ("Memory Used [MB]", np.float64),
+        ("GPU Load [%]", np.int32),
+        ("Memory Controller Load [%]", np.int32),
+        ("Board Power Draw [W]", np.float64),
+        ("Power Consumption [% TDP]", np.float64),
+        ("Power Limit [W]", np.float64),
+        ("TDP Limit [%]", np.float64),
+        ("Min GPU Clock Frequency [MHz]", np.int32),
+        ("Max GPU Clock Frequency [MHz]", np.int32),
+        ("GPU Clock Frequency Offset [MHz]", np.int32),
+        ("Memory Clock Offset [MHz]", np.int32),
+        ("GPU Voltage [V]", np.float64),
+        ("GPU Index", np.int32)  # Индекс GPU в NVML (при опросе нескольких GPU)
+    ])
+
+    # Поля, которые не меняются в течение прохода теста (записываются один раз в документ прохода в коллекции
+    # RUNS_COLLECTION, вместе с типом теста бенчмарка, именем коллекции и временем начала прохода)
+    # Проход относится к одному GPU: индекс GPU также хранится в документе прохода
+    RUN_FIELDS = ("Power Limit [W]", "TDP Limit [%]", "Min GPU Clock Frequency [MHz]", "Max GPU Clock Frequency [MHz]",
+                  "GPU Clock Frequency Offset [MHz]", "Memory Clock Offset [MHz]", "GPU Index")
+    RUNS_COLLECTION = "runs"
+    # Коллекция итогов проходов по энергии (EnergyAccumulator: энергия, средняя мощность, энергия на кадр)
+    RUN_ENERGY_COLLECTION = "run_energy"
+    # Параметры коллекций временных рядов MongoDB: время значения и метаданные - параметры прохода (to_time_series_meta)
+    TIME_SERIES_OPTIONS = {"timeField": "t", "metaField": "meta", "granularity": "seconds"}
+    # Суффикс имени коллекции исходных значений (при записи с агрегацией по окнам времени - см. SampleAggregator)
+    RAW_COLLECTION_SUFFIX = " raw"
+    # Короткие ключи документов значений с сенсоров (кроме ключа "run" - идентификатора документа прохода)
+    SAMPLE_KEYS = {
+        "Timestamp": "t",
+        "GPU Clock [MHz]": "gc",
+        "Memory Clock [MHz]": "mc",
+        "GPU Temperature [°C]": "temp",
+        "Fan Speed [%]": "fan",
+        "Fan Speed [RPM]": "rpm",
+        "Memory Used [MB]": "mem",
+        "GPU Load [%]": "load",
+        "Memory Controller Load [%]": "mcl",
+        "Board Power Draw [W]": "pw",
+        "Power Consumption [% TDP]": "ptdp",
+        "GPU Voltage [V]": "v",
+        "FPS": "fps",  # Записывается после теста по логу бенчмарка
+        "Efficiency [FPS/W]": "eff"
+    }
+
+    def __init__(self, capacity):
+        self.__samples = np.empty(capacity, dtype=SampleBuffer.DTYPE)
+        self.__count = 0
+
+    # Добавить значение (кортеж полей в порядке DTYPE), результат - True, если буфер заполнен
+    def append(self, sample):
+        self.__samples[self.__count] = sample
+        self.__count += 1
+        return self.__count == len(self.__samples)
+
+    def __len__(self):
+        return self.__count
+
+    # Документы MongoDB для всех значений буфера, буфер очищается (get_run_id - см. to_documents)
+    def pop_documents(self, get_run_id):
+        documents = SampleBuffer.to_documents(self.__samples[:self.__count].tolist(), get_run_id)
+        self.__count = 0
+        return documents
+
+    # Компактные документы MongoDB для списка значений (кортежей полей в порядке DTYPE): только меняющиеся значения
+    # под короткими ключами (SAMPLE_KEYS) и ссылка на документ прохода с параметрами работы GPU (RUN_FIELDS)
+    # get_run_id(значения полей RUN_FIELDS, время значения) - идентификатор документа прохода для значения
+    # Время получения значения записывается как дата BSON (UTC, с точностью до миллисекунды)
+    @staticmethod
+    def to_documents(samples, get_run_id):
+        documents = []
+        field_names = SampleBuffer.DTYPE.names
+        run_positions = [field_names.index(field_name) for field_name in SampleBuffer.RUN_FIELDS]
+        # Позиции полей значения (кроме Timestamp), записываемых в документ значения, и их короткие ключи
+        sample_positions = [position for position in range(1, len(field_names))
+                            if field_names[position] in SampleBuffer.SAMPLE_KEYS]
+        short_keys = [SampleBuffer.SAMPLE_KEYS[field_names[position]] for position in sample_positions]
+        last_run_values, run_id = None, None
+        for sample in samples:
+            run_values = tuple(sample[position] for position in run_positions)
+            if run_values != last_run_values:  # Параметры работы GPU меняются редко (между проходами)
+                run_id = get_run_id(run_values, sample[0])
+                last_run_values = run_values
+            document = {"run": run_id,
+                        "t": datetime.fromtimestamp(round(sample[0] * 1000) / 1000, timezone.utc)}
+            document.update(zip(short_keys, (sample[position] for position in sample_positions)))
+            documents.append(document)
+        return documents
+
+    # Метаданные значения в коллекции временных рядов (вместо ссылки "run"): идентификатор прохода, тип теста бенчмарка
+    # и параметры работы GPU из документа прохода
+    @staticmethod
+    def to_time_series_meta(run_document):
+        meta = {"run": run_document["_id"], "Benchmark test type": run_document.get("Benchmark test type")}
+        meta.update((field_name, run_document.get(field_name)) for field_name in SampleBuffer.RUN_FIELDS)
+        return meta
+
+    # Полный документ для одного значения (с длинными ключами и полем "Date" - строкой с локальным временем)
+    @staticmethod
+    def to_wide_document(sample, extra_fields=None):
+        document = {"Date": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sample[0]))}
+        document.update(zip(SampleBuffer.DTYPE.names[1:], sample[1:]))
+        if extra_fields is not None:
+            document.update(extra_fields)
+        return document
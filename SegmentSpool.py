@@ -0,0 +1,231 @@
+import atexit
+import glob
+import os
+import threading
+import time
+from urllib.parse import quote, unquote
+import pyarrow as pa
+from bson import ObjectId
+
+
+# Локальное хранилище данных с сенсоров без MongoDB: документы дописываются в файлы-сегменты Arrow IPC в каталоге
+# "<FOLDER>/<имя БД>/<имя коллекции>/". Документы копятся в памяти и записываются одним сегментом (последовательная
+# запись столбцов) при наборе MAX_SEGMENT_ROWS документов, по истечении ROLL_INTERVAL или при flush()
+# Сегменты записываются в отдельном потоке (как в MongoBatchWriter): запись документа не ждёт записи файла
+# Сегмент сначала пишется во временный файл, затем переименовывается: при аварийном завершении программы
+# записанные сегменты остаются целыми, а недописанный временный файл удаляется при следующей записи в коллекцию
+# Интерфейс записи совпадает с MongoBatchWriter, чтение - отображение сегментов в память только нужных столбцов
+class SegmentSpool:
+    FOLDER = "telemetry_spool"  # Каталог хранилища
+    MAX_SEGMENT_ROWS = 10000  # Макс. число документов в одном сегменте
+    ROLL_INTERVAL = 10  # Макс. время хранения документа в памяти до записи сегмента в секундах
+    MAX_PENDING = 100000  # Макс. число документов, ожидающих записи (остальные отбрасываются)
+    SEGMENT_EXTENSION = ".arrow"
+    TEMP_EXTENSION = ".tmp"
+
+    def __init__(self, folder=None):
+        self.__folder = SegmentSpool.FOLDER if folder is None else folder
+        # Документы добавляются из потоков опроса GPU и потоков обработки вызовов, сегменты пишет поток записи
+        self.__lock = threading.Lock()
+        self.__condition = threading.Condition(self.__lock)  # Оповещение потока записи и ожидающих flush()
+        self.__pending_documents = {}  # (имя БД, имя коллекции) -> документы, ещё не записанные в сегмент
+        self.__writing_documents = {}  # (имя БД, имя коллекции) -> документы записываемого сегмента (видны при чтении)
+        self.__roll_times = {}  # (имя БД, имя коллекции) -> время, к которому нужно записать сегмент
+        self.__next_segment_numbers = {}  # (имя БД, имя коллекции) -> номер следующего сегмента (только поток записи)
+        self.__segment_tables = {}  # Путь сегмента -> таблица (сегменты не изменяются, отображение в память)
+        self.__flush_requests = 0  # Номер последнего запроса flush()
+        self.__flushed_requests = 0  # Номер последнего выполненного запроса flush()
+        self.__pending = 0  # Документы, принятые к записи, но ещё не записанные
+        self.__written = 0
+        self.__dropped = 0  # Документы, отброшенные из-за переполнения или ошибки записи файла
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__write_loop, daemon=True)
+        self.__thread.start()
+        atexit.register(self.stop)
+
+    # Индексы в сегментах не создаются (для совместимости с MongoBatchWriter)
+    def set_collection_index(self, db_name, collection_name, index_keys, **index_options):
+        pass
+
+    # Добавить документ к сегменту коллекции (результат - False, если хранилище остановлено или документов, ожидающих
+    # записи, больше MAX_PENDING и документ отброшен). Идентификаторы ObjectId сохраняются строками
+    def write(self, db_name, collection_name, document):
+        document = {key: str(value) if isinstance(value, ObjectId) else value for key, value in document.items()}
+        key = (db_name, collection_name)
+        with self.__condition:
+            if self.__stopped:
+                return False
+            if self.__pending >= SegmentSpool.MAX_PENDING:
+                self.__dropped += 1
+                return False
+            documents = self.__pending_documents.setdefault(key, [])
+            documents.append(document)
+            self.__pending += 1
+            if len(documents) == 1:
+                self.__roll_times[key] = time.monotonic() + SegmentSpool.ROLL_INTERVAL
+                self.__condition.notify_all()  # Поток записи ждёт до ближайшего времени записи сегмента
+            elif len(documents) >= SegmentSpool.MAX_SEGMENT_ROWS:
+                self.__roll_times[key] = time.monotonic()
+                self.__condition.notify_all()
+        return True
+
+    # Записать сегменты из всех документов, добавленных до этого вызова (блокирует до окончания записи)
+    def flush(self):
+        with self.__condition:
+            self.__flush_requests += 1
+            flush_request = self.__flush_requests
+            self.__condition.notify_all()
+            while self.__flushed_requests < flush_request and self.__thread.is_alive():
+                self.__condition.wait(1)
+
+    # Записать оставшиеся документы и остановить поток записи (при завершении программы)
+    def stop(self):
+        with self.__condition:
+            if self.__stopped:
+                return
+            self.__stopped = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    # Число документов, ожидающих записи, записанных и отброшенных документов
+    def get_statistics(self):
+        with self.__lock:
+            return {"pending": self.__pending, "written": self.__written, "dropped": self.__dropped}
+
+    # Столбцы columns (None - все) записанных сегментов и ещё не записанных документов коллекции в одной таблице
+    # Таблицы записанных сегментов хранятся между вызовами (при повторном чтении открываются только новые сегменты)
+    def read_collection(self, db_name, collection_name, columns=None):
+        key = (db_name, collection_name)
+        # Список сегментов и документы в памяти - под одной блокировкой (сегмент переименовывается под ней же,
+        # поэтому каждый документ попадает в результат ровно один раз)
+        with self.__lock:
+            segment_tables = {path: self.__segment_tables.get(path)
+                              for path in SegmentSpool.__list_segments(self.__folder, db_name, collection_name)}
+            documents = self.__writing_documents.get(key, []) + self.__pending_documents.get(key, [])
+        new_tables = {path: SegmentSpool.__read_segment(path) for path, table in segment_tables.items() if table is None}
+        if new_tables:
+            with self.__lock:
+                for path, table in new_tables.items():
+                    segment_tables[path] = self.__segment_tables.setdefault(path, table)
+        tables = [SegmentSpool.__select_columns(table, columns) for table in segment_tables.values()]
+        if documents:
+            tables.append(SegmentSpool.__select_columns(SegmentSpool.__to_table(documents), columns))
+        return SegmentSpool.__concat_tables(tables)
+
+    # Столбцы columns (None - все) всех записанных сегментов коллекции в одной таблице (пустая таблица, если
+    # коллекции нет). Сегменты отображаются в память: данные столбцов не копируются, остальные столбцы не читаются
+    @staticmethod
+    def read_table(folder, db_name, collection_name, columns=None):
+        segment_paths = SegmentSpool.__list_segments(folder, db_name, collection_name)
+        return SegmentSpool.__concat_tables([SegmentSpool.__select_columns(SegmentSpool.__read_segment(path), columns)
+                                             for path in segment_paths])
+
+    # Имена коллекций БД, в которых есть записанные сегменты
+    @staticmethod
+    def list_collections(folder, db_name):
+        db_folder = os.path.join(folder, quote(db_name, safe=""))
+        if not os.path.isdir(db_folder):
+            return []
+        return sorted(unquote(name) for name in os.listdir(db_folder)
+                      if glob.glob(os.path.join(db_folder, name, "*" + SegmentSpool.SEGMENT_EXTENSION)))
+
+    # Каталог коллекции (имена БД и коллекции кодируются: в именах коллекций есть дата с символом ":")
+    @staticmethod
+    def __get_collection_folder(folder, db_name, collection_name):
+        return os.path.join(folder, quote(db_name, safe=""), quote(collection_name, safe=" "))
+
+    # Пути записанных сегментов коллекции в порядке записи
+    @staticmethod
+    def __list_segments(folder, db_name, collection_name):
+        collection_folder = SegmentSpool.__get_collection_folder(folder, db_name, collection_name)
+        return sorted(glob.glob(os.path.join(collection_folder, "*" + SegmentSpool.SEGMENT_EXTENSION)))
+
+    @staticmethod
+    def __read_segment(path):
+        return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+    @staticmethod
+    def __select_columns(table, columns):
+        if columns is None:
+            return table
+        return table.select([column for column in columns if column in table.column_names])
+
+    # Объединить таблицы сегментов (столбцы, которых нет в части сегментов, заполняются null, а типы столбцов
+    # приводятся к общему - например, целые и дробные значения FPS)
+    @staticmethod
+    def __concat_tables(tables):
+        if not tables:
+            return pa.table({})
+        return pa.concat_tables(tables, promote_options="permissive")
+
+    # Таблица из документов (столбцы - все ключи документов, отсутствующие значения - null)
+    @staticmethod
+    def __to_table(documents):
+        keys = dict.fromkeys(key for document in documents for key in document)
+        return pa.table({key: [document.get(key) for document in documents] for key in keys})
+
+    # Цикл записи сегментов (выполняется в отдельном потоке): сегмент коллекции записывается при наборе
+    # MAX_SEGMENT_ROWS документов или по истечении ROLL_INTERVAL (в том числе без новых документов), при flush()
+    # и при остановке - сегменты всех коллекций
+    def __write_loop(self):
+        while True:
+            with self.__condition:
+                while True:
+                    flush_request = self.__flush_requests
+                    stopped = self.__stopped
+                    if stopped or flush_request > self.__flushed_requests:
+                        keys = list(self.__pending_documents)
+                        break
+                    now = time.monotonic()
+                    keys = [key for key, roll_time in self.__roll_times.items() if roll_time <= now]
+                    if keys:
+                        break
+                    self.__condition.wait(min(self.__roll_times.values()) - now if self.__roll_times else None)
+                segments = []
+                for key in keys:
+                    self.__roll_times.pop(key, None)
+                    documents = self.__pending_documents.pop(key, None)
+                    if documents:
+                        self.__writing_documents[key] = documents
+                        segments.append((key, documents))
+            for key, documents in segments:
+                self.__write_segment(key, documents)
+            with self.__condition:
+                self.__flushed_requests = max(self.__flushed_requests, flush_request)
+                self.__condition.notify_all()
+            if stopped:
+                return
+
+    # Записать документы коллекции одним сегментом (в потоке записи; файл пишется без блокировки)
+    def __write_segment(self, key, documents):
+        db_name, collection_name = key
+        try:
+            collection_folder = SegmentSpool.__get_collection_folder(self.__folder, db_name, collection_name)
+            segment_number = self.__next_segment_numbers.get(key)
+            if segment_number is None:
+                os.makedirs(collection_folder, exist_ok=True)
+                # Удалить временные файлы сегментов, недописанных при аварийном завершении, и продолжить нумерацию
+                for temp_path in glob.glob(os.path.join(collection_folder, "*" + SegmentSpool.TEMP_EXTENSION)):
+                    os.remove(temp_path)
+                segment_paths = SegmentSpool.__list_segments(self.__folder, db_name, collection_name)
+                segment_number = int(os.path.basename(segment_paths[-1]).split(".")[0]) + 1 if segment_paths else 0
+            segment_path = os.path.join(collection_folder, f"{segment_number:08d}" + SegmentSpool.SEGMENT_EXTENSION)
+            temp_path = segment_path + SegmentSpool.TEMP_EXTENSION
+            table = SegmentSpool.__to_table(documents)
+            with open(temp_path, "wb") as file:
+                with pa.ipc.new_file(file, table.schema) as writer:
+                    writer.write_table(table)
+                file.flush()
+                os.fsync(file.fileno())
+            with self.__lock:
+                os.replace(temp_path, segment_path)  # Сегмент появляется для чтения только полностью записанным
+                self.__writing_documents.pop(key, None)
+                self.__pending -= len(documents)
+                self.__written += len(documents)
+            self.__next_segment_numbers[key] = segment_number + 1
+        except (OSError, pa.ArrowException) as e:
+            with self.__lock:
+                self.__writing_documents.pop(key, None)
+                self.__pending -= len(documents)
+                self.__dropped += len(documents)
+            print(f"Ошибка записи сегмента коллекции {collection_name}: {e}")
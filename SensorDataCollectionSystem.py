@@ -1,150 +1,619 @@
 import atexit
-import pynvml
-from pynvraw import api, get_phys_gpu
-import pymongo
-from datetime import datetime
-import socket
+import importlib
+import math
 import threading
+import time
+import pymongo
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+from EnergyAccumulator import EnergyAccumulator
+from GpuDevices import GpuDevices
+from MongoBatchWriter import MongoBatchWriter
+from SampleAggregator import SampleAggregator
+from SampleBuffer import SampleBuffer
 from SocketCalls import SocketCalls
+from SocketServer import SocketServer
+from TelemetryRingBuffer import TelemetryRingBuffer
+from TelemetryReplay import TelemetryReplay
+from Tracer import Tracer
 
 
 class SensorDataCollectionSystem:
+    SAMPLING_RATE = 20  # Частота опроса сенсоров при записи (start_recording) в Гц
+    PRINT_INTERVAL = 1  # Период вывода данных с сенсоров в консоль во время записи в секундах
+    SAMPLE_BUFFER_SIZE = 500  # Число значений, после накопления которого при записи они передаются в MongoBatchWriter
+    # Длина окна агрегации значений при записи в мс (None - сохранять все значения без агрегации): вместо значений
+    # в коллекцию записываются статистики по окнам (SampleAggregator)
+    AGGREGATION_WINDOW_MS = None
+    # Хранение исходных значений при записи с агрегацией (в коллекции "<имя коллекции> raw"): 0 - не сохранять,
+    # None - хранить всегда, число - хранить указанное число секунд (удаляются MongoDB по TTL-индексу)
+    RAW_SAMPLES_RETENTION = 0
+    # Создавать новые коллекции как коллекции временных рядов MongoDB (SampleBuffer.TIME_SERIES_OPTIONS): значения
+    # хранятся сжатыми блоками по времени, вместо ссылки "run" - метаданные прохода "meta", FPS - отдельными документами
+    USE_TIME_SERIES_COLLECTIONS = False
+    # Хранилище данных с сенсоров: "mongo" - MongoDB (через MongoBatchWriter), "spool" - файлы-сегменты Arrow IPC
+    # в локальном каталоге SegmentSpool.FOLDER (MongoDB не нужна, FPS и эффективность дописываются отдельными строками)
+    STORAGE_BACKEND = "mongo"
+    # Макс. время использования кэша свойств GPU в секундах (на случай изменения Power Limit другими программами,
+    # None - только явный сброс через invalidate_device_properties)
+    DEVICE_PROPERTIES_MAX_AGE = 10
+
     def __init__(self):
         self.__address = SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS
         self.__port = SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT
+        # Работа с GPU (GpuDevices.BACKEND: реальные GPU через pynvml и pynvraw или модель GPU)
+        self.__gpu_backend = GpuDevices.create_backend()
         # Регистрация метода cleanup для выполнения при завершении программы
         atexit.register(self.__cleanup)
-        # Инициализация pynvml
-        pynvml.nvmlInit()
-        # Получение количества GPU
-        device_count = pynvml.nvmlDeviceGetCount()
-        if device_count == 0:
+        # Выбранные GPU (GpuDevices.DEVICE_INDICES): данные с каждого GPU опрашиваются и записываются отдельно
+        self.__device_indices = GpuDevices.get_device_indices(self.__gpu_backend)
+        if not self.__device_indices:
             print("Не найдено GPU NVIDIA")
             exit()
-        # Получение первого GPU для pynvml
-        self.__handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-        # Получение первого GPU для pynvraw
-        cuda_dev = 0
-        gpu = get_phys_gpu(cuda_dev)
-        self.__pynvraw_handle = gpu.handle
         # Подключение к MongoDB
         self.__client = pymongo.MongoClient("mongodb://localhost:27017/")  # Адрес сервера MongoDB
-        self.__db = self.__client["gpu_benchmark_monitoring"]  # Название базы данных
-        self.__gpu_data = None
-        self.__current_gpu_clock_offset = 0
-        self.__current_mem_clock_offset = 0
+        self.__db_name = "gpu_benchmark_monitoring"  # Название базы данных
+        self.__db = self.__client[self.__db_name]
+        self.__use_spool = SensorDataCollectionSystem.STORAGE_BACKEND == "spool"
+        if self.__use_spool:
+            # Запись в локальные файлы-сегменты (имена БД и коллекций - как в MongoDB). Модуль импортируется только
+            # для этого способа записи: для записи в MongoDB не нужен pyarrow
+            self.__db_writer = importlib.import_module("SegmentSpool").SegmentSpool()
+        else:
+            # Отложенная пакетная запись данных с сенсоров в MongoDB (в отдельном потоке, без обращения к БД при опросе)
+            # В каждой коллекции автоматически создаётся индекс по времени получения значения
+            self.__db_writer = MongoBatchWriter(self.__client, index_keys=[("t", pymongo.ASCENDING)])
+        # Время значения отсчитывается по монотонным часам от времени системных часов на момент привязки
+        # (значения упорядочены по времени, даже если системные часы перевели во время записи)
+        self.__wall_clock_origin = None
+        self.__sync_wall_clock()
+        # Последнее полученное значение каждого GPU - кортеж полей в порядке SampleBuffer.DTYPE (или None)
+        self.__gpu_data = dict.fromkeys(self.__device_indices)
+        self.__current_gpu_clock_offsets = dict.fromkeys(self.__device_indices, 0)
+        self.__current_mem_clock_offsets = dict.fromkeys(self.__device_indices, 0)
         self.__benchmark_type = "Not set"
+        # Кэш свойств GPU, которые меняются только при изменении Power Limit или смещения частоты
+        # (заполняется при первом опросе, сбрасывается через invalidate_device_properties)
+        self.__device_properties = dict.fromkeys(self.__device_indices)
+        self.__device_properties_times = dict.fromkeys(self.__device_indices, 0.0)
+        # Кольцевой буфер в разделяемой памяти для чтения данных с сенсоров другими процессами без вызовов через сокеты
+        self.__ring_buffer = TelemetryRingBuffer.create()
+        self.__ring_buffer_lock = threading.Lock()  # Методы выполняются в нескольких потоках, а писатель буфера - один
+        # Запись данных с сенсоров с заданной частотой - поток для каждого GPU (start_recording / stop_recording)
+        self.__recording_threads = []
+        self.__recording_stop_event = threading.Event()
+        self.__recording_lock = threading.Lock()
+        self.__recording_target = None  # (имя коллекции, имя БД)
+        # Идентификаторы документов проходов: (имя БД, имя коллекции, тип теста, значения RUN_FIELDS) -> ObjectId
+        self.__run_ids = {}
+        self.__run_metas = {}  # Идентификатор прохода -> метаданные для коллекций временных рядов
+        self.__run_ids_lock = threading.Lock()
+        # Является ли коллекция коллекцией временных рядов: (имя БД, имя коллекции) -> True / False
+        self.__time_series_collections = {}
+        self.__raw_collection_name = None  # Коллекция для исходных значений (None - не сохранять)
+        self.__aggregation_window_ms = None  # Длина окна агрегации текущей записи (None - без агрегации)
+        self.__recording_dropped = 0  # Число отброшенных документов у MongoBatchWriter на начало записи
+        # Итоги записи по индексу GPU (заполняются потоками записи при остановке): число полученных значений,
+        # сохранённых окон агрегации, ошибок опроса, пропущенных тактов и суммарное время опроса в секундах
+        self.__recording_results = {}
+        self.__replay_result = None  # Итоги воспроизведения записанных данных (start_replay), None - опрос GPU
+        # Энергия проходов, ещё не записанных в коллекцию SampleBuffer.RUN_ENERGY_COLLECTION (save_run_energy):
+        # идентификатор прохода -> (имя БД, имя коллекции, индекс GPU, энергия прохода - см. EnergyAccumulator.pop_runs,
+        # FPS по секундам - см. EnergyAccumulator.to_result)
+        self.__run_energies = {}
+        self.__run_energies_lock = threading.Lock()
+        # Индексы коллекций хранилища SegmentSpool по секундам для записи FPS (см. __get_spool_fps_index)
+        self.__spool_fps_indexes = {}
+        self.__spool_fps_indexes_lock = threading.Lock()
+        # Макс. длина окна агрегации в коллекциях MongoDB в секундах для записи FPS (см. __get_max_window)
+        self.__max_windows = {}
+        # FPS окон агрегации длиннее секунды в обычных коллекциях MongoDB: идентификатор документа окна ->
+        # [сумма FPS, число секунд лога] (FPS окна - среднее по всем секундам лога, которые в него попали)
+        self.__window_fps = {}
+        self.__window_fps_lock = threading.Lock()
 
     # Конец работы программы
-    @staticmethod
-    def __cleanup():
-        pynvml.nvmlShutdown()
+    def __cleanup(self):
+        self.__gpu_backend.shutdown()
         print("Работа программы завершена")
 
-    # Получение данных GPU
-    def __get_gpu_data(self):
+    # Привязать монотонные часы к системным (при запуске и в начале каждой записи)
+    def __sync_wall_clock(self):
+        self.__wall_clock_origin = time.time() - time.perf_counter()
+
+    # Текущее время (Unix time в секундах) по монотонным часам
+    def __get_timestamp(self):
+        return self.__wall_clock_origin + time.perf_counter()
+
+    # Свойства GPU из кэша (при пустом или устаревшем кэше - запрос к GPU)
+    def __get_device_properties(self, device_index):
+        device_properties = self.__device_properties[device_index]
+        max_age = SensorDataCollectionSystem.DEVICE_PROPERTIES_MAX_AGE
+        if device_properties is None or (max_age is not None
+                                         and time.monotonic() - self.__device_properties_times[device_index] > max_age):
+            gpu_backend = self.__gpu_backend
+            with Tracer.span("nvml_read_device_properties", "nvml", device=device_index):
+                min_gpu_clock, max_gpu_clock = gpu_backend.get_min_max_gpu_clock(device_index)
+                device_properties = {
+                    "power_limit": gpu_backend.get_enforced_power_limit(device_index),
+                    "power_limit_constraints": gpu_backend.get_power_limit_constraints(device_index),
+                    "min_gpu_clock": min_gpu_clock,
+                    "max_gpu_clock": max_gpu_clock
+                }
+            self.__device_properties[device_index] = device_properties
+            self.__device_properties_times[device_index] = time.monotonic()
+        return device_properties
+
+    # Сбросить кэш свойств GPU (вызывается системой андервольтинга после изменения Power Limit или смещения частоты)
+    # device_index - индекс GPU, None - все выбранные GPU
+    def __invalidate_device_properties(self, device_index=None):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        for index in device_indices:
+            self.__device_properties[index] = None
+        return bool(device_indices)
+
+    # Индексы GPU, с которых опрашиваются данные
+    def __get_device_indices(self):
+        return list(self.__device_indices)
+
+    # Получение данных GPU (device_index - индекс GPU, None - все выбранные GPU), результат - True, если данные получены
+    def __get_gpu_data(self, device_index=None):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        return bool(device_indices) and all([self.__read_gpu_data(index) is not None for index in device_indices])
+
+    # Получение данных одного GPU, результат - кортеж полей в порядке SampleBuffer.DTYPE или None при ошибке
+    def __read_gpu_data(self, device_index):
+        gpu_backend = self.__gpu_backend
         # Получение информации о GPU
         try:
-            util = pynvml.nvmlDeviceGetUtilizationRates(self.__handle)
-            memory_info = pynvml.nvmlDeviceGetMemoryInfo(self.__handle)
-            temperature = pynvml.nvmlDeviceGetTemperature(self.__handle, pynvml.NVML_TEMPERATURE_GPU)
-            fan_speed = pynvml.nvmlDeviceGetFanSpeed(self.__handle)
-            clock_info = pynvml.nvmlDeviceGetClockInfo(self.__handle, pynvml.NVML_CLOCK_GRAPHICS)
-            memory_clock = pynvml.nvmlDeviceGetClockInfo(self.__handle, pynvml.NVML_CLOCK_MEM) / 2
-            power_usage = pynvml.nvmlDeviceGetPowerUsage(self.__handle)
-            power_limit = pynvml.nvmlDeviceGetEnforcedPowerLimit(self.__handle)
-            power_limit_constraints = pynvml.nvmlDeviceGetPowerManagementLimitConstraints(self.__handle)
-            min_gpu_clock, max_gpu_clock = pynvml.nvmlDeviceGetMinMaxClockOfPState(self.__handle,
-                                                                                   pynvml.NVML_PSTATE_0,
-                                                                                   pynvml.NVML_CLOCK_GRAPHICS)
+            device_properties = self.__get_device_properties(device_index)
+            power_limit = device_properties["power_limit"]
+            power_limit_constraints = device_properties["power_limit_constraints"]
+            min_gpu_clock = device_properties["min_gpu_clock"]
+            max_gpu_clock = device_properties["max_gpu_clock"]
+            with Tracer.span("nvml_read", "nvml", device=device_index):
+                gpu_load, memory_controller_load = gpu_backend.get_utilization_rates(device_index)
+                memory_used = gpu_backend.get_memory_used(device_index)
+                temperature = gpu_backend.get_temperature(device_index)
+                fan_speed = gpu_backend.get_fan_speed(device_index)
+                clock_info = gpu_backend.get_gpu_clock(device_index)
+                memory_clock = gpu_backend.get_memory_clock(device_index) / 2
+                power_usage = gpu_backend.get_power_usage(device_index)
         except Exception as e:
             # Обработка любых ошибок
             print(f"Произошло исключение {type(e).__name__}: {e}")  # Вывести название ошибки и сообщение
-            return
+            self.__gpu_data[device_index] = None  # Не сохранять в БД устаревшие данные (save_gpu_data_to_db)
+            return None
         try:
-            voltage = api.get_core_voltage(self.__pynvraw_handle)  # В вольтах
+            with Tracer.span("pynvraw_read_voltage", "nvml", device=device_index):
+                voltage = gpu_backend.get_core_voltage(device_index)  # В вольтах
         except Exception as e:
             # Обработка любых ошибок
             print(f"Произошло исключение: {type(e).__name__}: {e}")  # Вывести название ошибки и сообщение
-            return
-        # Получение текущей даты и времени
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        # Формирование данных
-        self.__gpu_data = {
-            "Date": current_time,
-            "GPU Clock [MHz]": clock_info,
-            "Memory Clock [MHz]": memory_clock,
-            "GPU Temperature [°C]": temperature,
-            "Fan Speed [%]": fan_speed,
-            "Fan Speed [RPM]": fan_speed * 100,  # Примерное значение RPM
-            "Memory Used [MB]": memory_info.used / 1024 / 1024,
-            "GPU Load [%]": util.gpu,
-            "Memory Controller Load [%]": util.memory,
-            "Board Power Draw [W]": power_usage / 1000.0,  # В ваттах
-            "Power Consumption [% TDP]": (power_usage / power_limit_constraints[1]) * 100,
-            "Power Limit [W]": power_limit / 1000.0,  # В ваттах
-            "TDP Limit [%]": (power_limit / power_limit_constraints[1]) * 100,
-            "Min GPU Clock Frequency [MHz]": min_gpu_clock,
-            "Max GPU Clock Frequency [MHz]": max_gpu_clock,
-            "GPU Clock Frequency Offset [MHz]": self.__current_gpu_clock_offset,
-            "Memory Clock Offset [MHz]": self.__current_mem_clock_offset,
-            "GPU Voltage [V]": voltage,
-            "Benchmark test type": self.__benchmark_type
-        }
-        return True
+            self.__gpu_data[device_index] = None  # Не сохранять в БД устаревшие данные (save_gpu_data_to_db)
+            return None
+        # Формирование данных (кортеж полей в порядке SampleBuffer.DTYPE, документ MongoDB формируется при записи)
+        gpu_data = (
+            self.__get_timestamp(),  # Текущие дата и время
+            clock_info,  # GPU Clock [MHz]
+            memory_clock,  # Memory Clock [MHz]
+            temperature,  # GPU Temperature [°C]
+            fan_speed,  # Fan Speed [%]
+            fan_speed * 100,  # Fan Speed [RPM] (примерное значение)
+            memory_used / 1024 / 1024,  # Memory Used [MB]
+            gpu_load,  # GPU Load [%]
+            memory_controller_load,  # Memory Controller Load [%]
+            power_usage / 1000.0,  # Board Power Draw [W] (в ваттах)
+            (power_usage / power_limit_constraints[1]) * 100,  # Power Consumption [% TDP]
+            power_limit / 1000.0,  # Power Limit [W] (в ваттах)
+            (power_limit / power_limit_constraints[1]) * 100,  # TDP Limit [%]
+            min_gpu_clock,  # Min GPU Clock Frequency [MHz]
+            max_gpu_clock,  # Max GPU Clock Frequency [MHz]
+            self.__current_gpu_clock_offsets[device_index],  # GPU Clock Frequency Offset [MHz]
+            self.__current_mem_clock_offsets[device_index],  # Memory Clock Offset [MHz]
+            voltage,  # GPU Voltage [V]
+            device_index  # GPU Index
+        )
+        self.__publish_gpu_data(device_index, gpu_data)
+        return gpu_data
+
+    # Сохранить полученное значение как последнее значение GPU и передать в кольцевой буфер
+    # (для опрошенных и для воспроизводимых значений)
+    def __publish_gpu_data(self, device_index, gpu_data):
+        self.__gpu_data[device_index] = gpu_data
+        with self.__ring_buffer_lock:
+            self.__ring_buffer.write(gpu_data)
+
+    # Идентификатор документа прохода для значения с сенсоров (документ прохода создаётся при первом значении
+    # с новыми параметрами работы GPU и записывается через MongoBatchWriter вместе со значениями)
+    def __get_run_id(self, db_name, collection_name, run_values, timestamp):
+        benchmark_type = self.__benchmark_type
+        key = (db_name, collection_name, benchmark_type, run_values)
+        with self.__run_ids_lock:
+            run_id = self.__run_ids.get(key)
+            if run_id is not None:
+                return run_id
+            run_id = ObjectId()
+            run_document = {"_id": run_id, "Collection": collection_name, "Benchmark test type": benchmark_type,
+                            "Start": datetime.fromtimestamp(timestamp, timezone.utc)}
+            run_document.update(zip(SampleBuffer.RUN_FIELDS, run_values))
+            self.__run_metas[run_id] = SampleBuffer.to_time_series_meta(run_document)
+            self.__run_ids[key] = run_id
+        self.__db_writer.write(db_name, SampleBuffer.RUNS_COLLECTION, run_document)
+        return run_id
+
+    # Идентификатор документа прохода для значения, полученного при записи (start_recording)
+    def __get_recording_run_id(self, run_values, timestamp):
+        collection_name, db_name = self.__recording_target
+        return self.__get_run_id(db_name, collection_name, run_values, timestamp)
+
+    # Является ли коллекция коллекцией временных рядов (если коллекции ещё нет и USE_TIME_SERIES_COLLECTIONS,
+    # она создаётся как коллекция временных рядов, со сроком хранения документов expire_after_seconds секунд)
+    def __is_time_series_collection(self, db_name, collection_name, expire_after_seconds=None):
+        if self.__use_spool:
+            return False  # В хранилище SegmentSpool коллекций временных рядов нет
+        is_time_series = self.__time_series_collections.get((db_name, collection_name))
+        if is_time_series is None:
+            db = self.__client[db_name]
+            if collection_name in db.list_collection_names(filter={"name": collection_name}):
+                is_time_series = "timeseries" in db[collection_name].options()
+            elif SensorDataCollectionSystem.USE_TIME_SERIES_COLLECTIONS:
+                options = {} if expire_after_seconds is None else {"expireAfterSeconds": expire_after_seconds}
+                db.create_collection(collection_name, timeseries=SampleBuffer.TIME_SERIES_OPTIONS, **options)
+                # Коллекция временных рядов уже упорядочена по времени, отдельный индекс не нужен
+                self.__db_writer.set_collection_index(db_name, collection_name, None)
+                is_time_series = True
+            else:
+                is_time_series = False
+            self.__time_series_collections[(db_name, collection_name)] = is_time_series
+        return is_time_series
 
-    # Вывод данных о GPU (последнее полученное в __get_gpu_data() значение)
-    def __print_gpu_data(self):
-        if self.__gpu_data is None:
-            self.__get_gpu_data()
-            if self.__gpu_data is None:
-                return "Получить данные с сенсоров GPU не удалось"
+    # Передать документ значения или окна агрегации в MongoBatchWriter (для коллекции временных рядов
+    # ссылка на документ прохода заменяется метаданными прохода)
+    def __write_document(self, db_name, collection_name, document):
+        if self.__is_time_series_collection(db_name, collection_name):
+            document["meta"] = self.__run_metas[document.pop("run")]
+        return self.__db_writer.write(db_name, collection_name, document)
+
+    # Документы MongoDB для значений с сенсоров (значения и документы проходов) - в коллекцию collection_name
+    def __to_documents(self, samples, db_name, collection_name):
+        return SampleBuffer.to_documents(samples, lambda run_values, timestamp: self.__get_run_id(
+            db_name, collection_name, run_values, timestamp))
+
+    # Вывод данных о GPU (последнее полученное в __get_gpu_data() значение, device_index - индекс GPU,
+    # None - все выбранные GPU)
+    def __print_gpu_data(self, device_index=None):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        if not device_indices:
+            return f"GPU с индексом {device_index} не найден"
+        return "\n".join([self.__print_device_gpu_data(index) for index in device_indices])
+
+    # Вывод данных об одном GPU
+    def __print_device_gpu_data(self, device_index):
+        if self.__gpu_data[device_index] is None:
+            self.__read_gpu_data(device_index)
+        gpu_data = self.__gpu_data[device_index]  # Значение может обновляться потоком записи во время вывода
+        if gpu_data is None:
+            return f"Получить данные с сенсоров GPU {device_index} не удалось"
+        gpu_data = SampleBuffer.to_wide_document(gpu_data, {"Benchmark test type": self.__benchmark_type})
         gpu_data_str = "\n".join([
             "=" * 50,
-            f"Дата: {self.__gpu_data['Date']}",
-            f"Частота GPU: {self.__gpu_data['GPU Clock [MHz]']} MHz",
-            f"Частота памяти: {self.__gpu_data['Memory Clock [MHz]']} MHz",
-            f"Температура GPU: {self.__gpu_data['GPU Temperature [°C]']} °C",
-            f"Скорость вентилятора: {self.__gpu_data['Fan Speed [%]']}%",
-            f"Скорость вентилятора (RPM): {self.__gpu_data['Fan Speed [RPM]']} RPM",
-            f"Используемая память: {self.__gpu_data['Memory Used [MB]']} MB",
-            f"Загрузка GPU: {self.__gpu_data['GPU Load [%]']}%",
-            f"Загрузка контроллера памяти: {self.__gpu_data['Memory Controller Load [%]']}%",
-            f"Потребление платы: {self.__gpu_data['Board Power Draw [W]']} W",
-            f"Потребление энергии: {self.__gpu_data['Power Consumption [% TDP]']}% TDP",
-            f"Ограничение мощности: {self.__gpu_data['Power Limit [W]']} W",
-            f"Ограничение TDP: {self.__gpu_data['TDP Limit [%]']}%",
-            f"Мин. частота GPU: {self.__gpu_data['Min GPU Clock Frequency [MHz]']} MHz",
-            f"Макс. частота GPU: {self.__gpu_data['Max GPU Clock Frequency [MHz]']} MHz",
-            f"Смещение частоты GPU: {self.__gpu_data['GPU Clock Frequency Offset [MHz]']} MHz",
-            f"Смещение частоты памяти: {self.__gpu_data['Memory Clock Offset [MHz]']} MHz",
-            f"Напряжение GPU: {self.__gpu_data['GPU Voltage [V]']} V",
-            f"Тип теста бенчмарка: {self.__gpu_data['Benchmark test type']}",
+            f"GPU: {gpu_data['GPU Index']}",
+            f"Дата: {gpu_data['Date']}",
+            f"Частота GPU: {gpu_data['GPU Clock [MHz]']} MHz",
+            f"Частота памяти: {gpu_data['Memory Clock [MHz]']} MHz",
+            f"Температура GPU: {gpu_data['GPU Temperature [°C]']} °C",
+            f"Скорость вентилятора: {gpu_data['Fan Speed [%]']}%",
+            f"Скорость вентилятора (RPM): {gpu_data['Fan Speed [RPM]']} RPM",
+            f"Используемая память: {gpu_data['Memory Used [MB]']} MB",
+            f"Загрузка GPU: {gpu_data['GPU Load [%]']}%",
+            f"Загрузка контроллера памяти: {gpu_data['Memory Controller Load [%]']}%",
+            f"Потребление платы: {gpu_data['Board Power Draw [W]']} W",
+            f"Потребление энергии: {gpu_data['Power Consumption [% TDP]']}% TDP",
+            f"Ограничение мощности: {gpu_data['Power Limit [W]']} W",
+            f"Ограничение TDP: {gpu_data['TDP Limit [%]']}%",
+            f"Мин. частота GPU: {gpu_data['Min GPU Clock Frequency [MHz]']} MHz",
+            f"Макс. частота GPU: {gpu_data['Max GPU Clock Frequency [MHz]']} MHz",
+            f"Смещение частоты GPU: {gpu_data['GPU Clock Frequency Offset [MHz]']} MHz",
+            f"Смещение частоты памяти: {gpu_data['Memory Clock Offset [MHz]']} MHz",
+            f"Напряжение GPU: {gpu_data['GPU Voltage [V]']} V",
+            f"Тип теста бенчмарка: {gpu_data['Benchmark test type']}",
             "=" * 50
         ])
         print(gpu_data_str)
         return gpu_data_str
 
-    # Запись данных о GPU в БД (последнее полученное в __get_gpu_data() значение)
-    def __save_gpu_data_to_db(self, collection_name, db_name=None):
-        if db_name is None:
-            self.__db[collection_name].insert_one(self.__gpu_data)  # Сохранение данных с сенсоров в MongoDB
+    # Запись данных о GPU в БД (последнее полученное в __get_gpu_data() значение, device_index - индекс GPU,
+    # None - все выбранные GPU)
+    def __save_gpu_data_to_db(self, collection_name, db_name=None, device_index=None):
+        gpu_data = [self.__gpu_data[index] for index in GpuDevices.select(self.__device_indices, device_index)]
+        if not gpu_data or None in gpu_data:
+            return False  # Данные с сенсоров не были получены
+        # Сохранение данных с сенсоров в MongoDB (в БД по умолчанию или в БД с определённым именем)
+        # Документы записываются потоком MongoBatchWriter вместе с другими (или в сегмент SegmentSpool),
+        # результат - False, если очередь заполнена
+        db_name = self.__db_name if db_name is None else db_name
+        documents = self.__to_documents(gpu_data, db_name, collection_name)
+        return all([self.__write_document(db_name, collection_name, document) for document in documents])
+
+    # Число документов, ожидающих записи в MongoDB, записанных и отброшенных (из-за переполнения очереди или ошибки)
+    def __get_db_writer_statistics(self):
+        return self.__db_writer.get_statistics()
+
+    # Начать запись данных с сенсоров с частотой rate Гц (по умолчанию SAMPLING_RATE) в MongoDB через MongoBatchWriter
+    # Опрос выполняется в потоках этой системы (отдельный поток для каждого выбранного GPU), без вызовов через сокеты
+    # на каждое значение. При заданном AGGREGATION_WINDOW_MS в коллекцию записываются статистики по окнам времени
+    def __start_recording(self, collection_name, db_name=None, rate=None):
+        rate = SensorDataCollectionSystem.SAMPLING_RATE if rate is None else rate
+        with self.__recording_lock:
+            if not self.__prepare_recording(collection_name, db_name):
+                return False
+            self.__recording_threads = [threading.Thread(target=self.__recording_loop, args=(index, 1 / rate),
+                                                         daemon=True)
+                                        for index in self.__device_indices]
+            for thread in self.__recording_threads:
+                thread.start()
+        print(f"Начата запись данных с сенсоров с частотой {rate} Гц в коллекцию {collection_name} "
+              f"(GPU: {', '.join(str(index) for index in self.__device_indices)})")
+        return True
+
+    # Начать воспроизведение записанных данных с сенсоров (TelemetryReplay: файлы file_pattern каталога
+    # Dataset_GTX_1650) вместо опроса GPU с ускорением speed (1 - в реальном времени, None - без ожидания)
+    # Значения проходят тот же путь, что и при записи (кольцевой буфер, агрегация, запись в коллекцию), поэтому
+    # так измеряется скорость записи, агрегации и анализа на реальных данных без GPU и бенчмарка
+    # Окончание воспроизведения - см. is_recording, итоги (с ключом "replay") возвращает stop_recording
+    def __start_replay(self, collection_name, db_name=None, speed=None, file_pattern=None):
+        replay = TelemetryReplay(file_pattern=file_pattern)
+        if len(replay) == 0:
+            print("Не найдено записанных данных для воспроизведения")
+            return False
+        with self.__recording_lock:
+            if not self.__prepare_recording(collection_name, db_name):
+                return False
+            self.__replay_result = {"speed": speed, "duration": 0.0, "max_lag": 0.0}
+            self.__recording_threads = [threading.Thread(target=self.__replay_loop, args=(replay, speed), daemon=True)]
+            self.__recording_threads[0].start()
+        print(f"Начато воспроизведение {len(replay)} записанных значений с ускорением "
+              f"{'макс.' if not speed else speed} в коллекцию {collection_name}")
+        return True
+
+    # Идёт ли запись или воспроизведение данных (воспроизведение завершается само после последнего значения)
+    def __is_recording(self):
+        return any(thread.is_alive() for thread in self.__recording_threads)
+
+    # Подготовить коллекции и состояние записи (вызывается при захваченной __recording_lock), результат - False,
+    # если запись уже идёт
+    def __prepare_recording(self, collection_name, db_name):
+        window_ms = SensorDataCollectionSystem.AGGREGATION_WINDOW_MS
+        raw_samples_retention = SensorDataCollectionSystem.RAW_SAMPLES_RETENTION
+        if self.__recording_threads:
+            print("Запись данных с сенсоров уже идёт")
+            return False
+        self.__save_run_energy()  # Энергия проходов прошлой записи, для которой не был вызван save_run_energy
+        self.__recording_target = (collection_name, self.__db_name if db_name is None else db_name)
+        self.__drop_fps_indexes(*self.__recording_target[::-1])
+        self.__aggregation_window_ms = window_ms
+        if window_ms is None:
+            self.__raw_collection_name = collection_name
         else:
-            # Сохранить в БД с определённым именем
-            self.__client[db_name][collection_name].insert_one(self.__gpu_data)  # Сохранение данных с сенсоров в MongoDB
+            self.__raw_collection_name = None
+            if raw_samples_retention != 0:
+                self.__raw_collection_name = collection_name + SampleBuffer.RAW_COLLECTION_SUFFIX
+                # Для коллекции временных рядов срок хранения задаётся при создании, для обычной - TTL-индексом
+                if (not self.__is_time_series_collection(self.__recording_target[1], self.__raw_collection_name,
+                                                         raw_samples_retention)
+                        and raw_samples_retention is not None):
+                    self.__db_writer.set_collection_index(self.__recording_target[1], self.__raw_collection_name,
+                                                          [("t", pymongo.ASCENDING)],
+                                                          expireAfterSeconds=raw_samples_retention)
+        self.__sync_wall_clock()
+        self.__is_time_series_collection(*self.__recording_target[::-1])  # Создание коллекции до начала опроса
+        with self.__run_ids_lock:
+            self.__run_ids = {}  # Каждая запись - отдельные проходы
+            self.__run_metas = {}
+        self.__recording_results = {}
+        self.__replay_result = None
+        self.__recording_dropped = self.__db_writer.get_statistics()["dropped"]
+        self.__recording_stop_event.clear()
         return True
 
-    # Изменить значение смещения частоты GPU
-    def __set_gpu_clock_offset(self, offset):
-        if isinstance(offset, int):
-            self.__current_gpu_clock_offset = offset
+    # Буфер значений, агрегатор окон (None - без агрегации) и учёт энергии для записи значений одного GPU
+    # с периодом period
+    def __create_sample_pipeline(self, period):
+        window_ms = self.__aggregation_window_ms
+        sample_aggregator = None
+        if window_ms is not None:
+            sample_aggregator = SampleAggregator(window_ms, int(window_ms / 1000 / period) + 1)
+        return SampleBuffer(SensorDataCollectionSystem.SAMPLE_BUFFER_SIZE), sample_aggregator, EnergyAccumulator()
+
+    # Передать полученное при записи значение в учёт энергии, агрегатор окон и буфер значений (результат - число
+    # переданных на запись окон агрегации)
+    def __add_recorded_sample(self, gpu_data, sample_buffer, sample_aggregator, energy_accumulator):
+        energy_accumulator.add(gpu_data, self.__get_recording_run_id)
+        recorded_windows = 0
+        if sample_aggregator is not None:
+            recorded_windows = self.__write_window(sample_aggregator.add(gpu_data, self.__get_recording_run_id))
+        if self.__raw_collection_name is not None and sample_buffer.append(gpu_data):
+            self.__write_recorded_samples(sample_buffer)
+        return recorded_windows
+
+    # Передать на запись оставшиеся значения и незавершённое окно агрегации, сохранить энергию проходов до записи
+    # итогов (save_run_energy) - при остановке записи. Энергия прохода, который уже есть среди ещё не записанных
+    # (несколько частей одного прохода), добавляется к нему с сохранением уже полученных FPS
+    def __flush_recorded_samples(self, device_index, sample_buffer, sample_aggregator, energy_accumulator):
+        collection_name, db_name = self.__recording_target
+        with self.__run_energies_lock:
+            for run in energy_accumulator.pop_runs():
+                run_energy = self.__run_energies.get(run["run"])
+                if run_energy is None:
+                    self.__run_energies[run["run"]] = (db_name, collection_name, device_index, run, {})
+                else:
+                    EnergyAccumulator.merge_runs(run_energy[3], run)
+        self.__write_recorded_samples(sample_buffer)
+        if sample_aggregator is None:
+            return 0
+        return self.__write_window(sample_aggregator.pop_document(self.__get_recording_run_id))
+
+    # Цикл опроса сенсоров одного GPU с постоянным периодом (выполняется в потоке записи этого GPU)
+    # Значения (SampleBuffer) и окна агрегации (SampleAggregator) каждого GPU накапливаются отдельно
+    def __recording_loop(self, device_index, period):
+        sample_pipeline = self.__create_sample_pipeline(period)
+        recorded_samples = 0
+        recorded_windows = 0
+        errors = 0
+        missed_ticks = 0
+        sample_time = 0.0
+        next_time = time.perf_counter()
+        next_print_time = next_time
+        while not self.__recording_stop_event.is_set():
+            sample_start_time = time.perf_counter()
+            gpu_data = self.__read_gpu_data(device_index)
+            sample_time += time.perf_counter() - sample_start_time
+            if gpu_data is not None:
+                recorded_samples += 1
+                recorded_windows += self.__add_recorded_sample(gpu_data, *sample_pipeline)
+                if time.perf_counter() >= next_print_time:
+                    self.__print_device_gpu_data(device_index)
+                    next_print_time = time.perf_counter() + SensorDataCollectionSystem.PRINT_INTERVAL
+            else:
+                errors += 1
+            # Время следующего опроса отсчитывается от расписания, а не от конца опроса (без накопления задержки)
+            next_time += period
+            delay = next_time - time.perf_counter()
+            if delay < 0:
+                # Опрос не успевает за частотой - пропустить такты, а не пытаться их догнать
+                skipped_ticks = int(-delay / period) + 1
+                missed_ticks += skipped_ticks
+                next_time += skipped_ticks * period
+                delay = next_time - time.perf_counter()
+            self.__recording_stop_event.wait(max(0.0, delay))
+        recorded_windows += self.__flush_recorded_samples(device_index, *sample_pipeline)
+        self.__recording_results[device_index] = {"samples": recorded_samples, "windows": recorded_windows,
+                                                  "errors": errors, "missed_ticks": missed_ticks,
+                                                  "sample_time": sample_time}
+
+    # Цикл воспроизведения записанных значений (выполняется в одном потоке для всех GPU, значения и окна агрегации
+    # каждого GPU накапливаются отдельно). Время обработки значения учитывается как время опроса
+    def __replay_loop(self, replay, speed):
+        pipelines = {}  # Индекс GPU -> буфер значений, агрегатор окон и учёт энергии
+        results = {}  # Индекс GPU -> итоги записи
+        start_time = time.perf_counter()
+        next_print_time = start_time
+        max_lag = 0.0
+        for gpu_data, benchmark_type, lag in replay.iter_samples(speed, self.__recording_stop_event):
+            sample_start_time = time.perf_counter()
+            device_index = gpu_data[-1]
+            if device_index not in pipelines:
+                pipelines[device_index] = self.__create_sample_pipeline(1 / SensorDataCollectionSystem.SAMPLING_RATE)
+                results[device_index] = {"samples": 0, "windows": 0, "errors": 0, "missed_ticks": 0,
+                                         "sample_time": 0.0}
+            self.__benchmark_type = benchmark_type  # Тип теста - из записанных данных (как при set_benchmark_type)
+            self.__publish_gpu_data(device_index, gpu_data)
+            result = results[device_index]
+            result["samples"] += 1
+            result["windows"] += self.__add_recorded_sample(gpu_data, *pipelines[device_index])
+            result["sample_time"] += time.perf_counter() - sample_start_time
+            max_lag = max(max_lag, lag)
+            if time.perf_counter() >= next_print_time:
+                self.__print_device_gpu_data(device_index)
+                next_print_time = time.perf_counter() + SensorDataCollectionSystem.PRINT_INTERVAL
+        for device_index, sample_pipeline in pipelines.items():
+            results[device_index]["windows"] += self.__flush_recorded_samples(device_index, *sample_pipeline)
+        self.__recording_results = results
+        self.__replay_result.update(duration=time.perf_counter() - start_time, max_lag=max_lag)
+
+    # Передать накопленные при записи значения в MongoBatchWriter (документы формируются сразу для всего буфера)
+    # При заполненной очереди записи поток ждёт (пропуская такты), затем значения отбрасываются
+    def __write_recorded_samples(self, sample_buffer):
+        db_name = self.__recording_target[1]
+        for document in sample_buffer.pop_documents(self.__get_recording_run_id):
+            self.__write_document(db_name, self.__raw_collection_name, document)
+
+    # Передать документ завершённого окна агрегации в MongoBatchWriter (результат - число переданных документов)
+    def __write_window(self, document):
+        if document is None:
+            return 0
+        collection_name, db_name = self.__recording_target
+        self.__write_document(db_name, collection_name, document)
+        return 1
+
+    # Остановить запись данных с сенсоров и дождаться записи полученных значений в MongoDB
+    # Результат - словарь с числом полученных значений, сохранённых окон агрегации, отброшенных (не записанных в БД)
+    # документов, ошибок опроса, пропущенных тактов и средним временем опроса сенсоров в мс (None, если записи не было),
+    # "devices" - те же значения (кроме отброшенных документов) для каждого GPU по индексу, "replay" - итоги
+    # воспроизведения (для start_replay)
+    def __stop_recording(self):
+        with self.__recording_lock:
+            if not self.__recording_threads:
+                print("Запись данных с сенсоров не была начата")
+                return None
+            self.__recording_stop_event.set()
+            for thread in self.__recording_threads:
+                thread.join()
+            self.__recording_threads = []
+        collection_name = self.__recording_target[0]
+        # Дождаться записи оставшихся значений (далее по ним рассчитываются FPS и эффективность)
+        flush_start_time = time.perf_counter()
+        with Tracer.span("mongo_flush", "mongo", collection=collection_name):
+            self.__db_writer.flush()
+        self.__drop_fps_indexes(*self.__recording_target[::-1])  # Индексы строятся заново по записанным значениям
+        flush_duration = time.perf_counter() - flush_start_time
+        dropped = self.__db_writer.get_statistics()["dropped"] - self.__recording_dropped
+        devices = {}
+        for device_index, device_result in sorted(self.__recording_results.items()):
+            sample_count = device_result["samples"] + device_result["errors"]
+            devices[device_index] = {
+                "samples": device_result["samples"], "windows": device_result["windows"],
+                "errors": device_result["errors"], "missed_ticks": device_result["missed_ticks"],
+                "mean_sample_ms": device_result["sample_time"] / sample_count * 1000 if sample_count else 0.0
+            }
+        sample_count = sum(device_result["samples"] + device_result["errors"]
+                           for device_result in self.__recording_results.values())
+        sample_time = sum(device_result["sample_time"] for device_result in self.__recording_results.values())
+        result = {"samples": sum(device_result["samples"] for device_result in devices.values()),
+                  "windows": sum(device_result["windows"] for device_result in devices.values()),
+                  "dropped": dropped,
+                  "errors": sum(device_result["errors"] for device_result in devices.values()),
+                  "missed_ticks": sum(device_result["missed_ticks"] for device_result in devices.values()),
+                  "mean_sample_ms": sample_time / sample_count * 1000 if sample_count else 0.0,
+                  "devices": devices}
+        print(f"Запись данных с сенсоров остановлена: получено значений {result['samples']}, "
+              f"окон агрегации {result['windows']}, не сохранено {result['dropped']}, ошибок опроса {result['errors']}, "
+              f"пропущено тактов {result['missed_ticks']}, среднее время опроса {result['mean_sample_ms']:.3f} мс")
+        if len(devices) > 1:
+            for device_index, device_result in devices.items():
+                print(f"  GPU {device_index}: получено значений {device_result['samples']}, "
+                      f"ошибок опроса {device_result['errors']}, пропущено тактов {device_result['missed_ticks']}, "
+                      f"среднее время опроса {device_result['mean_sample_ms']:.3f} мс")
+        if self.__replay_result is not None:
+            # Воспроизведение: длительность воспроизведения и записи оставшихся документов, скорость обработки
+            # значений (вместе с записью в хранилище) и макс. отставание от расписания воспроизведения
+            replay_result = dict(self.__replay_result, flush_duration=flush_duration)
+            duration = replay_result["duration"] + flush_duration
+            replay_result["samples_per_second"] = result["samples"] / duration if duration > 0 else 0.0
+            result["replay"] = replay_result
+            print(f"Воспроизведение: {replay_result['duration']:.3f} с, запись оставшихся документов "
+                  f"{flush_duration:.3f} с, {replay_result['samples_per_second']:.0f} значений в секунду, "
+                  f"макс. отставание от расписания {replay_result['max_lag']:.3f} с")
+        return result
+
+    # Изменить значение смещения частоты GPU (device_index - индекс GPU, None - все выбранные GPU)
+    def __set_gpu_clock_offset(self, offset, device_index=None):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        if isinstance(offset, int) and device_indices:
+            for index in device_indices:
+                self.__current_gpu_clock_offsets[index] = offset
+                self.__invalidate_device_properties(index)  # Смещение меняет min и max частоты GPU
             return True
         return False
 
-    # Изменить значение смещения частоты памяти
-    def __set_mem_clock_offset(self, offset):
-        if isinstance(offset, int):
-            self.__current_mem_clock_offset = offset
+    # Изменить значение смещения частоты памяти (device_index - индекс GPU, None - все выбранные GPU)
+    def __set_mem_clock_offset(self, offset, device_index=None):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        if isinstance(offset, int) and device_indices:
+            for index in device_indices:
+                self.__current_mem_clock_offsets[index] = offset
+                self.__invalidate_device_properties(index)
             return True
         return False
 
@@ -155,31 +624,42 @@ class SensorDataCollectionSystem:
             return True
         return False
 
-    # Вывод данных о TDP и Power Limit
-    def __print_tdp_info(self):
-        power_limit = pynvml.nvmlDeviceGetEnforcedPowerLimit(self.__handle)
-        power_limit_default = pynvml.nvmlDeviceGetPowerManagementDefaultLimit(self.__handle)
-        power_limit_constraints = pynvml.nvmlDeviceGetPowerManagementLimitConstraints(self.__handle)
-        tdp_info_str = "\n".join([
+    # Вывод данных о TDP и Power Limit (device_index - индекс GPU, None - все выбранные GPU)
+    def __print_tdp_info(self, device_index=None):
+        tdp_info = []
+        for index in GpuDevices.select(self.__device_indices, device_index):
+            tdp_info.append(self.__get_device_tdp_info(index))
+        tdp_info_str = "\n".join(tdp_info) if tdp_info else f"GPU с индексом {device_index} не найден"
+        print(tdp_info_str)
+        return tdp_info_str
+
+    # Данные о TDP и Power Limit одного GPU
+    def __get_device_tdp_info(self, device_index):
+        power_limit = self.__gpu_backend.get_enforced_power_limit(device_index)
+        power_limit_default = self.__gpu_backend.get_default_power_limit(device_index)
+        power_limit_constraints = self.__gpu_backend.get_power_limit_constraints(device_index)
+        return "\n".join([
+            f"GPU: {device_index}",
             f"Текущий Power Limit: {power_limit / 1000} W",
             f"Текущий TDP Limit: {(power_limit / power_limit_constraints[1]) * 100} %",
             f"Power Limit по умолчанию: {power_limit_default / 1000} W",
             f"Ограничения Power Limit: {power_limit_constraints[0] / 1000} W - {power_limit_constraints[1] / 1000} W",  # max Power Limit = 100% TDP
             f"Ограничения TDP: {(power_limit_constraints[0] / power_limit_constraints[1]) * 100} % - 100 %"
         ])
-        print(tdp_info_str)
-        return tdp_info_str
 
-    # Вывод данных о min, max частотах GPU и смещении
-    def __print_gpu_clock_info(self):
-        # Получение частот
-        min_gpu_clock, max_gpu_clock = pynvml.nvmlDeviceGetMinMaxClockOfPState(self.__handle, pynvml.NVML_PSTATE_0,
-                                                                               pynvml.NVML_CLOCK_GRAPHICS)
-        gpu_clock_info = "\n".join([
-            f"Мин. частота GPU: {min_gpu_clock} MHz",
-            f"Макс. частота GPU: {max_gpu_clock} MHz",
-            f"Смещение частоты GPU: {self.__current_gpu_clock_offset} MHz"
-        ])
+    # Вывод данных о min, max частотах GPU и смещении (device_index - индекс GPU, None - все выбранные GPU)
+    def __print_gpu_clock_info(self, device_index=None):
+        gpu_clock_info = []
+        for index in GpuDevices.select(self.__device_indices, device_index):
+            # Получение частот
+            min_gpu_clock, max_gpu_clock = self.__gpu_backend.get_min_max_gpu_clock(index)
+            gpu_clock_info.extend([
+                f"GPU: {index}",
+                f"Мин. частота GPU: {min_gpu_clock} MHz",
+                f"Макс. частота GPU: {max_gpu_clock} MHz",
+                f"Смещение частоты GPU: {self.__current_gpu_clock_offsets[index]} MHz"
+            ])
+        gpu_clock_info = "\n".join(gpu_clock_info) if gpu_clock_info else f"GPU с индексом {device_index} не найден"
         print(gpu_clock_info)
         return gpu_clock_info
 
@@ -189,136 +669,249 @@ class SensorDataCollectionSystem:
             collection = self.__db[collection_name.replace("['", "").replace("']", "")]
         else:
             collection = self.__client[db_name][collection_name.replace("['", "").replace("']", "")]
-        # Найти документ в коллекции с полем "Date", совпадающим с log_datetime
-        document = collection.find_one({"Date": log_datetime})
-        if document:
-            # Извлечь "Board Power Draw [W]" из документа
-            board_power_draw = document.get("Board Power Draw [W]", None)
-            if board_power_draw:
-                # Рассчитать "Efficiency [FPS/W]"
-                efficiency = fps / board_power_draw
-                # Обновить (записать) поля "FPS" и "Efficiency [FPS/W]" в найденном документе
-                collection.update_one({"_id": document["_id"]},
-                                      {"$set": {"FPS": fps, "Efficiency [FPS/W]": efficiency}})
+        # Найти документы в коллекции, полученные в секунду log_datetime (локальное время), по индексу поля времени
+        # (при записи с частотой выше 1 Гц за одну секунду сохраняется несколько значений с сенсоров, а при записи
+        # с агрегацией - окна, которые содержат эту секунду, в том числе начатые раньше неё)
+        start_time = datetime.strptime(log_datetime, "%Y-%m-%d %H:%M:%S").astimezone()
+        time_range = {"$gte": start_time, "$lt": start_time + timedelta(seconds=1)}
+        self.__add_fps_to_run_energy(collection.database.name, collection.name, int(start_time.timestamp()), fps)
+        if self.__use_spool:
+            return self.__add_fps_to_spool(collection.database.name, collection.name, log_datetime, fps, time_range)
+        window_range = {"$gte": start_time - timedelta(seconds=self.__get_max_window(collection)),
+                        "$lt": time_range["$lt"]}
+        if self.__is_time_series_collection(collection.database.name, collection.name):
+            return self.__add_fps_to_time_series_collection(collection, log_datetime, fps, window_range)
+        power_key = SampleBuffer.SAMPLE_KEYS["Board Power Draw [W]"]
+        projection = {"t": 1, "w": 1, power_key: 1, "Board Power Draw [W]": 1}
+        with Tracer.span("mongo_find", "mongo", collection=collection.name):
+            documents = [document for document in collection.find({"t": window_range}, projection)
+                         if SensorDataCollectionSystem.__contains_second(document, start_time)]
+            if not documents and "t_1" not in collection.index_information():
+                # Коллекции, собранные до появления компактной схемы (с длинными ключами) - поиск по строке даты
+                documents = list(collection.find({"Date": log_datetime}, projection))
+        if documents:
+            # Рассчитать "Efficiency [FPS/W]" для каждого документа, в котором есть "Board Power Draw [W]"
+            efficiencies = {}
+            # Ключи FPS и эффективности в документе (короткие или длинные - для ранее собранных данных) и FPS документа
+            fields = {}
+            for document in documents:
+                if document.get(power_key):
+                    document_fps = self.__get_window_fps(document, fps)
+                    efficiencies[document["_id"]] = document_fps / document[power_key]
+                    fields[document["_id"]] = (SampleBuffer.SAMPLE_KEYS["FPS"],
+                                               SampleBuffer.SAMPLE_KEYS["Efficiency [FPS/W]"], document_fps)
+                elif document.get("Board Power Draw [W]"):
+                    efficiencies[document["_id"]] = fps / document["Board Power Draw [W]"]
+                    fields[document["_id"]] = ("FPS", "Efficiency [FPS/W]", fps)
+            if efficiencies:
+                # Обновить (записать) поля "FPS" и "Efficiency [FPS/W]" в найденных документах
+                updates = [pymongo.UpdateOne({"_id": document_id},
+                                             {"$set": {fields[document_id][0]: fields[document_id][2],
+                                                       fields[document_id][1]: document_efficiency}})
+                           for document_id, document_efficiency in efficiencies.items()]
+                with Tracer.span("mongo_update", "mongo", collection=collection.name, count=len(updates)):
+                    collection.bulk_write(updates, ordered=False)
+                efficiency = sum(efficiencies.values()) / len(efficiencies)
                 # Вывести инфо о записанных значениях
-                return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency}"
+                if len(updates) == 1:
+                    return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency}"
+                return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency} (среднее по {len(updates)} значениям)"
             else:
                 return f"Поле 'Board Power Draw [W]' отсутствует в документе с датой {log_datetime} в коллекции MongoDB"
         else:
             return f"Не найден документ с датой {log_datetime} в коллекции MongoDB для записи значения FPS"
 
-    # Обработка вызова метода через сокеты
-    def __handle_client(self, client_socket):
-        try:
-            # Чтение и декодирование запроса
-            request = client_socket.recv(1024).decode('utf-8')
-            print(f"Получено: {request}")
-            # Разбиение запроса на метод и параметры
-            parts = request.split(',')
-            method_name = parts[0].strip()
-            parameters = [p.strip() for p in parts[1:] if p.strip()]  # Убрать пустые значения и пробелы
-            # Вызов соответствующего метода
-            if method_name == "get_gpu_data":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__get_gpu_data()
-            elif method_name == "print_gpu_data":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__print_gpu_data()
-            elif method_name == "save_gpu_data_to_db":
-                if len(parameters) < 1 or len(parameters) > 2:
-                    response = f"Метод {method_name} требует 1 или 2 параметра"
-                    print(response)
-                else:
-                    collection_name = parameters[0]
-                    if len(parameters) == 1:
-                        response = self.__save_gpu_data_to_db(collection_name)
-                    else:
-                        db_name = parameters[1]
-                        response = self.__save_gpu_data_to_db(collection_name, db_name)
-            elif method_name == "set_gpu_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    offset = int(parameters[0])
-                    response = self.__set_gpu_clock_offset(offset)
-            elif method_name == "set_mem_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    offset = int(parameters[0])
-                    response = self.__set_mem_clock_offset(offset)
-            elif method_name == "set_benchmark_type":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    benchmark_type = parameters[0]
-                    response = self.__set_benchmark_type(benchmark_type)
-            elif method_name == "print_tdp_info":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__print_tdp_info()
-            elif method_name == "print_gpu_clock_info":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__print_gpu_clock_info()
-            elif method_name == "calculate_fps_and_efficiency_in_collection":
-                if len(parameters) < 3 or len(parameters) > 4:
-                    response = f"Метод {method_name} требует 3 или 4 параметра"
-                    print(response)
-                else:
-                    collection_name = parameters[0]
-                    log_datetime = parameters[1]
-                    fps = int(parameters[2])
-                    if len(parameters) == 3:
-                        response = self.__calculate_fps_and_efficiency_in_collection(collection_name, log_datetime, fps)
-                    else:
-                        db_name = parameters[3]
-                        response = self.__calculate_fps_and_efficiency_in_collection(collection_name, log_datetime, fps, db_name)
-            else:
-                response = f"Неизвестный метод {method_name}"
-                print(response)
-            # Преобразование response в строку, если оно является типа bool или int
-            if isinstance(response, (bool, int)):
-                response = str(response)
-            elif isinstance(response, tuple):
-                # Преобразовать кортеж в строку
-                response = ', '.join(map(str, response))
-            elif response is None:
-                response = "None"
-            # Отправка ответа клиенту
-            client_socket.send(response.encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка обработки клиента: {e}")
-            response = "Ошибка сервера"
-            client_socket.send(response.encode('utf-8'))
-        finally:
-            # Закрытие соединения
-            client_socket.close()
+    # Запомнить FPS секунды second (Unix time) для проходов коллекции на GPU бенчмарка, энергия которых ещё не записана
+    # и получена в эту секунду (фаза нагрузки и энергия на кадр - при записи итогов в save_run_energy)
+    def __add_fps_to_run_energy(self, db_name, collection_name, second, fps):
+        benchmark_device_index = GpuDevices.get_benchmark_device_index(self.__device_indices)
+        with self.__run_energies_lock:
+            for run_db_name, run_collection_name, device_index, run, fps_values in self.__run_energies.values():
+                if ((run_db_name, run_collection_name) == (db_name, collection_name)
+                        and device_index == benchmark_device_index and second in run["seconds"]):
+                    fps_values[second] = fps
+
+    # Записать итоги проходов коллекции по энергии (EnergyAccumulator.RESULT_FIELDS) в коллекцию
+    # SampleBuffer.RUN_ENERGY_COLLECTION той же БД (вызывается после записи FPS; collection_name = None - итоги
+    # всех проходов, энергия которых ещё не записана). Результат - строка с итогами для вывода
+    def __save_run_energy(self, collection_name=None, db_name=None):
+        db_name = self.__db_name if db_name is None else db_name
+        with self.__run_energies_lock:
+            run_ids = [run_id for run_id, (run_db_name, run_collection_name, device_index, run, fps_values)
+                       in self.__run_energies.items()
+                       if collection_name is None or (run_db_name, run_collection_name) == (db_name, collection_name)]
+            run_energies = [self.__run_energies.pop(run_id) for run_id in run_ids]
+        lines = []
+        for run_db_name, run_collection_name, device_index, run, fps_values in run_energies:
+            result = EnergyAccumulator.to_result(run, fps_values)
+            document = {"run": run["run"], "Collection": run_collection_name}
+            document.update(result)
+            self.__db_writer.write(run_db_name, SampleBuffer.RUN_ENERGY_COLLECTION, document)
+            lines.append(f"Проход {run['run']}: энергия {result['Energy [J]']} Дж за {result['Duration [s]']} с, "
+                         f"средняя мощность {result['Average Power [W]']} W (нагрузка {result['Load Energy [J]']} Дж, "
+                         f"{result['Load Average Power [W]']} W; простой {result['Idle Energy [J]']} Дж, "
+                         f"{result['Idle Average Power [W]']} W), кадров {result['Frames']}, "
+                         f"энергия на кадр {result['Energy per Frame [J]']} Дж")
+        if run_energies:
+            self.__db_writer.flush()  # Итоги читаются системой анализа сразу после теста
+        str_result = "\n".join(lines) if lines else f"Нет данных об энергии проходов коллекции {collection_name}"
+        print(str_result)
+        return str_result
+
+    # Записать FPS и FPS/W в коллекцию временных рядов (значения в ней не изменяются): для каждого прохода - отдельный
+    # документ с FPS и средней эффективностью значений и окон агрегации, которые содержат секунду log_datetime
+    # Документ FPS для окна длиннее секунды получает время начала окна: при анализе FPS всех секунд окна усредняются
+    # вместе с ним. window_range - диапазон времени начала значений и окон (см. __get_max_window)
+    def __add_fps_to_time_series_collection(self, collection, log_datetime, fps, window_range):
+        power_key = SampleBuffer.SAMPLE_KEYS["Board Power Draw [W]"]
+        start_time = window_range["$lt"] - timedelta(seconds=1)
+        with Tracer.span("mongo_find", "mongo", collection=collection.name):
+            documents = [document for document in collection.find({"t": window_range},
+                                                                  {"t": 1, "w": 1, power_key: 1, "meta": 1})
+                         if SensorDataCollectionSystem.__contains_second(document, start_time)]
+        if not documents:
+            return f"Не найден документ с датой {log_datetime} в коллекции MongoDB для записи значения FPS"
+        runs = {}  # Идентификатор прохода -> (метаданные прохода, эффективность значений, время документа FPS)
+        for document in documents:
+            if document.get(power_key):
+                run = runs.setdefault(document["meta"]["run"], [document["meta"], [], start_time])
+                run[1].append(fps / document[power_key])
+                if document.get("w", 0) > 1000:
+                    run[2] = document["t"]
+        if not runs:
+            return f"Поле 'Board Power Draw [W]' отсутствует в документе с датой {log_datetime} в коллекции MongoDB"
+        fps_documents = [{"t": fps_time, "meta": meta, SampleBuffer.SAMPLE_KEYS["FPS"]: fps,
+                          SampleBuffer.SAMPLE_KEYS["Efficiency [FPS/W]"]: sum(efficiencies) / len(efficiencies)}
+                         for meta, efficiencies, fps_time in runs.values()]
+        with Tracer.span("mongo_insert_many", "mongo", collection=collection.name, count=len(fps_documents)):
+            collection.insert_many(fps_documents, ordered=False)
+        all_efficiencies = [efficiency for meta, efficiencies, fps_time in runs.values() for efficiency in efficiencies]
+        efficiency = sum(all_efficiencies) / len(all_efficiencies)
+        if len(all_efficiencies) == 1:
+            return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency}"
+        return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency} (среднее по {len(all_efficiencies)} значениям)"
+
+    # Записать FPS и FPS/W в хранилище SegmentSpool (записанные сегменты не изменяются): для каждого прохода - отдельная
+    # строка с FPS и средней эффективностью значений и окон агрегации, которые содержат секунду log_datetime
+    # (для окна длиннее секунды - со временем начала окна, как в коллекции временных рядов)
+    def __add_fps_to_spool(self, db_name, collection_name, log_datetime, fps, time_range):
+        start_time = time_range["$gte"]
+        runs = self.__get_spool_fps_index(db_name, collection_name).get(int(start_time.timestamp()))
+        if not runs:
+            return f"Не найден документ с датой {log_datetime} в коллекции MongoDB для записи значения FPS"
+        # Эффективность значения - FPS, делённый на потребление: средняя по значениям - FPS, умноженный на среднее 1/W
+        efficiencies = {run_id: (fps * inverse_power_sum / count, count, fps_time or start_time)
+                        for run_id, (inverse_power_sum, count, fps_time) in runs.items() if count}
+        if not efficiencies:
+            return f"Поле 'Board Power Draw [W]' отсутствует в документе с датой {log_datetime} в коллекции MongoDB"
+        for run_id, (run_efficiency, count, fps_time) in efficiencies.items():
+            self.__db_writer.write(db_name, collection_name, {
+                "run": run_id, "t": fps_time, SampleBuffer.SAMPLE_KEYS["FPS"]: fps,
+                SampleBuffer.SAMPLE_KEYS["Efficiency [FPS/W]"]: run_efficiency})
+        total_count = sum(count for run_efficiency, count, fps_time in efficiencies.values())
+        efficiency = sum(run_efficiency * count
+                         for run_efficiency, count, fps_time in efficiencies.values()) / total_count
+        if total_count == 1:
+            return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency}"
+        return f"{log_datetime} FPS: {fps}, Эффективность [FPS/W]: {efficiency} (среднее по {total_count} значениям)"
+
+    # Индекс значений коллекции хранилища SegmentSpool по секундам для записи FPS: Unix time начала секунды ->
+    # {идентификатор прохода: [сумма 1/W, число значений с потреблением, время начала окна длиннее секунды или None]}
+    # Окно агрегации попадает во все секунды, которые оно содержит. Строится одним чтением коллекции при первой
+    # записи FPS и используется для всех строк лога (сбрасывается при начале и окончании записи в коллекцию)
+    def __get_spool_fps_index(self, db_name, collection_name):
+        with self.__spool_fps_indexes_lock:
+            fps_index = self.__spool_fps_indexes.get((db_name, collection_name))
+            if fps_index is not None:
+                return fps_index
+            power_key = SampleBuffer.SAMPLE_KEYS["Board Power Draw [W]"]
+            with Tracer.span("spool_read", "spool", collection=collection_name):
+                columns = self.__db_writer.read_collection(db_name, collection_name,
+                                                           ["run", "t", "w", power_key]).to_pydict()
+            fps_index = {}
+            timestamps = columns.get("t", [])
+            for run_id, timestamp, window_ms, power in zip(columns.get("run", []), timestamps,
+                                                           columns.get("w", [None] * len(timestamps)),
+                                                           columns.get(power_key, [])):
+                if timestamp is None:
+                    continue
+                start = timestamp.timestamp()
+                end = start + (window_ms or 0) / 1000
+                for second in range(math.floor(start), max(math.floor(start) + 1, math.ceil(end))):
+                    run_values = fps_index.setdefault(second, {}).setdefault(run_id, [0.0, 0, None])
+                    if power:
+                        run_values[0] += 1 / power
+                        run_values[1] += 1
+                    if (window_ms or 0) > 1000:
+                        run_values[2] = timestamp
+            self.__spool_fps_indexes[(db_name, collection_name)] = fps_index
+            return fps_index
+
+    # Макс. длина окна агрегации в коллекции MongoDB в секундах (0 - в коллекции только исходные значения): окна,
+    # которые содержат секунду строки лога, ищутся среди начатых не раньше этого времени до неё. Определяется одним
+    # запросом при первой записи FPS в коллекцию (сбрасывается при начале и окончании записи в коллекцию)
+    def __get_max_window(self, collection):
+        key = (collection.database.name, collection.name)
+        with self.__window_fps_lock:
+            max_window = self.__max_windows.get(key)
+        if max_window is None:
+            with Tracer.span("mongo_find", "mongo", collection=collection.name):
+                document = collection.find_one({"w": {"$exists": True}}, {"w": 1}, sort=[("w", pymongo.DESCENDING)])
+            max_window = 0 if document is None else document["w"] / 1000
+            with self.__window_fps_lock:
+                self.__max_windows[key] = max_window
+        return max_window
+
+    # Содержит ли значение или окно агрегации (длиной "w" мс) время из секунды, которая начинается в start_time
+    # (документ начат раньше конца этой секунды)
+    @staticmethod
+    def __contains_second(document, start_time):
+        timestamp = document["t"] if document["t"].tzinfo is not None else document["t"].replace(tzinfo=timezone.utc)
+        return timestamp >= start_time or timestamp + timedelta(milliseconds=document.get("w", 0)) > start_time
+
+    # FPS для документа обычной коллекции: для окна агрегации длиннее секунды - среднее FPS всех секунд лога, которые
+    # в него попали (иначе FPS окна перезаписывался бы FPS каждой следующей секунды)
+    def __get_window_fps(self, document, fps):
+        if document.get("w", 0) <= 1000:
+            return fps
+        with self.__window_fps_lock:
+            window_fps = self.__window_fps.setdefault(document["_id"], [0.0, 0])
+            window_fps[0] += fps
+            window_fps[1] += 1
+            return window_fps[0] / window_fps[1]
+
+    # Сбросить индексы для записи FPS в коллекцию (значения в ней изменились или будут записаны заново)
+    def __drop_fps_indexes(self, db_name, collection_name):
+        with self.__spool_fps_indexes_lock:
+            self.__spool_fps_indexes.pop((db_name, collection_name), None)
+        with self.__window_fps_lock:
+            self.__max_windows.pop((db_name, collection_name), None)
+            self.__window_fps.clear()
 
     # Цикл обработки вызовов методов через сокеты
     def run(self):
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self.__address, self.__port))
-        server.listen(5)
-        print("Сервер системы сбора данных с сенсоров GPU запущен и ожидает подключения клиентов...")
-        while True:
-            client_socket, addr = server.accept()
-            print(f"Подключен клиент: {addr}")
-            client_handler = threading.Thread(target=self.__handle_client, args=(client_socket,))
-            client_handler.start()
+        # Таблица методов, доступных через сокеты: имя -> (метод, min и max число параметров)
+        methods = {
+            "get_gpu_data": (self.__get_gpu_data, 0, 1),
+            "print_gpu_data": (self.__print_gpu_data, 0, 1),
+            "save_gpu_data_to_db": (self.__save_gpu_data_to_db, 1, 3),
+            "set_gpu_clock_offset": (self.__set_gpu_clock_offset, 1, 2),
+            "set_mem_clock_offset": (self.__set_mem_clock_offset, 1, 2),
+            "set_benchmark_type": (self.__set_benchmark_type, 1, 1),
+            "print_tdp_info": (self.__print_tdp_info, 0, 1),
+            "print_gpu_clock_info": (self.__print_gpu_clock_info, 0, 1),
+            "calculate_fps_and_efficiency_in_collection": (self.__calculate_fps_and_efficiency_in_collection, 3, 4),
+            "start_recording": (self.__start_recording, 1, 3),
+            "stop_recording": (self.__stop_recording, 0, 0),
+            "start_replay": (self.__start_replay, 1, 4),
+            "is_recording": (self.__is_recording, 0, 0),
+            "save_run_energy": (self.__save_run_energy, 0, 2),
+            "invalidate_device_properties": (self.__invalidate_device_properties, 0, 1),
+            "get_device_indices": (self.__get_device_indices, 0, 0),
+            "get_db_writer_statistics": (self.__get_db_writer_statistics, 0, 0)
+        }
+        server = SocketServer(self.__address, self.__port, methods)
+        server.run("Сервер системы сбора данных с сенсоров GPU запущен и ожидает подключения клиентов...")
 
 
 system = SensorDataCollectionSystem()
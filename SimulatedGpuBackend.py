@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+
+# Модель GPU NVIDIA для проверки и нагрузочного тестирования систем без GPU и драйвера NVIDIA (интерфейс - как
+# у NvmlGpuBackend). Частота GPU - наибольшая частота (с шагом CLOCK_STEP), при которой потребление не превышает
+# Power Limit: потребление растёт с частотой и квадратом напряжения, а смещение частоты сдвигает кривую
+# напряжение-частота (та же частота - при меньшем напряжении). К значениям добавляется шум, к каждому вызову -
+# задержка, вызовы могут завершаться ошибкой (FAILURE_RATE или fail_next_calls)
+# Power Limit и смещения частот хранятся в файле STATE_FILE, поэтому изменения, сделанные системой андервольтинга,
+# видны системе сбора данных (как у реального GPU, параметры сохраняются после перезапуска систем)
+class SimulatedGpuBackend:
+    DEVICE_COUNT = 1  # Число моделируемых GPU
+    SEED = 0  # Начальное значение генератора случайных чисел (разброс свойств GPU, шум, задержки и ошибки)
+    STATE_FILE = os.path.join(tempfile.gettempdir(), "simulated_gpu_state.json")
+    STATE_CHECK_INTERVAL = 0.05  # Период проверки изменения файла состояния в секундах
+    # Свойства GPU (по умолчанию - как у GTX 1650)
+    DEFAULT_POWER_LIMIT = 75000  # мВт
+    POWER_LIMIT_CONSTRAINTS = (35000, 75000)  # мВт
+    MIN_GPU_CLOCK = 300  # Min частота GPU в P0 в MHz
+    MAX_GPU_CLOCK = 1905  # Max частота GPU в P0 без смещения в MHz
+    CLOCK_STEP = 15  # Шаг частоты GPU в MHz
+    MIN_VOLTAGE = 0.65  # Напряжение на min частоте GPU в вольтах
+    MAX_VOLTAGE = 1.05  # Напряжение на max частоте GPU без смещения в вольтах
+    MEMORY_CLOCK = 4001  # Частота памяти (значение NVML, эффективная частота - в 2 раза больше) в MHz
+    MEMORY_USED = 1024 * 1024 * 1024  # Используемая память в байтах
+    # Модель потребления: IDLE_POWER + LOAD * (GPU_POWER_COEFFICIENT * частота GPU * напряжение^2
+    # + MEMORY_POWER_COEFFICIENT * частота памяти) в мВт
+    LOAD = 1.0  # Нагрузка GPU (0 - простой, 1 - полная нагрузка бенчмарком)
+    IDLE_POWER = 10000
+    GPU_POWER_COEFFICIENT = 35.0
+    MEMORY_POWER_COEFFICIENT = 1.25
+    DEVICE_VARIATION = 0.05  # Разброс потребления между GPU (относительный)
+    AMBIENT_TEMPERATURE = 35  # Температура GPU без нагрузки в °C
+    THERMAL_RESISTANCE = 0.6  # Рост температуры на 1 Вт потребления в °C
+    # Шум значений: потребление (относительный), частота GPU (число шагов CLOCK_STEP), напряжение (в вольтах)
+    POWER_NOISE = 0.02
+    CLOCK_NOISE_STEPS = 1
+    VOLTAGE_NOISE = 0.005
+    # Задержка каждого вызова в секундах и её разброс (относительный), 0 - без задержки (макс. скорость опроса)
+    CALL_LATENCY = 0.0005
+    CALL_LATENCY_JITTER = 0.5
+    FAILURE_RATE = 0.0  # Вероятность ошибки вызова
+
+    def __init__(self):
+        self.__random = random.Random(SimulatedGpuBackend.SEED)
+        self.__lock = threading.Lock()  # Методы вызываются из нескольких потоков (опрос каждого GPU в своём потоке)
+        self.__states = {}  # Индекс GPU -> Power Limit и смещения частот
+        self.__state_mtime = None  # Время изменения файла состояния при последнем чтении
+        self.__state_check_time = 0.0
+        self.__operating_points = {}  # (индекс GPU, параметры GPU, нагрузка) -> частота, напряжение и потребление
+        self.__failing_calls = 0  # Число следующих вызовов, которые завершатся ошибкой (fail_next_calls)
+        # Разброс потребления GPU (у каждого GPU - свой, не меняется между запусками при том же SEED)
+        self.__power_scales = [1 + random.Random(SimulatedGpuBackend.SEED + index).uniform(
+            -SimulatedGpuBackend.DEVICE_VARIATION, SimulatedGpuBackend.DEVICE_VARIATION)
+            for index in range(SimulatedGpuBackend.DEVICE_COUNT)]
+
+    def init(self):
+        self.__load_state(force=True)
+
+    def shutdown(self):
+        pass
+
+    def get_device_count(self):
+        return SimulatedGpuBackend.DEVICE_COUNT
+
+    # Следующие count вызовов (любых методов) завершатся ошибкой
+    def fail_next_calls(self, count=1):
+        with self.__lock:
+            self.__failing_calls += count
+
+    # Загрузка GPU и контроллера памяти в %
+    def get_utilization_rates(self, device_index):
+        self.__call(device_index)
+        load = SimulatedGpuBackend.LOAD * 100
+        return (self.__clamp(round(self.__random.gauss(load, 1)), 0, 100),
+                self.__clamp(round(self.__random.gauss(load * 0.6, 1)), 0, 100))
+
+    # Используемая память в байтах
+    def get_memory_used(self, device_index):
+        self.__call(device_index)
+        return SimulatedGpuBackend.MEMORY_USED
+
+    def get_temperature(self, device_index):
+        self.__call(device_index)
+        return round(self.__get_temperature(device_index))
+
+    def get_fan_speed(self, device_index):
+        self.__call(device_index)
+        return self.__clamp(round(30 + (self.__get_temperature(device_index) - 50) * 2), 30, 100)
+
+    def get_gpu_clock(self, device_index):
+        self.__call(device_index)
+        gpu_clock = self.__get_operating_point(device_index)[0]
+        noise_steps = self.__random.randint(-SimulatedGpuBackend.CLOCK_NOISE_STEPS,
+                                            SimulatedGpuBackend.CLOCK_NOISE_STEPS)
+        return self.__clamp(gpu_clock + noise_steps * SimulatedGpuBackend.CLOCK_STEP,
+                            SimulatedGpuBackend.MIN_GPU_CLOCK, self.__get_max_gpu_clock(device_index))
+
+    # Частота памяти в MHz (эффективная частота DDR - в 2 раза больше)
+    def get_memory_clock(self, device_index):
+        self.__call(device_index)
+        return self.__get_memory_clock(device_index)
+
+    # Потребление платы в мВт
+    def get_power_usage(self, device_index):
+        self.__call(device_index)
+        power = self.__get_operating_point(device_index)[2]
+        return max(0, round(power * self.__random.gauss(1, SimulatedGpuBackend.POWER_NOISE)))
+
+    # Напряжение GPU в вольтах
+    def get_core_voltage(self, device_index):
+        self.__call(device_index)
+        return self.__get_operating_point(device_index)[1] + self.__random.gauss(0, SimulatedGpuBackend.VOLTAGE_NOISE)
+
+    # Действующий Power Limit в мВт
+    def get_enforced_power_limit(self, device_index):
+        self.__call(device_index)
+        return self.__get_state(device_index)["power_limit"]
+
+    # Заданный Power Limit в мВт
+    def get_power_limit(self, device_index):
+        self.__call(device_index)
+        return self.__get_state(device_index)["power_limit"]
+
+    def get_default_power_limit(self, device_index):
+        self.__call(device_index)
+        return SimulatedGpuBackend.DEFAULT_POWER_LIMIT
+
+    # Ограничения Power Limit (min, max) в мВт
+    def get_power_limit_constraints(self, device_index):
+        self.__call(device_index)
+        return SimulatedGpuBackend.POWER_LIMIT_CONSTRAINTS
+
+    # Min и max частоты GPU в P-State P0 в MHz (max частота - с учётом смещения)
+    def get_min_max_gpu_clock(self, device_index):
+        self.__call(device_index)
+        return SimulatedGpuBackend.MIN_GPU_CLOCK, self.__get_max_gpu_clock(device_index)
+
+    # Изменить Power Limit (значение вне ограничений - ошибка, как у NVML)
+    def set_power_limit(self, device_index, milliwatt_value):
+        self.__call(device_index)
+        min_power_limit, max_power_limit = SimulatedGpuBackend.POWER_LIMIT_CONSTRAINTS
+        if not min_power_limit <= milliwatt_value <= max_power_limit:
+            raise ValueError(f"Power Limit {milliwatt_value} мВт вне ограничений {min_power_limit} - {max_power_limit}")
+        self.__set_state(device_index, "power_limit", int(milliwatt_value))
+
+    def set_gpu_clock_offset(self, device_index, megahertz_value):
+        self.__call(device_index)
+        self.__set_state(device_index, "gpu_clock_offset", megahertz_value)
+
+    def set_mem_clock_offset(self, device_index, megahertz_value):
+        self.__call(device_index)
+        self.__set_state(device_index, "mem_clock_offset", megahertz_value)
+
+    # Задержка вызова и ошибки (общие для всех методов)
+    def __call(self, device_index):
+        if not 0 <= device_index < SimulatedGpuBackend.DEVICE_COUNT:
+            raise ValueError(f"GPU с индексом {device_index} не найден")
+        if SimulatedGpuBackend.CALL_LATENCY > 0:
+            jitter = SimulatedGpuBackend.CALL_LATENCY_JITTER
+            time.sleep(SimulatedGpuBackend.CALL_LATENCY * self.__random.uniform(1 - jitter, 1 + jitter))
+        with self.__lock:
+            failing = self.__failing_calls > 0
+            if failing:
+                self.__failing_calls -= 1
+        if failing or (SimulatedGpuBackend.FAILURE_RATE > 0
+                       and self.__random.random() < SimulatedGpuBackend.FAILURE_RATE):
+            raise RuntimeError(f"Моделируемая ошибка вызова для GPU {device_index}")
+
+    @staticmethod
+    def __clamp(value, min_value, max_value):
+        return max(min_value, min(max_value, value))
+
+    # Power Limit и смещения частот GPU (из файла состояния, если он изменён другим процессом)
+    def __get_state(self, device_index):
+        self.__load_state()
+        return self.__states.get(str(device_index)) or self.__get_default_state()
+
+    @staticmethod
+    def __get_default_state():
+        return {"power_limit": SimulatedGpuBackend.DEFAULT_POWER_LIMIT, "gpu_clock_offset": 0, "mem_clock_offset": 0}
+
+    # Прочитать файл состояния, если он изменился (не чаще чем раз в STATE_CHECK_INTERVAL, кроме force)
+    def __load_state(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.__state_check_time < SimulatedGpuBackend.STATE_CHECK_INTERVAL:
+            return
+        with self.__lock:
+            self.__state_check_time = now
+            try:
+                mtime = os.stat(SimulatedGpuBackend.STATE_FILE).st_mtime_ns
+                if mtime != self.__state_mtime:
+                    with open(SimulatedGpuBackend.STATE_FILE, encoding="utf-8") as file:
+                        self.__states = json.load(file)
+                    self.__state_mtime = mtime
+            except (OSError, ValueError):
+                pass  # Файла ещё нет или он заменяется другим процессом - используется прежнее состояние
+
+    # Изменить параметр GPU и записать файл состояния (во временный файл с переименованием: другой процесс
+    # не прочитает недописанный файл)
+    def __set_state(self, device_index, key, value):
+        self.__load_state(force=True)
+        with self.__lock:
+            self.__states.setdefault(str(device_index), self.__get_default_state())[key] = value
+            temp_path = f"{SimulatedGpuBackend.STATE_FILE}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.__states, file)
+            os.replace(temp_path, SimulatedGpuBackend.STATE_FILE)
+            self.__state_mtime = os.stat(SimulatedGpuBackend.STATE_FILE).st_mtime_ns
+
+    def __get_max_gpu_clock(self, device_index):
+        return SimulatedGpuBackend.MAX_GPU_CLOCK + self.__get_state(device_index)["gpu_clock_offset"]
+
+    def __get_memory_clock(self, device_index):
+        return SimulatedGpuBackend.MEMORY_CLOCK + self.__get_state(device_index)["mem_clock_offset"]
+
+    # Частота GPU, напряжение и потребление (без шума): наибольшая частота, при которой потребление
+    # не превышает Power Limit (но не ниже min частоты). Результат хранится до изменения параметров GPU
+    def __get_operating_point(self, device_index):
+        state = self.__get_state(device_index)
+        key = (device_index, state["power_limit"], state["gpu_clock_offset"], state["mem_clock_offset"],
+               SimulatedGpuBackend.LOAD)
+        operating_point = self.__operating_points.get(key)
+        if operating_point is None:
+            operating_point = self.__operating_points[key] = self.__find_operating_point(device_index, state)
+        return operating_point
+
+    def __find_operating_point(self, device_index, state):
+        min_clock = SimulatedGpuBackend.MIN_GPU_CLOCK
+        max_clock = SimulatedGpuBackend.MAX_GPU_CLOCK
+        memory_power = SimulatedGpuBackend.MEMORY_POWER_COEFFICIENT * (SimulatedGpuBackend.MEMORY_CLOCK
+                                                                       + state["mem_clock_offset"])
+        gpu_clock = max_clock + state["gpu_clock_offset"]
+        while True:
+            # Напряжение на частоте GPU (смещение частоты сдвигает кривую напряжение-частота)
+            ratio = min(1.0, max(0.0, (gpu_clock - state["gpu_clock_offset"] - min_clock) / (max_clock - min_clock)))
+            voltage = SimulatedGpuBackend.MIN_VOLTAGE + (SimulatedGpuBackend.MAX_VOLTAGE
+                                                         - SimulatedGpuBackend.MIN_VOLTAGE) * ratio
+            dynamic_power = SimulatedGpuBackend.GPU_POWER_COEFFICIENT * gpu_clock * voltage ** 2 + memory_power
+            power = (SimulatedGpuBackend.IDLE_POWER
+                     + SimulatedGpuBackend.LOAD * dynamic_power * self.__power_scales[device_index])
+            if power <= state["power_limit"] or gpu_clock - SimulatedGpuBackend.CLOCK_STEP < min_clock:
+                return gpu_clock, voltage, power
+            gpu_clock -= SimulatedGpuBackend.CLOCK_STEP
+
+    def __get_temperature(self, device_index):
+        power = self.__get_operating_point(device_index)[2]
+        return (SimulatedGpuBackend.AMBIENT_TEMPERATURE + SimulatedGpuBackend.THERMAL_RESISTANCE * power / 1000
+                + self.__random.gauss(0, 0.3))
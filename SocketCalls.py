@@ -1,5 +1,18 @@
+import asyncio
+import atexit
+import contextvars
+import itertools
+import os
+import select
 import socket
+import struct
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from MessageCodec import MessageCodec
+from RpcStatistics import RpcStatistics
+from Tracer import Tracer
 
 
 class SocketCalls:
@@ -15,68 +28,447 @@ class SocketCalls:
     DATA_ANALYSIS_SYSTEM_ADDRESS = "localhost"
     DATA_ANALYSIS_SYSTEM_PORT = 1237
 
-    TIMEOUT = 3600  # Время ожидания ответа на запрос в секундах
+    TIMEOUT = 3600  # Время ожидания ответа на запрос в секундах (для методов, которых нет в METHOD_TIMEOUTS)
+    # Время ожидания ответа для отдельных методов в секундах (отсчитывается от отправки запроса, подключение - отдельно,
+    # см. CONNECT_TIMEOUT). Срок выполнения передаётся серверу и отсчитывается им от получения запроса (вместе со
+    # временем ожидания свободного потока): вызовы, срок которых истёк, сервер не выполняет, поэтому зависший опрос
+    # сенсоров завершается ошибкой за доли секунды, а вызов, который клиент перестал ждать, отменяется
+    METHOD_TIMEOUTS = {
+        "get_gpu_data": 0.5,
+        "print_gpu_data": 0.5,
+        "save_gpu_data_to_db": 5,
+        "set_benchmark_type": 0.5,
+        "print_tdp_info": 0.5,
+        "print_gpu_clock_info": 0.5,
+        "check_benchmark_log_for_normal_shutdown": 5,
+        "start_recording": 5,
+        "stop_recording": 60,
+        "start_replay": 30,
+        "is_recording": 0.5,
+        "save_run_energy": 5,
+        "get_db_writer_statistics": 0.5,
+        "invalidate_device_properties": 0.5,
+        "get_device_indices": 0.5,
+        "get_rpc_statistics": 5,
+        "print_rpc_statistics": 5,
+        "reset_rpc_statistics": 5
+    }
+    CANCEL_TIMEOUT = 5  # Время ожидания ответа на сообщение об отмене вызова в секундах
+    # Время на подключение к системе с повторными попытками в секундах (не меньше времени ожидания ответа вызова):
+    # с запасом на запуск и перезапуск системы супервизором RunAllSystems
+    CONNECT_TIMEOUT = 30
+    # Задержка перед повторной попыткой подключения к ещё не запущенной системе в секундах
+    # (удваивается при каждой неудачной попытке, но не больше MAX_CONNECT_RETRY_DELAY)
+    CONNECT_RETRY_DELAY = 0.01
+    MAX_CONNECT_RETRY_DELAY = 1
+    MAX_IDLE_CONNECTIONS = 8  # Макс. число свободных соединений в пуле для одной системы
+    MAX_MESSAGE_SIZE = 1 << 30  # Макс. размер одного сообщения в байтах
 
-    # Вызвать метод класса одной из систем через сокеты
+    # Транспорт для систем, запущенных на одном компьютере: Unix domain socket вместо TCP (если поддерживается ОС)
+    # Серверы систем при этом продолжают принимать подключения и по TCP (для удалённых клиентов)
+    USE_UNIX_SOCKETS = False
+    UNIX_SOCKET_DIR = tempfile.gettempdir()  # Каталог для файлов сокетов
+    UNIX_SOCKET_ABSTRACT = False  # Использовать абстрактное пространство имён вместо файла (только Linux)
+    LOCAL_ADDRESSES = ("localhost", "127.0.0.1", "::1")  # Адреса, для которых используется Unix domain socket
+
+    MAX_ASYNC_CALLS = 16  # Макс. число одновременно выполняемых неблокирующих вызовов
+
+    # Заголовок кадра сообщения: длина закодированного сообщения (4 байта, big-endian)
+    FRAME_HEADER = struct.Struct(">I")
+
+    # Статистика вызовов методов других систем из этого процесса (задержка с учётом сети и повторных попыток)
+    client_statistics = RpcStatistics()
+
+    # Пул постоянных (keep-alive) соединений: (адрес, порт, флаг Unix domain socket) -> список свободных сокетов
+    __connection_pool = {}
+    __connection_pool_lock = threading.Lock()
+
+    # Пул потоков для неблокирующих вызовов (создаётся при первом неблокирующем вызове)
+    __async_executor = None
+    __async_executor_lock = threading.Lock()
+
+    __request_ids = itertools.count(1)  # Счётчик для идентификаторов запросов (для отмены вызовов)
+
+    # Использовать ли Unix domain socket для подключения к системе с указанным адресом
+    @staticmethod
+    def uses_unix_socket(address):
+        return (SocketCalls.USE_UNIX_SOCKETS and hasattr(socket, "AF_UNIX")
+                and address in SocketCalls.LOCAL_ADDRESSES)
+
+    # Путь Unix domain socket системы с указанным портом
     @staticmethod
-    def call_method(address, port, method_name, *args):
-        while True:  # Бесконечный цикл для повторных попыток
+    def get_unix_socket_path(port):
+        socket_name = f"gpu_power_model_{port}.sock"
+        if SocketCalls.UNIX_SOCKET_ABSTRACT:
+            return "\0" + socket_name
+        return os.path.join(SocketCalls.UNIX_SOCKET_DIR, socket_name)
+
+    # Время ожидания ответа на вызов метода в секундах
+    @staticmethod
+    def get_timeout(method_name):
+        return SocketCalls.METHOD_TIMEOUTS.get(method_name, SocketCalls.TIMEOUT)
+
+    # Новый идентификатор запроса, уникальный среди клиентов одного компьютера
+    @staticmethod
+    def __new_request_id():
+        return f"{os.getpid()}-{next(SocketCalls.__request_ids)}"
+
+    # Взять свободное соединение из пула или открыть новое (второе значение - флаг, что соединение взято из пула)
+    # Соединения пула, закрытые сервером (например, при перезапуске системы), закрываются и не используются
+    @staticmethod
+    def __acquire_connection(endpoint, timeout):
+        while True:
+            with SocketCalls.__connection_pool_lock:
+                idle_connections = SocketCalls.__connection_pool.get(endpoint)
+                client = idle_connections.pop() if idle_connections else None
+            if client is None:
+                break
+            if SocketCalls.__is_connection_alive(client):
+                return client, True
+            client.close()
+        address, port, unix = endpoint
+        if unix:
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
             client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            try:
-                # Установка таймаута ожидания
-                client.settimeout(SocketCalls.TIMEOUT)
+        try:
+            # Установка таймаута ожидания подключения
+            client.settimeout(timeout)
+            if unix:
+                client.connect(SocketCalls.get_unix_socket_path(port))
+            else:
+                # Отключить алгоритм Нейгла, чтобы короткие запросы отправлялись без задержки
+                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 client.connect((address, port))
-                # Формирование запроса
-                request = f"{method_name}," + ",".join(map(str, args))
-                client.send(request.encode('utf-8'))
-                # Получение ответа
-                response = client.recv(4096)
-                response_str = response.decode('utf-8')
-                # Попытка преобразовать строку в кортеж, если это возможно
-                try:
-                    response_tuple = eval(response_str)
-                    if isinstance(response_tuple, tuple):
-                        return response_tuple
-                except (SyntaxError, NameError):
-                    # Игнорировать ошибку, если строка не является кортежем
-                    pass
-                # Преобразование response в int или bool, если возможно
-                if response_str.isdigit():
-                    return int(response_str)
-                elif response_str.lower() == "true":
-                    return True
-                elif response_str.lower() == "false":
-                    return False
-                elif response_str == "None":
+        except Exception:
+            client.close()
+            raise
+        return client, False
+
+    # Свободное соединение открыто сервером: в нём нечего читать (иначе сервер закрыл соединение или в нём остались
+    # данные, которые не относятся к следующему запросу)
+    @staticmethod
+    def __is_connection_alive(client):
+        try:
+            readable, _, _ = select.select([client], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    # Вернуть соединение в пул для повторного использования
+    @staticmethod
+    def __release_connection(endpoint, client):
+        with SocketCalls.__connection_pool_lock:
+            idle_connections = SocketCalls.__connection_pool.setdefault(endpoint, [])
+            if len(idle_connections) < SocketCalls.MAX_IDLE_CONNECTIONS:
+                idle_connections.append(client)
+                return
+        client.close()
+
+    # Закрыть все свободные соединения пула (при завершении программы)
+    @staticmethod
+    def close_connections():
+        with SocketCalls.__connection_pool_lock:
+            for idle_connections in SocketCalls.__connection_pool.values():
+                for client in idle_connections:
+                    client.close()
+            SocketCalls.__connection_pool.clear()
+
+    # Отправить сообщение (кадр с префиксом длины и двоичным кодированием MessageCodec)
+    @staticmethod
+    def send_message(sock, message):
+        payload = MessageCodec.encode(message)
+        sock.sendall(SocketCalls.FRAME_HEADER.pack(len(payload)) + payload)
+
+    # Получить сообщение целиком (None, если соединение закрыто до начала нового сообщения)
+    @staticmethod
+    def recv_message(sock):
+        header = SocketCalls.__recv_exactly(sock, SocketCalls.FRAME_HEADER.size, allow_eof=True)
+        if header is None:
+            return None
+        length = SocketCalls.FRAME_HEADER.unpack(header)[0]
+        if length > SocketCalls.MAX_MESSAGE_SIZE:
+            raise ValueError(f"Размер сообщения {length} байт превышает допустимый")
+        return MessageCodec.decode(SocketCalls.__recv_exactly(sock, length))
+
+    # Прочитать из сокета ровно size байт
+    @staticmethod
+    def __recv_exactly(sock, size, allow_eof=False):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if count == 0:
+                if allow_eof and received == 0:
                     return None
-                else:
-                    return response_str
-            except ConnectionRefusedError as e:
+                raise ConnectionResetError("Соединение закрыто до получения сообщения целиком")
+            received += count
+        return buffer
+
+    # Получить ответ на отправленный запрос
+    @staticmethod
+    def __recv_response(client):
+        response = SocketCalls.recv_message(client)
+        if response is None:
+            # Сервер закрыл соединение (например, был перезапущен)
+            raise ConnectionResetError("Соединение закрыто сервером")
+        return response
+
+    # Отправить запрос системе с повторными попытками подключения (до CONNECT_TIMEOUT, но не меньше timeout секунд)
+    # и ждать ответа timeout секунд после отправки (None, если получить ответ не удалось)
+    @staticmethod
+    def __call(address, port, request, timeout):
+        endpoint = (address, port, SocketCalls.uses_unix_socket(address))
+        connect_timeout = max(SocketCalls.CONNECT_TIMEOUT, timeout)
+        connect_deadline = time.monotonic() + connect_timeout
+        retry_delay = SocketCalls.CONNECT_RETRY_DELAY
+        while True:  # Цикл для повторных попыток
+            remaining_time = connect_deadline - time.monotonic()
+            if remaining_time <= 0:
+                print(f"Не удалось подключиться к системе за {connect_timeout} с")
+                return None
+            try:
+                client, reused = SocketCalls.__acquire_connection(endpoint, remaining_time)
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                # Сервер системы ещё не запущен (для Unix domain socket - файл сокета ещё не создан)
                 print(f"Ошибка подключения: {e}. Повторная попытка...")
-                time.sleep(1)  # Задержка перед повторной попыткой
+                time.sleep(min(retry_delay, remaining_time))  # Задержка перед повторной попыткой
+                retry_delay = min(retry_delay * 2, SocketCalls.MAX_CONNECT_RETRY_DELAY)
                 continue  # Продолжить цикл
             except Exception as e:
                 print(f"Ошибка при вызове метода: {e}")
                 return None
-            finally:
+            client.settimeout(timeout)  # Ожидание ответа - от отправки запроса, без учёта времени подключения
+            try:
+                SocketCalls.send_message(client, request)
+            except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError) as e:
+                client.close()
+                if reused:
+                    # Соединение из пула устарело - запрос не отправлен целиком, и сервер его не выполнял:
+                    # повторить запрос по новому соединению
+                    continue
+                print(f"Ошибка при вызове метода: {e}")
+                return None
+            except Exception as e:
+                client.close()
+                print(f"Ошибка при вызове метода: {e}")
+                return None
+            # Запрос отправлен - сервер мог его выполнить, поэтому при ошибке запрос не повторяется
+            # (иначе, например, уменьшение Power Limit или смещения частоты было бы выполнено дважды)
+            try:
+                response = SocketCalls.__recv_response(client)
+            except TimeoutError:
+                # Ответ может прийти позже, поэтому соединение больше не используется
+                client.close()
+                print(f"Истекло время ожидания ответа ({timeout} с)")
+                if "id" in request:
+                    # Сообщить серверу, что результат больше не нужен (не дожидаясь ответа)
+                    SocketCalls.__get_async_executor().submit(SocketCalls.cancel, address, port, request["id"])
+                return None
+            except Exception as e:
                 client.close()
+                print(f"Ошибка при вызове метода: {e}")
+                return None
+            SocketCalls.__release_connection(endpoint, client)
+            return response
 
+    # Вызвать метод класса одной из систем через сокеты
+    # timeout - время ожидания ответа в секундах (по умолчанию - из METHOD_TIMEOUTS или TIMEOUT)
+    @staticmethod
+    def call_method(address, port, method_name, *args, timeout=None):
+        if timeout is None:
+            timeout = SocketCalls.get_timeout(method_name)
+        # Формирование запроса (срок выполнения передаётся серверу относительным, в миллисекундах)
+        request = {"method": method_name, "args": list(args), "id": SocketCalls.__new_request_id(),
+                   "timeout_ms": int(timeout * 1000)}
+        start_time = time.perf_counter()
+        with Tracer.span(method_name, "rpc_client", port=port):
+            response = SocketCalls.__call(address, port, SocketCalls.__add_trace_context(request), timeout)
+        SocketCalls.client_statistics.record(method_name, time.perf_counter() - start_time,
+                                             response is None or "error" in response)
+        if response is None:
+            return None
+        if "error" in response:
+            print(f"Ошибка при вызове метода {method_name}: {response['error']}")
+            return None
+        return response["result"]
+
+    # Вызвать несколько методов одной из систем за один запрос (сервер выполняет их по порядку)
+    # calls - список пар (имя метода, список параметров), результат - список результатов в том же порядке
+    # timeout - время ожидания ответа в секундах (по умолчанию - сумма для методов пакета, но не больше TIMEOUT)
+    @staticmethod
+    def call_batch(address, port, calls, timeout=None):
+        if timeout is None:
+            timeout = min(sum(SocketCalls.get_timeout(method_name) for method_name, _ in calls), SocketCalls.TIMEOUT)
+        # Формирование пакетного запроса
+        request = {"batch": [{"method": method_name, "args": list(args)} for method_name, args in calls],
+                   "id": SocketCalls.__new_request_id(), "timeout_ms": int(timeout * 1000)}
+        # Статистика и интервал трассировки пакета записываются под именем из перечня различных методов пакета
+        batch_name = f"batch({', '.join(dict.fromkeys(method_name for method_name, _ in calls))})"
+        start_time = time.perf_counter()
+        with Tracer.span(batch_name, "rpc_client", port=port):
+            response = SocketCalls.__call(address, port, SocketCalls.__add_trace_context(request), timeout)
+        SocketCalls.client_statistics.record(batch_name, time.perf_counter() - start_time,
+                                             response is None or "error" in response
+                                             or any("error" in call_response for call_response in response["results"]))
+        if response is None:
+            return [None] * len(calls)
+        if "error" in response:
+            print(f"Ошибка при вызове пакета методов: {response['error']}")
+            return [None] * len(calls)
+        results = []
+        for (method_name, _), call_response in zip(calls, response["results"]):
+            if "error" in call_response:
+                print(f"Ошибка при вызове метода {method_name}: {call_response['error']}")
+                results.append(None)
+            else:
+                results.append(call_response["result"])
+        return results
+
+    # Добавить в запрос контекст трассировки (идентификатор трассировки и интервала вызова), если она ведётся
+    @staticmethod
+    def __add_trace_context(request):
+        trace_context = Tracer.get_context()
+        if trace_context is not None:
+            request["trace"] = list(trace_context)
+        return request
+
+    # Отменить выполняемый системой вызов по идентификатору запроса (результат - число отменённых вызовов)
+    @staticmethod
+    def cancel(address, port, request_id):
+        response = SocketCalls.__call(address, port, {"cancel": request_id}, SocketCalls.CANCEL_TIMEOUT)
+        return None if response is None else response.get("result")
+
+    # Отменить все выполняемые системой вызовы метода (для долгих методов, например run_benchmark)
+    # Метод системы завершается досрочно, если проверяет SocketServer.is_cancelled(), иначе отменяются только
+    # ещё не начатые вызовы пакета
+    @staticmethod
+    def cancel_method(address, port, method_name):
+        response = SocketCalls.__call(address, port, {"cancel_method": method_name}, SocketCalls.CANCEL_TIMEOUT)
+        return None if response is None else response.get("result")
+
+    @staticmethod
+    def __get_async_executor():
+        with SocketCalls.__async_executor_lock:
+            if SocketCalls.__async_executor is None:
+                SocketCalls.__async_executor = ThreadPoolExecutor(max_workers=SocketCalls.MAX_ASYNC_CALLS)
+            return SocketCalls.__async_executor
+
+    # Неблокирующий вызов метода одной из систем: возвращает concurrent.futures.Future с результатом call_method()
+    # В коде на asyncio результат можно ожидать через await asyncio.wrap_future(future) или SocketCalls.gather_async()
+    # Вызов выполняется в копии контекста вызывающего потока (чтобы сохранить контекст трассировки)
     @staticmethod
-    def call_method_of_sensor_data_collection_system(function_name, *args):
+    def call_method_async(address, port, method_name, *args, timeout=None):
+        return SocketCalls.__get_async_executor().submit(contextvars.copy_context().run, SocketCalls.call_method,
+                                                         address, port, method_name, *args, timeout=timeout)
+
+    # Неблокирующий пакетный вызов методов одной из систем: возвращает Future с результатом call_batch()
+    @staticmethod
+    def call_batch_async(address, port, calls, timeout=None):
+        return SocketCalls.__get_async_executor().submit(contextvars.copy_context().run, SocketCalls.call_batch,
+                                                         address, port, calls, timeout)
+
+    # Дождаться завершения всех неблокирующих вызовов и получить их результаты в том же порядке
+    @staticmethod
+    def gather(*futures):
+        return [future.result() for future in futures]
+
+    # Дождаться завершения всех неблокирующих вызовов из кода на asyncio (не блокируя цикл событий)
+    @staticmethod
+    async def gather_async(*futures):
+        return list(await asyncio.gather(*(asyncio.wrap_future(future) for future in futures)))
+
+    @staticmethod
+    def call_method_of_sensor_data_collection_system(function_name, *args, timeout=None):
         return SocketCalls.call_method(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS,
-                                       SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT, function_name, *args)
+                                       SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT, function_name, *args,
+                                       timeout=timeout)
 
     @staticmethod
-    def call_method_of_benchmark_test_system(function_name, *args):
+    def call_method_of_benchmark_test_system(function_name, *args, timeout=None):
         return SocketCalls.call_method(SocketCalls.BENCHMARK_TEST_SYSTEM_ADDRESS,
-                                       SocketCalls.BENCHMARK_TEST_SYSTEM_PORT, function_name, *args)
+                                       SocketCalls.BENCHMARK_TEST_SYSTEM_PORT, function_name, *args, timeout=timeout)
 
     @staticmethod
-    def call_method_of_undervolting_gpu_system(function_name, *args):
+    def call_method_of_undervolting_gpu_system(function_name, *args, timeout=None):
         return SocketCalls.call_method(SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS,
-                                       SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, function_name, *args)
+                                       SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, function_name, *args, timeout=timeout)
 
     @staticmethod
-    def call_method_of_data_analysis_system(function_name, *args):
+    def call_method_of_data_analysis_system(function_name, *args, timeout=None):
         return SocketCalls.call_method(SocketCalls.DATA_ANALYSIS_SYSTEM_ADDRESS,
-                                       SocketCalls.DATA_ANALYSIS_SYSTEM_PORT, function_name, *args)
+                                       SocketCalls.DATA_ANALYSIS_SYSTEM_PORT, function_name, *args, timeout=timeout)
+
+    @staticmethod
+    def call_batch_of_sensor_data_collection_system(calls, timeout=None):
+        return SocketCalls.call_batch(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS,
+                                      SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT, calls, timeout)
+
+    @staticmethod
+    def call_batch_of_benchmark_test_system(calls, timeout=None):
+        return SocketCalls.call_batch(SocketCalls.BENCHMARK_TEST_SYSTEM_ADDRESS,
+                                      SocketCalls.BENCHMARK_TEST_SYSTEM_PORT, calls, timeout)
+
+    @staticmethod
+    def call_batch_of_undervolting_gpu_system(calls, timeout=None):
+        return SocketCalls.call_batch(SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS,
+                                      SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, calls, timeout)
+
+    @staticmethod
+    def call_batch_of_data_analysis_system(calls, timeout=None):
+        return SocketCalls.call_batch(SocketCalls.DATA_ANALYSIS_SYSTEM_ADDRESS,
+                                      SocketCalls.DATA_ANALYSIS_SYSTEM_PORT, calls, timeout)
+
+    @staticmethod
+    def call_method_of_sensor_data_collection_system_async(function_name, *args, timeout=None):
+        return SocketCalls.call_method_async(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS,
+                                             SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT, function_name, *args,
+                                             timeout=timeout)
+
+    @staticmethod
+    def call_method_of_benchmark_test_system_async(function_name, *args, timeout=None):
+        return SocketCalls.call_method_async(SocketCalls.BENCHMARK_TEST_SYSTEM_ADDRESS,
+                                             SocketCalls.BENCHMARK_TEST_SYSTEM_PORT, function_name, *args,
+                                             timeout=timeout)
+
+    @staticmethod
+    def call_method_of_undervolting_gpu_system_async(function_name, *args, timeout=None):
+        return SocketCalls.call_method_async(SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS,
+                                             SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, function_name, *args,
+                                             timeout=timeout)
+
+    @staticmethod
+    def call_batch_of_undervolting_gpu_system_async(calls, timeout=None):
+        return SocketCalls.call_batch_async(SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS,
+                                            SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, calls, timeout)
+
+    @staticmethod
+    def call_method_of_data_analysis_system_async(function_name, *args, timeout=None):
+        return SocketCalls.call_method_async(SocketCalls.DATA_ANALYSIS_SYSTEM_ADDRESS,
+                                             SocketCalls.DATA_ANALYSIS_SYSTEM_PORT, function_name, *args,
+                                             timeout=timeout)
+
+    @staticmethod
+    def cancel_method_of_sensor_data_collection_system(method_name):
+        return SocketCalls.cancel_method(SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_ADDRESS,
+                                         SocketCalls.SENSOR_DATA_COLLECTION_SYSTEM_PORT, method_name)
+
+    @staticmethod
+    def cancel_method_of_benchmark_test_system(method_name):
+        return SocketCalls.cancel_method(SocketCalls.BENCHMARK_TEST_SYSTEM_ADDRESS,
+                                         SocketCalls.BENCHMARK_TEST_SYSTEM_PORT, method_name)
+
+    @staticmethod
+    def cancel_method_of_undervolting_gpu_system(method_name):
+        return SocketCalls.cancel_method(SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS,
+                                         SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT, method_name)
+
+    @staticmethod
+    def cancel_method_of_data_analysis_system(method_name):
+        return SocketCalls.cancel_method(SocketCalls.DATA_ANALYSIS_SYSTEM_ADDRESS,
+                                         SocketCalls.DATA_ANALYSIS_SYSTEM_PORT, method_name)
+
+
+# Закрыть соединения пула при завершении программы
+atexit.register(SocketCalls.close_connections)
@@ -0,0 +1,246 @@
+import asyncio
+import contextlib
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from MessageCodec import MessageCodec
+from RpcStatistics import RpcStatistics
+from SocketCalls import SocketCalls
+from Tracer import Tracer
+
+
+# Общий асинхронный сервер для вызова методов систем через сокеты
+# Все соединения обслуживаются в одном цикле событий asyncio, а сами методы систем (блокирующие вызовы NVML, MongoDB,
+# LightGBM и т.д.) выполняются в пуле потоков ограниченного размера
+class SocketServer:
+    MAX_WORKERS = 8  # Макс. число потоков для выполнения методов систем
+    BACKLOG = 128  # Размер очереди входящих подключений
+    # Строка, которую сервер выводит, когда готов принимать подключения (по ней супервизор RunAllSystems определяет
+    # готовность системы без повторных попыток подключения)
+    READY_MARKER = "SOCKET_SERVER_READY"
+
+    # Выполняемый в текущем потоке запрос: (событие отмены, срок выполнения по time.monotonic() или None)
+    __current_request = threading.local()
+
+    # methods - таблица методов системы: имя -> (метод, min число параметров, max число параметров)
+    def __init__(self, address, port, methods, max_workers=MAX_WORKERS):
+        self.__address = address
+        self.__port = port
+        self.__methods = dict(methods)
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__statistics = RpcStatistics()  # Статистика выполнения методов этой системы
+        # Выполняемые и ожидающие свободного потока запросы: идентификатор -> (множество имён методов, событие отмены)
+        self.__active_requests = {}
+        self.__active_requests_lock = threading.Lock()
+        # Встроенные методы для получения статистики вызовов, доступные у каждой системы
+        self.__methods["get_rpc_statistics"] = (self.__get_rpc_statistics, 0, 0)
+        self.__methods["print_rpc_statistics"] = (self.__print_rpc_statistics, 0, 0)
+        self.__methods["reset_rpc_statistics"] = (self.__reset_rpc_statistics, 0, 0)
+
+    # Отменён ли клиентом выполняемый в текущем потоке вызов или истёк ли срок его выполнения (от получения запроса)
+    # Долгие методы систем (например, run_benchmark) периодически проверяют это и завершаются досрочно
+    @staticmethod
+    def is_cancelled():
+        request = getattr(SocketServer.__current_request, "request", None)
+        if request is None:
+            return False
+        cancel_event, deadline = request
+        return cancel_event.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+    # Запуск сервера (блокирует текущий поток до завершения программы)
+    def run(self, start_message):
+        asyncio.run(self.__serve(start_message))
+
+    async def __serve(self, start_message):
+        servers = [await asyncio.start_server(self.__handle_client, self.__address, self.__port,
+                                              backlog=SocketServer.BACKLOG)]
+        unix_socket_path = None
+        if SocketCalls.uses_unix_socket(self.__address):
+            # Дополнительно принимать подключения через Unix domain socket от систем на этом же компьютере
+            unix_socket_path = SocketCalls.get_unix_socket_path(self.__port)
+            SocketServer.__remove_unix_socket_file(unix_socket_path)  # Файл мог остаться после аварийного завершения
+            servers.append(await asyncio.start_unix_server(self.__handle_client, path=unix_socket_path,
+                                                           backlog=SocketServer.BACKLOG))
+        print(start_message)
+        print(f"{SocketServer.READY_MARKER} {self.__port}", flush=True)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            SocketServer.__remove_unix_socket_file(unix_socket_path)
+
+    # Удалить файл Unix domain socket (для абстрактного пространства имён файла нет)
+    @staticmethod
+    def __remove_unix_socket_file(unix_socket_path):
+        if unix_socket_path is not None and not unix_socket_path.startswith("\0"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(unix_socket_path)
+
+    # Обработка вызовов методов через сокеты (клиент переиспользует соединение для нескольких запросов)
+    async def __handle_client(self, reader, writer):
+        print(f"Подключен клиент: {writer.get_extra_info('peername')}")
+        client_socket = writer.get_extra_info('socket')
+        if client_socket is not None and client_socket.family in (socket.AF_INET, socket.AF_INET6):
+            # Отключить алгоритм Нейгла, чтобы короткие ответы отправлялись без задержки
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Чтение запроса
+                payload = await self.__read_frame(reader)
+                if payload is None:
+                    break  # Клиент закрыл соединение
+                response = await self.__handle_request(loop, payload)
+                # Отправка ответа клиенту
+                writer.write(SocketCalls.FRAME_HEADER.pack(len(response)) + response)
+                await writer.drain()
+        except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+            print(f"Ошибка соединения с клиентом: {e}")
+        finally:
+            # Закрытие соединения
+            writer.close()
+
+    # Обработать полученное сообщение (результат - закодированный ответ)
+    async def __handle_request(self, loop, payload):
+        try:
+            request = MessageCodec.decode(payload)
+        except Exception as e:
+            print(f"Ошибка обработки клиента: {e}")
+            return MessageCodec.encode({"error": f"Ошибка сервера: {e}"})
+        if "cancel" in request or "cancel_method" in request:
+            # Отмена обрабатывается сразу, не дожидаясь свободного потока в пуле
+            return MessageCodec.encode({"result": self.__cancel(request)})
+        # Срок выполнения передаётся клиентом относительным, так как часы клиента и сервера могут не совпадать
+        # Отсчитывается от получения запроса: время ожидания свободного потока в пуле тоже учитывается
+        timeout_ms = request.get("timeout_ms")
+        deadline = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000
+        # Запрос регистрируется до постановки в очередь пула, чтобы его можно было отменить и во время ожидания
+        # свободного потока (иначе вызов, который клиент уже считает неудавшимся, выполнился бы позже)
+        cancel_event = threading.Event()
+        request_id = request.get("id", id(cancel_event))
+        calls = request["batch"] if "batch" in request else [request]
+        with self.__active_requests_lock:
+            self.__active_requests[request_id] = ({call.get("method") for call in calls}, cancel_event)
+        try:
+            # Выполнение и кодирование ответа - в пуле потоков, чтобы не блокировать цикл событий
+            return await loop.run_in_executor(self.__executor, self.__serve_request, request, cancel_event, deadline)
+        finally:
+            with self.__active_requests_lock:
+                del self.__active_requests[request_id]
+
+    # Прочитать кадр сообщения (None, если соединение закрыто до начала нового сообщения)
+    @staticmethod
+    async def __read_frame(reader):
+        try:
+            header = await reader.readexactly(SocketCalls.FRAME_HEADER.size)
+        except asyncio.IncompleteReadError as e:
+            if not e.partial:
+                return None
+            raise
+        length = SocketCalls.FRAME_HEADER.unpack(header)[0]
+        if length > SocketCalls.MAX_MESSAGE_SIZE:
+            raise ValueError(f"Размер сообщения {length} байт превышает допустимый")
+        return await reader.readexactly(length)
+
+    # Обработать запрос: одиночный вызов или пакет вызовов, выполняемых по порядку (результат - закодированный ответ)
+    # Вызовы запроса, отменённого или с истёкшим сроком (в том числе пока он ждал свободного потока), не выполняются
+    def __serve_request(self, request, cancel_event, deadline):
+        SocketServer.__current_request.request = (cancel_event, deadline)
+        try:
+            # Вызовы выполняются в контексте трассировки клиента (если она ведётся)
+            with Tracer.use_context(request.get("trace")):
+                if "batch" in request:
+                    response = {"results": [self.__serve_call(call) for call in request["batch"]]}
+                else:
+                    response = self.__serve_call(request)
+            return MessageCodec.encode(response)
+        except Exception as e:
+            print(f"Ошибка обработки клиента: {e}")
+            return MessageCodec.encode({"error": f"Ошибка сервера: {e}"})
+        finally:
+            SocketServer.__current_request.request = None
+
+    # Отменить выполняемые и ожидающие свободного потока вызовы по идентификатору запроса или по имени метода
+    # (результат - число отменённых запросов)
+    def __cancel(self, request):
+        with self.__active_requests_lock:
+            if "cancel" in request:
+                active_request = self.__active_requests.get(request["cancel"])
+                cancel_events = [] if active_request is None else [active_request[1]]
+            else:
+                cancel_events = [cancel_event for method_names, cancel_event in self.__active_requests.values()
+                                 if request["cancel_method"] in method_names]
+        for cancel_event in cancel_events:
+            cancel_event.set()
+        print(f"Получена отмена {request}, отменено запросов: {len(cancel_events)}")
+        return len(cancel_events)
+
+    # Выполнить один вызов метода из запроса
+    def __serve_call(self, call):
+        method_name = call.get("method")
+        if SocketServer.is_cancelled():
+            # Клиент уже не ждёт результата (например, вызов долго ждал свободного потока или выполнялся пакет)
+            print(f"Вызов {method_name} не выполнен: отменён или истёк срок выполнения")
+            self.__statistics.record(method_name, 0.0, True)
+            return {"error": "Вызов отменён или истёк срок его выполнения"}
+        start_time = time.perf_counter()
+        try:
+            with Tracer.span(method_name, "rpc_server"):
+                response = {"result": self.__call_method(method_name, call["args"])}
+        except Exception as e:
+            print(f"Ошибка при выполнении метода {method_name}: {e}")
+            response = {"error": f"Ошибка сервера: {e}"}
+        self.__statistics.record(method_name, time.perf_counter() - start_time, "error" in response)
+        return response
+
+    # Вызов метода системы по имени с параметрами из запроса через сокеты
+    def __call_method(self, method_name, parameters):
+        print(f"Получено: {method_name} {parameters}")
+        if method_name not in self.__methods:
+            response = f"Неизвестный метод {method_name}"
+            print(response)
+            return response
+        method, min_parameters, max_parameters = self.__methods[method_name]
+        if not min_parameters <= len(parameters) <= max_parameters:
+            response = SocketServer.__parameters_count_message(method_name, min_parameters, max_parameters)
+            print(response)
+            return response
+        return method(*parameters)
+
+    # Статистика выполнения методов этой системы ("server") и вызовов методов других систем из неё ("client")
+    def __get_rpc_statistics(self):
+        return {"server": self.__statistics.get_statistics(), "client": SocketCalls.client_statistics.get_statistics()}
+
+    # Вывод статистики вызовов методов
+    def __print_rpc_statistics(self):
+        statistics = self.__get_rpc_statistics()
+        statistics_str = "\n".join([
+            RpcStatistics.format_statistics(statistics["server"], "Выполнение методов системы:"),
+            RpcStatistics.format_statistics(statistics["client"], "Вызовы методов других систем:")
+        ])
+        print(statistics_str)
+        return statistics_str
+
+    # Сбросить статистику вызовов методов
+    def __reset_rpc_statistics(self):
+        self.__statistics.reset()
+        SocketCalls.client_statistics.reset()
+        return True
+
+    # Сообщение о неверном числе параметров метода
+    @staticmethod
+    def __parameters_count_message(method_name, min_parameters, max_parameters):
+        if max_parameters == 0:
+            return f"Для метода {method_name} параметры не требуются"
+        if max_parameters % 10 == 1 and max_parameters % 100 != 11:
+            word = "параметр"
+        elif 2 <= max_parameters % 10 <= 4 and not 12 <= max_parameters % 100 <= 14:
+            word = "параметра"
+        else:
+            word = "параметров"
+        if min_parameters == max_parameters:
+            return f"Метод {method_name} требует {max_parameters} {word}"
+        if max_parameters - min_parameters == 1:
+            return f"Метод {method_name} требует {min_parameters} или {max_parameters} {word}"
+        return f"Метод {method_name} требует от {min_parameters} до {max_parameters} параметров"
@@ -0,0 +1,68 @@
+import glob
+import os
+import time
+from datetime import datetime
+from bson import json_util
+from SampleBuffer import SampleBuffer
+
+
+# Воспроизведение записанных данных с сенсоров (файлы экспорта коллекций mongoexport --jsonArray с полными
+# документами, как в каталоге Dataset_GTX_1650) вместо опроса GPU: значения всех файлов выдаются в порядке времени
+# с ускорением speed (1 - в реальном времени, 10 - в 10 раз быстрее, None - без ожидания)
+# Значения сохраняют записанное время, паузы между записями длиннее MAX_GAP секунд сокращаются до MAX_GAP
+class TelemetryReplay:
+    FOLDER = "Dataset_GTX_1650"
+    FILE_PATTERN = "*.json"
+    MAX_GAP = 5  # Макс. пауза между соседними значениями при воспроизведении в секундах (по времени записи)
+
+    def __init__(self, folder=None, file_pattern=None):
+        folder = TelemetryReplay.FOLDER if folder is None else folder
+        file_pattern = TelemetryReplay.FILE_PATTERN if file_pattern is None else file_pattern
+        self.__samples = []  # (значение - кортеж полей в порядке SampleBuffer.DTYPE, тип теста бенчмарка)
+        self.__fps_values = []  # (строка "Date", FPS) для значений, у которых записан FPS
+        for file_path in sorted(glob.glob(os.path.join(folder, file_pattern))):
+            with open(file_path, 'r', encoding='utf-8') as file:
+                documents = json_util.loads(file.read())  # Расширенный JSON MongoDB ({"$oid": ...} и т.п.)
+            for document in documents:
+                self.__samples.append((TelemetryReplay.__to_sample(document), document.get("Benchmark test type")))
+                if document.get("FPS") is not None:
+                    self.__fps_values.append((document["Date"], document["FPS"]))
+        self.__samples.sort(key=lambda sample: sample[0][0])
+
+    def __len__(self):
+        return len(self.__samples)
+
+    # Значения FPS в формате вызова calculate_fps_and_efficiency_in_collection: (дата и время строкой, FPS)
+    def get_fps_values(self):
+        return list(self.__fps_values)
+
+    # Значение в порядке полей SampleBuffer.DTYPE из полного документа ("Date" - строка с локальным временем,
+    # отсутствующие поля - 0, индекс GPU в данных, собранных до опроса нескольких GPU, - 0)
+    @staticmethod
+    def __to_sample(document):
+        timestamp = datetime.strptime(document["Date"], "%Y-%m-%d %H:%M:%S").timestamp()
+        return (timestamp,) + tuple(document.get(field_name) or 0 for field_name in SampleBuffer.DTYPE.names[1:])
+
+    # Значения в порядке времени с ожиданием по расписанию воспроизведения: (значение, тип теста бенчмарка,
+    # отставание от расписания в секундах). stop_event - threading.Event для прерывания ожидания и воспроизведения
+    def iter_samples(self, speed=None, stop_event=None):
+        start_time = time.perf_counter()
+        replay_time = 0.0  # Время от начала воспроизведения по времени записи (с сокращёнными паузами)
+        last_timestamp = None
+        for sample, benchmark_type in self.__samples:
+            if last_timestamp is not None:
+                replay_time += min(sample[0] - last_timestamp, TelemetryReplay.MAX_GAP)
+            last_timestamp = sample[0]
+            lag = 0.0
+            if speed:
+                delay = start_time + replay_time / speed - time.perf_counter()
+                if delay > 0:
+                    if stop_event is not None:
+                        stop_event.wait(delay)
+                    else:
+                        time.sleep(delay)
+                else:
+                    lag = -delay
+            if stop_event is not None and stop_event.is_set():
+                return
+            yield sample, benchmark_type, lag
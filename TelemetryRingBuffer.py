@@ -0,0 +1,163 @@
+import mmap
+import os
+import tempfile
+import numpy as np
+
+
+# Кольцевой буфер данных с сенсоров GPU в разделяемой памяти (файл, отображённый в память)
+# Система сбора данных с сенсоров записывает в него каждое полученное значение, а другие процессы на этом же
+# компьютере (запись, мониторинг, управление) читают последние значения в своём темпе - без вызовов через сокеты
+# и без кодирования каждого значения. Согласованность записей обеспечивается счётчиком версии для каждой ячейки
+# (seqlock): нечётное значение - запись в ячейку идёт, чётное 2 * (номер записи + 1) - запись завершена
+class TelemetryRingBuffer:
+    PATH = os.path.join(tempfile.gettempdir(), "gpu_power_model_telemetry.bin")  # Файл буфера
+    CAPACITY = 65536  # Число записей в буфере (при 100 Гц - почти 11 минут)
+    MAGIC = 0x47504D54  # Признак файла буфера
+    VERSION = 2
+
+    # Запись буфера: время получения значения (Unix time в секундах) и числовые значения сенсоров
+    # (названия и порядок полей совпадают с SampleBuffer.DTYPE)
+    RECORD_DTYPE = np.dtype([
+        ("Timestamp", np.float64),
+        ("GPU Clock [MHz]", np.float64),
+        ("Memory Clock [MHz]", np.float64),
+        ("GPU Temperature [°C]", np.float64),
+        ("Fan Speed [%]", np.float64),
+        ("Fan Speed [RPM]", np.float64),
+        ("Memory Used [MB]", np.float64),
+        ("GPU Load [%]", np.float64),
+        ("Memory Controller Load [%]", np.float64),
+        ("Board Power Draw [W]", np.float64),
+        ("Power Consumption [% TDP]", np.float64),
+        ("Power Limit [W]", np.float64),
+        ("TDP Limit [%]", np.float64),
+        ("Min GPU Clock Frequency [MHz]", np.float64),
+        ("Max GPU Clock Frequency [MHz]", np.float64),
+        ("GPU Clock Frequency Offset [MHz]", np.float64),
+        ("Memory Clock Offset [MHz]", np.float64),
+        ("GPU Voltage [V]", np.float64),
+        ("GPU Index", np.float64)
+    ])
+
+    # Заголовок файла (64 байта)
+    HEADER_DTYPE = np.dtype([
+        ("magic", np.uint32),
+        ("version", np.uint32),
+        ("capacity", np.uint64),
+        ("record_size", np.uint64),
+        ("write_count", np.uint64),  # Общее число записанных значений
+        ("reserved", np.uint8, 32)
+    ])
+
+    def __init__(self, path, capacity, writable):
+        self.__capacity = capacity
+        size = TelemetryRingBuffer.__get_file_size(capacity)
+        with open(path, 'r+b' if writable else 'rb') as file:
+            self.__mmap = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        header_size = TelemetryRingBuffer.HEADER_DTYPE.itemsize
+        sequences_size = capacity * np.dtype(np.uint64).itemsize
+        # Представления NumPy над отображённой памятью (без копирования)
+        self.__header = np.frombuffer(self.__mmap, dtype=TelemetryRingBuffer.HEADER_DTYPE, count=1)
+        self.__sequences = np.frombuffer(self.__mmap, dtype=np.uint64, count=capacity, offset=header_size)
+        self.__records = np.frombuffer(self.__mmap, dtype=TelemetryRingBuffer.RECORD_DTYPE, count=capacity,
+                                       offset=header_size + sequences_size)
+
+    # Создать буфер для записи (существующий буфер с той же структурой используется повторно, чтобы читатели
+    # продолжили работу после перезапуска системы сбора данных)
+    @staticmethod
+    def create(path=None, capacity=None):
+        path = TelemetryRingBuffer.PATH if path is None else path
+        capacity = TelemetryRingBuffer.CAPACITY if capacity is None else capacity
+        if not TelemetryRingBuffer.__has_layout(path, capacity):
+            with open(path, 'wb') as file:
+                file.truncate(TelemetryRingBuffer.__get_file_size(capacity))
+            ring_buffer = TelemetryRingBuffer(path, capacity, True)
+            header = ring_buffer.__header[0]
+            header["magic"] = TelemetryRingBuffer.MAGIC
+            header["version"] = TelemetryRingBuffer.VERSION
+            header["capacity"] = capacity
+            header["record_size"] = TelemetryRingBuffer.RECORD_DTYPE.itemsize
+            return ring_buffer
+        return TelemetryRingBuffer(path, capacity, True)
+
+    # Открыть буфер для чтения (FileNotFoundError, если система сбора данных ещё не создала его)
+    @staticmethod
+    def open(path=None):
+        path = TelemetryRingBuffer.PATH if path is None else path
+        with open(path, 'rb') as file:
+            header = np.frombuffer(file.read(TelemetryRingBuffer.HEADER_DTYPE.itemsize),
+                                   dtype=TelemetryRingBuffer.HEADER_DTYPE)[0]
+        if not TelemetryRingBuffer.__is_compatible(header):
+            raise ValueError(f"Файл {path} не является буфером данных с сенсоров этой версии")
+        return TelemetryRingBuffer(path, int(header["capacity"]), False)
+
+    @staticmethod
+    def __get_file_size(capacity):
+        return (TelemetryRingBuffer.HEADER_DTYPE.itemsize + capacity * np.dtype(np.uint64).itemsize
+                + capacity * TelemetryRingBuffer.RECORD_DTYPE.itemsize)
+
+    @staticmethod
+    def __is_compatible(header):
+        return (header["magic"] == TelemetryRingBuffer.MAGIC and header["version"] == TelemetryRingBuffer.VERSION
+                and header["record_size"] == TelemetryRingBuffer.RECORD_DTYPE.itemsize)
+
+    # Есть ли уже файл буфера с такой же структурой
+    @staticmethod
+    def __has_layout(path, capacity):
+        try:
+            if os.path.getsize(path) != TelemetryRingBuffer.__get_file_size(capacity):
+                return False
+            with open(path, 'rb') as file:
+                header = np.frombuffer(file.read(TelemetryRingBuffer.HEADER_DTYPE.itemsize),
+                                       dtype=TelemetryRingBuffer.HEADER_DTYPE)[0]
+        except OSError:
+            return False
+        return TelemetryRingBuffer.__is_compatible(header) and header["capacity"] == capacity
+
+    # Записать значение с сенсоров (кортеж полей в порядке RECORD_DTYPE, начиная с Timestamp)
+    # Запись выполняет только один поток одного процесса (или несколько потоков с общей блокировкой)
+    def write(self, sample):
+        write_count = int(self.__header[0]["write_count"])
+        slot = write_count % self.__capacity
+        self.__sequences[slot] = 2 * write_count + 1  # Запись в ячейку начата
+        self.__records[slot] = sample  # Запись всех полей одним присваиванием
+        self.__sequences[slot] = 2 * write_count + 2  # Запись в ячейку завершена
+        self.__header[0]["write_count"] = write_count + 1
+
+    # Общее число записанных значений (номер следующей записи)
+    def get_write_count(self):
+        return int(self.__header[0]["write_count"])
+
+    # Последние count значений (в порядке записи) в виде структурированного массива NumPy
+    # По умолчанию возвращается копия (count записей копируется одной операцией). При zero_copy=True, если окно
+    # не переходит через конец буфера, возвращается представление над разделяемой памятью без копирования:
+    # оно согласовано на момент возврата и остаётся верным, пока писатель не запишет ещё CAPACITY - count значений
+    def read_latest(self, count, zero_copy=False):
+        write_count = self.get_write_count()
+        # Самая старая ячейка может перезаписываться прямо сейчас, поэтому окно - не больше CAPACITY - 1 записей
+        count = min(count, write_count, self.__capacity - 1)
+        first_index = write_count - count
+        start_slot = first_index % self.__capacity
+        if start_slot + count <= self.__capacity:
+            slots = slice(start_slot, start_slot + count)
+            records = self.__records[slots] if zero_copy else self.__records[slots].copy()
+            sequences = self.__sequences[slots]
+        else:
+            slots = np.arange(first_index, write_count) % self.__capacity
+            records = self.__records[slots]  # Индексация массивом индексов всегда создаёт копию
+            sequences = self.__sequences[slots]
+        # Проверка, что ячейки не были перезаписаны во время чтения (иначе остаются только более новые записи)
+        expected_sequences = 2 * np.arange(first_index, write_count, dtype=np.uint64) + 2
+        invalid_positions = np.flatnonzero(sequences != expected_sequences)
+        if len(invalid_positions) == 0:
+            return records
+        return records[invalid_positions[-1] + 1:]
+
+    # Закрыть отображение файла в память (если остались представления, полученные через read_latest(zero_copy=True),
+    # память освобождается после их удаления)
+    def close(self):
+        self.__header = self.__sequences = self.__records = None
+        try:
+            self.__mmap.close()
+        except BufferError:
+            pass
@@ -0,0 +1,113 @@
+import atexit
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+
+# Трассировка выполнения через несколько процессов: интервалы выполнения (spans) записываются каждым процессом
+# в свой файл в формате событий Chrome Trace (по одному JSON на строку), идентификатор трассировки передаётся
+# между системами в запросах SocketCalls. Объединение файлов в один Chrome/Perfetto trace - MainMergeTraces.py
+class Tracer:
+    ENABLED = True  # Записывать ли интервалы выполнения
+    TRACE_DIR = "traces"  # Каталог для файлов трассировки процессов
+    FLUSH_INTERVAL = 1  # Период записи накопленных интервалов в файл в секундах
+    TRACE_CATEGORY = "trace"  # Категория события начала трассировки (по нему MainMergeTraces определяет её имя)
+
+    # Текущий контекст трассировки: (идентификатор трассировки, идентификатор родительского интервала или None)
+    __context = contextvars.ContextVar("trace_context", default=None)
+
+    __records = []  # Интервалы, ещё не записанные в файл
+    __records_lock = threading.Lock()
+    __flush_thread = None
+
+    # Начать новую трассировку в текущем потоке (например, для одного прохода перебора параметров GPU)
+    # Результат - идентификатор трассировки
+    @staticmethod
+    def start_trace(name):
+        trace_id = uuid.uuid4().hex
+        Tracer.__context.set((trace_id, None))
+        Tracer.__record(trace_id, {"name": name, "cat": Tracer.TRACE_CATEGORY, "ph": "i", "s": "g",
+                                   "ts": time.time_ns() / 1000, "pid": os.getpid(),
+                                   "tid": threading.get_ident()})
+        return trace_id
+
+    # Текущий контекст трассировки для передачи в другую систему (None, если трассировка не ведётся)
+    @staticmethod
+    def get_context():
+        return Tracer.__context.get()
+
+    # Выполнить блок кода в контексте трассировки, полученном от другой системы
+    @staticmethod
+    @contextlib.contextmanager
+    def use_context(context):
+        token = Tracer.__context.set(None if context is None else tuple(context))
+        try:
+            yield
+        finally:
+            Tracer.__context.reset(token)
+
+    # Записать интервал выполнения блока кода (только внутри трассировки)
+    # category - вид работы: "rpc_client", "rpc_server", "nvml", "mongo", "subprocess", "sleep" и т.д.
+    @staticmethod
+    @contextlib.contextmanager
+    def span(name, category, **args):
+        context = Tracer.__context.get()
+        if not Tracer.ENABLED or context is None:
+            yield
+            return
+        trace_id, parent_id = context
+        span_id = uuid.uuid4().hex[:16]
+        token = Tracer.__context.set((trace_id, span_id))
+        start_time = time.time_ns()  # Время по системным часам, общим для всех процессов компьютера
+        try:
+            yield
+        finally:
+            duration = time.time_ns() - start_time
+            Tracer.__context.reset(token)
+            Tracer.__record(trace_id, {"name": name, "cat": category, "ph": "X", "ts": start_time / 1000,
+                                       "dur": duration / 1000, "pid": os.getpid(), "tid": threading.get_ident(),
+                                       "args": dict(args, span_id=span_id, parent_id=parent_id)})
+
+    @staticmethod
+    def __record(trace_id, event):
+        with Tracer.__records_lock:
+            Tracer.__records.append({"trace_id": trace_id, "process": Tracer.__get_process_name(), "event": event})
+            if Tracer.__flush_thread is None:
+                # Системы завершаются супервизором без вызова atexit, поэтому интервалы записываются периодически
+                Tracer.__flush_thread = threading.Thread(target=Tracer.__flush_loop, daemon=True)
+                Tracer.__flush_thread.start()
+
+    @staticmethod
+    def __flush_loop():
+        while True:
+            time.sleep(Tracer.FLUSH_INTERVAL)
+            Tracer.flush()
+
+    # Записать накопленные интервалы в файл трассировки процесса
+    @staticmethod
+    def flush():
+        with Tracer.__records_lock:
+            records, Tracer.__records = Tracer.__records, []
+        if not records:
+            return
+        try:
+            os.makedirs(Tracer.TRACE_DIR, exist_ok=True)
+            trace_file = os.path.join(Tracer.TRACE_DIR, f"{Tracer.__get_process_name()}_{os.getpid()}.jsonl")
+            with open(trace_file, 'a', encoding='utf-8') as file:
+                file.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        except OSError as e:
+            print(f"Ошибка записи файла трассировки: {e}")
+
+    # Имя процесса - имя запущенного скрипта
+    @staticmethod
+    def __get_process_name():
+        return os.path.splitext(os.path.basename(sys.argv[0]))[0] or "python"
+
+
+# Записать оставшиеся интервалы при завершении программы
+atexit.register(Tracer.flush)
@@ -1,220 +1,161 @@
 import atexit
-import pynvml
-import os
-import socket
-import threading
+from GpuDevices import GpuDevices
 from SocketCalls import SocketCalls
+from SocketServer import SocketServer
+from Tracer import Tracer
 
 
 class UndervoltingGpuSystem:
     def __init__(self):
         self.__address = SocketCalls.UNDERVOLTING_GPU_SYSTEM_ADDRESS
         self.__port = SocketCalls.UNDERVOLTING_GPU_SYSTEM_PORT
+        # Работа с GPU (GpuDevices.BACKEND: реальные GPU через pynvml и NVIDIA Inspector или модель GPU)
+        self.__gpu_backend = GpuDevices.create_backend()
         # Регистрация метода cleanup для выполнения при завершении программы
         atexit.register(self.__cleanup)
-        # Инициализация pynvml
-        pynvml.nvmlInit()
-        # Получение количества GPU
-        device_count = pynvml.nvmlDeviceGetCount()
-        if device_count == 0:
+        # Выбранные GPU (GpuDevices.DEVICE_INDICES): методы без индекса GPU изменяют параметры всех выбранных GPU
+        self.__device_indices = GpuDevices.get_device_indices(self.__gpu_backend)
+        if not self.__device_indices:
             print("Не найдено GPU NVIDIA")
             exit()
-        # Получение первого GPU для pynvml
-        self.__handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-        # Путь и параметры для NVIDIA Inspector
-        nvidia_inspector_folder = "C:\\NVIDIA_Inspector_1.9.8.7_Beta\\"
-        nvidia_inspector_name = "nvidiaInspector.exe"
         # Частота GPU
-        nvidia_inspector_gpu_clock_offset_options = "-setBaseClockOffset:0,0,"  # Справа этой строки добавлять само значение
-        self.__nvidia_inspector_gpu_clock_offset_command = f'"{nvidia_inspector_folder + nvidia_inspector_name}" {nvidia_inspector_gpu_clock_offset_options}'
         self.__default_gpu_clock_offset = 0
-        self.__current_gpu_clock_offset = self.__default_gpu_clock_offset
+        self.__current_gpu_clock_offsets = dict.fromkeys(self.__device_indices, self.__default_gpu_clock_offset)
         # Частота памяти
-        nvidia_inspector_mem_clock_offset_options = "-setMemoryClockOffset:0,0,"  # Справа этой строки добавлять само значение
-        self.__nvidia_inspector_mem_clock_offset_command = f'"{nvidia_inspector_folder + nvidia_inspector_name}" {nvidia_inspector_mem_clock_offset_options}'
         self.__default_mem_clock_offset = 0
-        self.__current_mem_clock_offset = self.__default_mem_clock_offset
+        self.__current_mem_clock_offsets = dict.fromkeys(self.__device_indices, self.__default_mem_clock_offset)
 
     # Конец работы программы
-    @staticmethod
-    def __cleanup():
-        pynvml.nvmlShutdown()
+    def __cleanup(self):
+        self.__gpu_backend.shutdown()
         print("Работа программы завершена")
 
-    # Изменить Power Limit GPU
-    def __set_tdp(self, milliwatt_value):
-        power_limit_constraints = pynvml.nvmlDeviceGetPowerManagementLimitConstraints(self.__handle)
+    # Выполнить метод set_method(индекс GPU) для GPU с индексом device_index (None - для всех выбранных GPU по очереди)
+    # Ошибка на одном GPU не прерывает изменение параметров остальных, но вызов завершается ошибкой RuntimeError
+    # с ошибками по GPU. Результаты всех GPU выводятся, возвращается результат первого выбранного GPU
+    # (None, если такого GPU нет среди выбранных)
+    def __for_devices(self, device_index, set_method):
+        device_indices = GpuDevices.select(self.__device_indices, device_index)
+        if not device_indices:
+            print(f"GPU с индексом {device_index} не найден")
+            return None
+        results = {}
+        errors = {}
+        for index in device_indices:
+            try:
+                results[index] = set_method(index)
+            except Exception as e:
+                errors[index] = e
+        if len(device_indices) > 1:
+            print("Результаты по GPU: " + ", ".join(f"GPU {index}: {result}" for index, result in results.items()))
+        if errors:
+            raise RuntimeError("; ".join(f"GPU {index}: {error}" for index, error in errors.items())
+                               + f" (параметры изменены для GPU {list(results)})")
+        return results[device_indices[0]]
+
+    # Изменить Power Limit GPU (device_index - индекс GPU, None - все выбранные GPU)
+    def __set_tdp(self, milliwatt_value, device_index=None):
+        return self.__for_devices(device_index, lambda index: self.__set_device_tdp(index, milliwatt_value))
+
+    # Изменить Power Limit одного GPU
+    def __set_device_tdp(self, device_index, milliwatt_value):
+        power_limit_constraints = self.__gpu_backend.get_power_limit_constraints(device_index)
 
         # Уменьшение TDP
         new_power_limit = max(power_limit_constraints[0],
                               milliwatt_value)  # Изменить на X мВт
-        pynvml.nvmlDeviceSetPowerManagementLimit(self.__handle, new_power_limit)
-
-        power_limit = pynvml.nvmlDeviceGetPowerManagementLimit(self.__handle)
-        print(f"Новый Power Limit: {power_limit / 1000} W")
-        print(f"Новое ограничение TDP: {(power_limit / power_limit_constraints[1]) * 100} %")
+        with Tracer.span("nvml_set_power_limit", "nvml", device=device_index):
+            self.__gpu_backend.set_power_limit(device_index, new_power_limit)
+        # Система сбора данных кэширует Power Limit
+        SocketCalls.call_method_of_sensor_data_collection_system("invalidate_device_properties", device_index)
+
+        power_limit = self.__gpu_backend.get_power_limit(device_index)
+        print(f"GPU {device_index}: новый Power Limit: {power_limit / 1000} W")
+        print(f"GPU {device_index}: новое ограничение TDP: {(power_limit / power_limit_constraints[1]) * 100} %")
         return power_limit
 
-    # Уменьшение Power Limit GPU для прохождения следующего теста бенчмарка
-    def __reduce_tdp(self, milliwatt_reducing_value):
+    # Уменьшение Power Limit GPU для прохождения следующего теста бенчмарка (каждый GPU - от его текущего Power Limit)
+    def __reduce_tdp(self, milliwatt_reducing_value, device_index=None):
         # Получение текущего Power Limit (в абсолютных величинах, а не проценты TDP)
-        power_limit = pynvml.nvmlDeviceGetEnforcedPowerLimit(self.__handle)
-        return self.__set_tdp(power_limit - milliwatt_reducing_value)
+        return self.__for_devices(device_index, lambda index: self.__set_device_tdp(
+            index, self.__gpu_backend.get_enforced_power_limit(index) - milliwatt_reducing_value))
 
     # Вернуть значение Power Limit GPU по умолчанию
-    def __set_tdp_to_default(self):
-        default_power_limit = pynvml.nvmlDeviceGetPowerManagementDefaultLimit(self.__handle)
-        pynvml.nvmlDeviceSetPowerManagementLimit(self.__handle, default_power_limit)
+    def __set_tdp_to_default(self, device_index=None):
+        return self.__for_devices(device_index, self.__set_device_tdp_to_default)
+
+    # Вернуть значение Power Limit по умолчанию одного GPU
+    def __set_device_tdp_to_default(self, device_index):
+        default_power_limit = self.__gpu_backend.get_default_power_limit(device_index)
+        with Tracer.span("nvml_set_power_limit", "nvml", device=device_index):
+            self.__gpu_backend.set_power_limit(device_index, default_power_limit)
+        SocketCalls.call_method_of_sensor_data_collection_system("invalidate_device_properties", device_index)
         return default_power_limit
 
     # Изменить смещение частоты GPU
-    def __set_gpu_clock_offset(self, megahertz_value):
+    def __set_gpu_clock_offset(self, megahertz_value, device_index=None):
+        return self.__for_devices(device_index,
+                                  lambda index: self.__set_device_gpu_clock_offset(index, megahertz_value))
+
+    # Изменить смещение частоты одного GPU
+    def __set_device_gpu_clock_offset(self, device_index, megahertz_value):
         new_clock_offset = megahertz_value
-        os.system(self.__nvidia_inspector_gpu_clock_offset_command + str(new_clock_offset))
-        self.__current_gpu_clock_offset = new_clock_offset
-        SocketCalls.call_method_of_sensor_data_collection_system("set_gpu_clock_offset", self.__current_gpu_clock_offset)
+        self.__gpu_backend.set_gpu_clock_offset(device_index, new_clock_offset)
+        self.__current_gpu_clock_offsets[device_index] = new_clock_offset
+        SocketCalls.call_method_of_sensor_data_collection_system("set_gpu_clock_offset", new_clock_offset, device_index)
         # В качестве возвращаемого значения - max частота GPU, по которой можно проверить, что изменения были успешно применены
-        min_gpu_clock, max_gpu_clock = pynvml.nvmlDeviceGetMinMaxClockOfPState(self.__handle, pynvml.NVML_PSTATE_0,
-                                                                               pynvml.NVML_CLOCK_GRAPHICS)
-        return self.__current_gpu_clock_offset, max_gpu_clock
+        min_gpu_clock, max_gpu_clock = self.__gpu_backend.get_min_max_gpu_clock(device_index)
+        return new_clock_offset, max_gpu_clock
 
     # Увеличение смещения частоты GPU для прохождения следующего теста бенчмарка
-    def __increase_gpu_clock_offset(self, megahertz_increasing_value):
-        new_clock_offset = self.__current_gpu_clock_offset + megahertz_increasing_value
-        return self.__set_gpu_clock_offset(new_clock_offset)
+    def __increase_gpu_clock_offset(self, megahertz_increasing_value, device_index=None):
+        return self.__for_devices(device_index, lambda index: self.__set_device_gpu_clock_offset(
+            index, self.__current_gpu_clock_offsets[index] + megahertz_increasing_value))
 
     # Вернуть значение смещения частоты GPU по умолчанию
-    def __set_gpu_clock_offset_to_default(self):
-        os.system(self.__nvidia_inspector_gpu_clock_offset_command + str(self.__default_gpu_clock_offset))
-        self.__current_gpu_clock_offset = self.__default_gpu_clock_offset
-        SocketCalls.call_method_of_sensor_data_collection_system("set_gpu_clock_offset", self.__current_gpu_clock_offset)
-        # В качестве возвращаемого значения - max частота GPU, по которой можно проверить, что изменения были успешно применены
-        min_gpu_clock, max_gpu_clock = pynvml.nvmlDeviceGetMinMaxClockOfPState(self.__handle, pynvml.NVML_PSTATE_0,
-                                                                               pynvml.NVML_CLOCK_GRAPHICS)
-        return self.__current_gpu_clock_offset, max_gpu_clock
+    def __set_gpu_clock_offset_to_default(self, device_index=None):
+        return self.__for_devices(device_index, lambda index: self.__set_device_gpu_clock_offset(
+            index, self.__default_gpu_clock_offset))
 
     # Изменить смещение частоты памяти
-    def __set_mem_clock_offset(self, megahertz_value):
+    def __set_mem_clock_offset(self, megahertz_value, device_index=None):
+        return self.__for_devices(device_index,
+                                  lambda index: self.__set_device_mem_clock_offset(index, megahertz_value))
+
+    # Изменить смещение частоты памяти одного GPU
+    def __set_device_mem_clock_offset(self, device_index, megahertz_value):
         new_clock_offset = megahertz_value
-        os.system(self.__nvidia_inspector_mem_clock_offset_command + str(new_clock_offset))
-        self.__current_mem_clock_offset = new_clock_offset
-        SocketCalls.call_method_of_sensor_data_collection_system("set_mem_clock_offset", self.__current_mem_clock_offset)
-        return self.__current_mem_clock_offset
+        self.__gpu_backend.set_mem_clock_offset(device_index, new_clock_offset)
+        self.__current_mem_clock_offsets[device_index] = new_clock_offset
+        SocketCalls.call_method_of_sensor_data_collection_system("set_mem_clock_offset", new_clock_offset, device_index)
+        return new_clock_offset
 
     # Увеличение смещения частоты памяти для прохождения следующего теста бенчмарка
-    def __increase_mem_clock_offset(self, megahertz_increasing_value):
-        new_clock_offset = self.__current_mem_clock_offset + megahertz_increasing_value
-        return self.__set_mem_clock_offset(new_clock_offset)
+    def __increase_mem_clock_offset(self, megahertz_increasing_value, device_index=None):
+        return self.__for_devices(device_index, lambda index: self.__set_device_mem_clock_offset(
+            index, self.__current_mem_clock_offsets[index] + megahertz_increasing_value))
 
     # Вернуть значение смещения частоты памяти по умолчанию
-    def __set_mem_clock_offset_to_default(self):
-        os.system(self.__nvidia_inspector_mem_clock_offset_command + str(self.__default_mem_clock_offset))
-        self.__current_mem_clock_offset = self.__default_mem_clock_offset
-        SocketCalls.call_method_of_sensor_data_collection_system("set_mem_clock_offset", self.__current_mem_clock_offset)
-        return self.__current_mem_clock_offset
-
-    # Обработка вызова метода через сокеты
-    def __handle_client(self, client_socket):
-        try:
-            # Чтение и декодирование запроса
-            request = client_socket.recv(1024).decode('utf-8')
-            print(f"Получено: {request}")
-            # Разбиение запроса на метод и параметры
-            parts = request.split(',')
-            method_name = parts[0].strip()
-            parameters = [p.strip() for p in parts[1:] if p.strip()]  # Убрать пустые значения и пробелы
-            # Вызов соответствующего метода
-            if method_name == "set_tdp":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    milliwatt_value = int(parameters[0])
-                    response = self.__set_tdp(milliwatt_value)
-            elif method_name == "reduce_tdp":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    milliwatt_reducing_value = int(parameters[0])
-                    response = self.__reduce_tdp(milliwatt_reducing_value)
-            elif method_name == "set_tdp_to_default":
-                if parameters:
-                    response = f"Для метода {method_name} set_tdp_to_default параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__set_tdp_to_default()
-            elif method_name == "set_gpu_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    megahertz_value = int(parameters[0])
-                    response = self.__set_gpu_clock_offset(megahertz_value)
-            elif method_name == "increase_gpu_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    megahertz_increasing_value = int(parameters[0])
-                    response = self.__increase_gpu_clock_offset(megahertz_increasing_value)
-            elif method_name == "set_gpu_clock_offset_to_default":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__set_gpu_clock_offset_to_default()
-            elif method_name == "set_mem_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    megahertz_value = int(parameters[0])
-                    response = self.__set_mem_clock_offset(megahertz_value)
-            elif method_name == "increase_mem_clock_offset":
-                if len(parameters) != 1:
-                    response = f"Метод {method_name} требует 1 параметр"
-                    print(response)
-                else:
-                    megahertz_increasing_value = int(parameters[0])
-                    response = self.__increase_mem_clock_offset(megahertz_increasing_value)
-            elif method_name == "set_mem_clock_offset_to_default":
-                if parameters:
-                    response = f"Для метода {method_name} параметры не требуются"
-                    print(response)
-                else:
-                    response = self.__set_mem_clock_offset_to_default()
-            else:
-                response = f"Неизвестный метод {method_name}"
-                print(response)
-            # Преобразование response в строку, если оно является типа bool или int
-            if isinstance(response, (bool, int)):
-                response = str(response)
-            elif isinstance(response, tuple):
-                # Преобразовать кортеж в строку
-                response = ', '.join(map(str, response))
-            elif response is None:
-                response = "None"
-            # Отправка ответа клиенту
-            client_socket.send(response.encode('utf-8'))
-        except Exception as e:
-            print(f"Ошибка обработки клиента: {e}")
-            response = "Ошибка сервера"
-            client_socket.send(response.encode('utf-8'))
-        finally:
-            # Закрытие соединения
-            client_socket.close()
+    def __set_mem_clock_offset_to_default(self, device_index=None):
+        return self.__for_devices(device_index, lambda index: self.__set_device_mem_clock_offset(
+            index, self.__default_mem_clock_offset))
 
+    # Цикл обработки вызовов методов через сокеты
     def run(self):
-        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        server.bind((self.__address, self.__port))
-        server.listen(5)
-        print("Сервер системы андервольтинга GPU запущен и ожидает подключения клиентов...")
-        while True:
-            client_socket, addr = server.accept()
-            print(f"Подключен клиент: {addr}")
-            client_handler = threading.Thread(target=self.__handle_client, args=(client_socket,))
-            client_handler.start()
+        # Таблица методов, доступных через сокеты: имя -> (метод, min и max число параметров)
+        methods = {
+            "set_tdp": (self.__set_tdp, 1, 2),
+            "reduce_tdp": (self.__reduce_tdp, 1, 2),
+            "set_tdp_to_default": (self.__set_tdp_to_default, 0, 1),
+            "set_gpu_clock_offset": (self.__set_gpu_clock_offset, 1, 2),
+            "increase_gpu_clock_offset": (self.__increase_gpu_clock_offset, 1, 2),
+            "set_gpu_clock_offset_to_default": (self.__set_gpu_clock_offset_to_default, 0, 1),
+            "set_mem_clock_offset": (self.__set_mem_clock_offset, 1, 2),
+            "increase_mem_clock_offset": (self.__increase_mem_clock_offset, 1, 2),
+            "set_mem_clock_offset_to_default": (self.__set_mem_clock_offset_to_default, 0, 1)
+        }
+        server = SocketServer(self.__address, self.__port, methods)
+        server.run("Сервер системы андервольтинга GPU запущен и ожидает подключения клиентов...")
 
 
 system = UndervoltingGpuSystem()